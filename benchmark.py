@@ -0,0 +1,299 @@
+# benchmark.py
+"""
+전략 / 엔진 / 유틸 벤치마크. candle_db.sqlite 없이 utils/synthetic_candles 의 결정적 합성 캔들로 돌립니다.
+결과는 BENCH_RESULT_DIR 에 JSON 으로 저장하고, BENCH_BASELINE 파일이 있으면 항목별로 비교해 느려진 항목을 표시합니다.
+  - BENCH_SCALE=2 처럼 크기를 키우거나, BENCH_ONLY=run_simulation,simulate_with_db 처럼 일부만 돌릴 수 있습니다.
+  - 비교는 항목당 시간(초 / 처리 건수) 기준이라 크기가 달라도 비교됩니다.
+"""
+import io
+import os
+import sys
+import json
+import contextlib
+import time
+import logging
+import platform
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import stress_test_btc_final as stress
+import compound_test as compound
+import manager.simulator_db as simulator_db
+from manager.output_writers import CsvWriter
+from manager.trading_context import simulation_context
+from strategy.casino_strategy import generate_buy_orders, generate_sell_orders
+from utils.candle_arrays import CandleArrays
+from utils.synthetic_candles import synthetic_candles, write_candle_db
+
+# --- 1. 설정 ---
+BENCH_SCALE = float(os.getenv("BENCH_SCALE", "1"))          # 모든 벤치마크 크기 배수
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "3"))          # 반복 횟수 (가장 빠른 값을 기록)
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))  # 기준보다 이 비율 이상 느려지면 회귀
+BENCH_SEED = int(os.getenv("BENCH_SEED", "7"))
+BENCH_ONLY = [name for name in os.getenv("BENCH_ONLY", "").split(",") if name]
+BENCH_RESULT_DIR = os.getenv("BENCH_RESULT_DIR", "bench_results")
+BENCH_BASELINE = os.getenv("BENCH_BASELINE", os.path.join(BENCH_RESULT_DIR, "baseline.json"))
+
+# 합성 시장의 거래소 규칙 (adjust_price_to_tick / adjust_quantity_to_step 용, API 호출 없이 캐시에 넣어 사용)
+SYNTH_EXCHANGE_INFO = {"symbols": [{"symbol": "BTCUSDT", "filters": [
+    {"filterType": "PRICE_FILTER", "tickSize": "0.10", "minPrice": "556.80", "maxPrice": "4529764"},
+    {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+]}]}
+
+
+class BenchmarkSkipped(Exception):
+    """필요한 패키지가 없는 등 이 환경에서 돌릴 수 없는 벤치마크."""
+
+
+# --- 2. 벤치마크 정의 ---
+# 각 함수는 크기 n 을 받아 (측정할 함수, 처리 건수[, 정리 함수]) 를 돌려줍니다. 준비 비용은 측정하지 않고,
+# 정리 함수(임시 파일 삭제 등)는 측정이 끝나면 항상 호출됩니다.
+def bench_run_simulation(n):
+    df = synthetic_candles(n, seed=BENCH_SEED)
+    settings = stress.grid_settings_list()[0]
+    return (lambda: stress.run_simulation(df, settings)), n
+
+
+def bench_run_simulation_fast(n):
+    arrays = CandleArrays.from_df(synthetic_candles(n, seed=BENCH_SEED))
+    settings = stress.grid_settings_list()[0]
+    return (lambda: stress.run_simulation_fast(arrays, settings)), n
+
+
+def bench_phoenix_run_tick(n):
+    df = synthetic_candles(n, seed=BENCH_SEED)
+    settings = {k: getattr(compound, k) for k in
+                ("UNIT_SIZE", "TAKE_PROFIT_PCT", "SMALL_FLOW_PCT", "LARGE_FLOW_PCT", "INITIAL_UNITS",
+                 "SMALL_FLOW_UNITS", "LARGE_FLOW_UNITS", "LEVERAGE", "PROFIT_RESET_TARGET", "MARGIN_BUFFER")}
+
+    def run():
+        bot = compound.PhoenixBot(1, settings, compound.INITIAL_CASH)
+        for row in df.itertuples(index=False):
+            bot.run_tick(row)
+    return run, n
+
+
+def _bench_simulate_with_db(n, fast):
+    df = synthetic_candles(n, seed=BENCH_SEED)
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench_")
+    tmp = tmp_dir.name
+    db_path = write_candle_db(df, os.path.join(tmp, "candles.sqlite"))
+    kwargs = {"market": "BTCUSDT", "start": str(df["timestamp"].iloc[0]), "end": str(df["timestamp"].iloc[-1]),
+              "unit_size": 100, "small_flow_pct": 0.004, "small_flow_units": 2, "large_flow_pct": 0.013,
+              "large_flow_units": 4, "take_profit_pct": 0.003, "leverage": 10, "initial_cash": 3000.0}
+
+    def run():
+        original = simulator_db.DB_PATH
+        simulator_db.DB_PATH = db_path
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # 실행마다 찍는 요약 출력은 버림
+                simulator_db.simulate_with_db(**kwargs, use_cache=False, fast=fast,
+                                              outputs=[CsvWriter(os.path.join(tmp, "log.csv"))])
+        finally:
+            simulator_db.DB_PATH = original
+    return run, n, tmp_dir.cleanup
+
+
+def bench_simulate_with_db(n):
+    return _bench_simulate_with_db(n, fast=True)
+
+
+def bench_simulate_with_db_reference(n):
+    return _bench_simulate_with_db(n, fast=False)
+
+
+def _strategy_inputs():
+    setting_df = pd.DataFrame([{"market": "BTCUSDT", "unit_size": 100, "small_flow_pct": 0.004, "small_flow_units": 2,
+                                "large_flow_pct": 0.013, "large_flow_units": 4, "take_profit_pct": 0.003,
+                                "leverage": 10}])
+    buy_log_df = pd.DataFrame([
+        {"time": "2024-01-01 00:00:00", "market": "BTCUSDT", "target_price": 20000.0, "buy_amount": 100.0,
+         "buy_units": 0, "buy_type": "initial", "buy_uuid": "sim", "filled": "done", "base_unit_size": 100.0},
+        {"time": "2024-01-01 00:10:00", "market": "BTCUSDT", "target_price": 19920.0, "buy_amount": 200.0,
+         "buy_units": 1, "buy_type": "small_flow", "buy_uuid": "sim", "filled": "done", "base_unit_size": np.nan},
+    ])
+    holdings = {"BTCUSDT": {"balance": 0.015, "avg_price": 19946.7, "current_price": 19700.0}}
+    return setting_df, buy_log_df, holdings, simulation_context(start=pd.Timestamp("2024-01-01 00:20:00"))
+
+
+def bench_generate_buy_orders(n):
+    setting_df, buy_log_df, holdings, context = _strategy_inputs()
+    prices = 20000.0 * np.exp(np.random.default_rng(BENCH_SEED).normal(-0.01, 0.01, n))
+
+    def run():
+        for price in prices.tolist():
+            generate_buy_orders(setting_df, buy_log_df, {"BTCUSDT": price}, holdings, 3000.0, context=context)
+    return run, n
+
+
+def bench_generate_sell_orders(n):
+    setting_df, _, holdings, context = _strategy_inputs()
+    sell_log_df = pd.DataFrame([{"market": "BTCUSDT", "avg_buy_price": 19950.0, "quantity": 0.015,
+                                 "target_sell_price": 20009.85, "sell_uuid": "sim", "filled": "wait"}])
+
+    def run():
+        for _ in range(n):
+            generate_sell_orders(setting_df, holdings, sell_log_df, context=context)
+    return run, n
+
+
+def _binance_price_utils():
+    try:
+        import utils.binance_price_utils as price_utils
+    except ImportError as e:
+        raise BenchmarkSkipped(f"binance 커넥터 없음: {e}")
+    price_utils._exchange_info_cache = SYNTH_EXCHANGE_INFO
+    return price_utils
+
+
+def bench_adjust_price_to_tick(n):
+    price_utils = _binance_price_utils()
+    prices = synthetic_candles(n, seed=BENCH_SEED)["close"].tolist()
+
+    def run():
+        for price in prices:
+            price_utils.adjust_price_to_tick("BTCUSDT", price)
+    return run, n
+
+
+def bench_adjust_quantity_to_step(n):
+    price_utils = _binance_price_utils()
+    quantities = (350.0 / synthetic_candles(n, seed=BENCH_SEED)["close"]).tolist()
+
+    def run():
+        for quantity in quantities:
+            price_utils.adjust_quantity_to_step("BTCUSDT", quantity)
+    return run, n
+
+
+# 이름: (함수, 기본 크기). 느린 기준 경로는 크기를 작게 잡음
+BENCHMARKS = {
+    "run_simulation": (bench_run_simulation, 200_000),
+    "run_simulation_fast": (bench_run_simulation_fast, 2_000_000),
+    "phoenix_run_tick": (bench_phoenix_run_tick, 200_000),
+    "simulate_with_db": (bench_simulate_with_db, 100_000),
+    "simulate_with_db_reference": (bench_simulate_with_db_reference, 2_000),
+    "generate_buy_orders": (bench_generate_buy_orders, 2_000),
+    "generate_sell_orders": (bench_generate_sell_orders, 2_000),
+    "adjust_price_to_tick": (bench_adjust_price_to_tick, 50_000),
+    "adjust_quantity_to_step": (bench_adjust_quantity_to_step, 50_000),
+}
+
+
+# --- 3. 실행 / 저장 / 비교 ---
+def time_benchmark(fn, items, repeat=BENCH_REPEAT):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    best = min(times)
+    return {"items": items, "repeat": repeat, "best_sec": best, "mean_sec": sum(times) / len(times),
+            "sec_per_item": best / items if items else None, "items_per_sec": items / best if best > 0 else None}
+
+
+def run_benchmarks(names=None, scale=BENCH_SCALE, repeat=BENCH_REPEAT):
+    """names 의 벤치마크를 돌려 {이름: 측정 결과} 를 반환합니다. 돌릴 수 없는 항목은 {"skipped": 사유}."""
+    results = {}
+    for name in names or list(BENCHMARKS):
+        builder, size = BENCHMARKS[name]
+        n = max(1, int(size * scale))
+        try:
+            fn, items, *cleanup = builder(n)
+        except BenchmarkSkipped as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        try:
+            results[name] = time_benchmark(fn, items, repeat)
+        finally:
+            for fn_cleanup in cleanup:
+                fn_cleanup()
+    return results
+
+
+def environment_info():
+    return {"created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def save_results(results, path=None, scale=BENCH_SCALE, repeat=BENCH_REPEAT):
+    if path is None:
+        os.makedirs(BENCH_RESULT_DIR, exist_ok=True)
+        path = os.path.join(BENCH_RESULT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    payload = {"environment": environment_info(), "scale": scale, "repeat": repeat, "seed": BENCH_SEED,
+               "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_to_baseline(results, baseline, tolerance=BENCH_TOLERANCE):
+    """
+    항목당 시간(sec_per_item) 을 기준 결과와 비교합니다.
+    반환: {이름: {"ratio", "status"}} — status 는 "regression" (tolerance 이상 느려짐) / "improved" / "ok" / "new" / "skipped"
+    """
+    comparison = {}
+    for name, current in results.items():
+        base = baseline.get(name)
+        if "skipped" in current or (base is not None and "skipped" in base):
+            comparison[name] = {"ratio": None, "status": "skipped"}
+            continue
+        if base is None or not base.get("sec_per_item"):
+            comparison[name] = {"ratio": None, "status": "new"}
+            continue
+        ratio = current["sec_per_item"] / base["sec_per_item"]
+        status = "regression" if ratio > 1 + tolerance else "improved" if ratio < 1 / (1 + tolerance) else "ok"
+        comparison[name] = {"ratio": ratio, "status": status}
+    return comparison
+
+
+def format_results(results, comparison=None) -> str:
+    icons = {"regression": "🐢", "improved": "🚀", "ok": "✅", "new": "🆕", "skipped": "⏭️"}
+    lines = []
+    for name, res in results.items():
+        if "skipped" in res:
+            lines.append(f"  ⏭️ {name:<28} 건너뜀 ({res['skipped']})")
+            continue
+        line = f"  {name:<30} {res['best_sec']:9.3f}s | {res['items']:>10,}건 | {res['items_per_sec']:>14,.0f}건/s"
+        if comparison and name in comparison:
+            cmp = comparison[name]
+            ratio = f" x{cmp['ratio']:.2f}" if cmp["ratio"] is not None else ""
+            line = f"{line} | {icons[cmp['status']]} {cmp['status']}{ratio}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# --- 4. 메인 ---
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    names = BENCH_ONLY or list(BENCHMARKS)
+    print(f"⏱️ 벤치마크 시작: {len(names)}개 (크기 x{BENCH_SCALE}, 반복 {BENCH_REPEAT}회, seed {BENCH_SEED})")
+    results = run_benchmarks(names)
+    path = save_results(results)
+
+    comparison = None
+    if os.path.exists(BENCH_BASELINE):
+        comparison = compare_to_baseline(results, load_results(BENCH_BASELINE))
+        print(f"📏 기준 결과와 비교: {BENCH_BASELINE} (허용 {BENCH_TOLERANCE:.0%})")
+    print("=" * 100)
+    print(format_results(results, comparison))
+    print("=" * 100)
+    print(f"✅ 결과가 '{path}' 파일로 저장되었습니다.")
+
+    regressions = [name for name, cmp in (comparison or {}).items() if cmp["status"] == "regression"]
+    if regressions:
+        print(f"❌ 성능 회귀 {len(regressions)}건: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
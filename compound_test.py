@@ -4,7 +4,14 @@ import numpy as np
 import os
 import logging
 import itertools
+import heapq
+import copy
 from datetime import datetime, timedelta
+from manager.sim_cache import SimCache, CheckpointStore, db_fingerprint, fingerprint_last_ts
+from utils.online_stats import EquityStats, HoldingStats, format_period
+from utils.log_buffer import ColumnarLog
+from utils.instrumentation import EngineProfiler, format_report
+from utils.metrics import performance_metrics, format_metrics
 
 # --- 1. 시스템 설정 (Configuration) ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -39,6 +46,15 @@ SLIPPAGE_RATE = 0.0005
 
 # 로그 저장 옵션
 SAVE_FULL_LOG = False
+# 엔진 계측 (봇 틱 / 자산 평가 / 재투자 / 로깅 단계별 시간과 매매 이벤트 수, candles·events per sec)
+INSTRUMENT = os.getenv("COMPOUND_INSTRUMENT", "false").lower() == "true"
+
+# 결과 캐시 (같은 데이터 구간 + 같은 설정이면 저장된 최종 리포트를 재사용, SAVE_FULL_LOG 일 때는 사용 안 함)
+USE_RESULT_CACHE = True
+ENGINE_NAME = "compound_test"
+ENGINE_VERSION = "4"  # PhoenixBot / BotPool / CompoundSimulator 로직(또는 체크포인트 형식)을 바꾸면 반드시 올릴 것
+# 체크포인트 (데이터가 뒤로 늘어난 경우, 이전 실행의 종료 상태에서 새 캔들만 이어서 시뮬레이션)
+USE_CHECKPOINTS = True
 
 # --- 2. 헬퍼 함수 ---
 def _format_duration(minutes: float) -> str:
@@ -64,6 +80,12 @@ def _format_duration(minutes: float) -> str:
     
     return " ".join(parts[:3]) # 상위 3개 단위만 표시
 
+
+def _format_max_holding(holding: HoldingStats) -> str:
+    """최장 보유 기간 + 그 구간 (시작 ~ 종료 시각)."""
+    return f"{_format_duration(holding.max_duration)} ({format_period(holding.max_start, holding.max_end)})"
+
+
 def load_candles(market, start, end):
     if not os.path.exists(DB_PATH):
         logger.error(f"❌ DB 파일을 찾을 수 없습니다: {DB_PATH}")
@@ -96,10 +118,9 @@ class PhoenixBot:
         self.cooldown_until = None
         self.position_entry_time = None
         
-        # 통계용 변수
-        # (duration_minutes, start_time, end_time) 튜플을 저장
-        self.trade_history = [] 
-        self.equity_history = [initial_capital]
+        # 통계용 변수 (이력을 쌓지 않는 누적기)
+        self.holding_stats = HoldingStats()
+        self.equity_stats = EquityStats(initial_capital)
         self.sell_count = 0
 
     def get_equity(self, price):
@@ -111,7 +132,7 @@ class PhoenixBot:
     def _record_trade_duration(self, end_time):
         if self.position_entry_time:
             duration = (end_time - self.position_entry_time).total_seconds() / 60
-            self.trade_history.append((duration, self.position_entry_time, end_time))
+            self.holding_stats.add(duration, self.position_entry_time, end_time)
             self.position_entry_time = None
 
     def run_tick(self, row):
@@ -119,7 +140,7 @@ class PhoenixBot:
         action = ""
 
         current_equity = self.get_equity(close)
-        self.equity_history.append(current_equity)
+        self.equity_stats.update(now, current_equity)
 
         if self.cooldown_until and now < self.cooldown_until:
             return "COOLDOWN", 0, 0, ""
@@ -234,7 +255,7 @@ class PhoenixBot:
         return "ACTIVE", 0, 0, action
 
     def get_stats(self):
-        if not self.trade_history:
+        if not self.holding_stats.count:
             return {
                 "max_duration_str": "N/A",
                 "avg_duration_str": "N/A",
@@ -242,80 +263,497 @@ class PhoenixBot:
                 "mdd": 0
             }
 
-        # (duration, start, end) 튜플 리스트
-        durations = [t[0] for t in self.trade_history]
-        
-        # 최장 보유 기간 찾기
-        max_idx = np.argmax(durations)
-        max_duration = durations[max_idx]
-        max_start = self.trade_history[max_idx][1]
-        max_end = self.trade_history[max_idx][2]
-        
-        max_duration_str = f"{_format_duration(max_duration)} ({max_start.strftime('%Y-%m-%d %H:%M')} ~ {max_end.strftime('%Y-%m-%d %H:%M')})"
-        
-        # 평균 보유 기간
-        avg_duration = sum(durations) / len(durations)
-        avg_duration_str = _format_duration(avg_duration)
-        
-        equity_series = pd.Series(self.equity_history)
-        peak = equity_series.cummax()
-        drawdown = (equity_series - peak) / peak
-        mdd = drawdown.min() * 100 if not drawdown.empty else 0
-
         return {
-            "max_duration_str": max_duration_str,
-            "avg_duration_str": avg_duration_str,
+            "max_duration_str": _format_max_holding(self.holding_stats),
+            "avg_duration_str": _format_duration(self.holding_stats.average()),
             "sell_count": self.sell_count,
-            "mdd": mdd
+            "mdd": self.equity_stats.mdd_pct()
         }
 
+class BotList:
+    """PhoenixBot 객체 목록으로 된 봇 집합 (원본 방식, BotPool 검증용 기준 구현)."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.bots = []
+
+    def __len__(self):
+        return len(self.bots)
+
+    def spawn(self, bot_id, capital):
+        self.bots.append(PhoenixBot(bot_id, self.settings, initial_capital=capital))
+
+    def tick(self, row):
+        """모든 봇을 한 캔들 진행합니다. (리셋 확보 수익 목록, 손절 투입금 목록, 액션 문자열 목록) 을 봇 순서대로 반환."""
+        profits, injections, actions = [], [], []
+        for bot in self.bots:
+            status, profit, injection, action = bot.run_tick(row)
+            if status == "PROFIT_RESET":
+                profits.append(profit)
+            elif status == "STOP_LOSS":
+                injections.append(injection)
+            if action:
+                actions.append(action)
+        return profits, injections, actions
+
+    def equities(self, price):
+        return [bot.get_equity(price) for bot in self.bots]
+
+    def entry_timestamp(self, i):
+        return self.bots[i].position_entry_time
+
+    def bot_stats(self):
+        bot_stats = []
+        for bot in self.bots:
+            stats = bot.get_stats()
+            bot_stats.append({
+                "id": bot.id,
+                "mdd": stats['mdd'],
+                "max_dur": stats['max_duration_str'],
+                "avg_dur": stats['avg_duration_str'],
+                "sell_cnt": stats['sell_count']
+            })
+        return bot_stats
+
+    def checkpoint(self):
+        bots = []
+        for bot in self.bots:
+            bot_state = {k: v for k, v in vars(bot).items() if k != "settings"}
+            bot_state["holding_stats"] = copy.copy(bot.holding_stats)
+            bot_state["equity_stats"] = copy.copy(bot.equity_stats)
+            bots.append(bot_state)
+        return {"bots": bots}
+
+    def restore(self, state):
+        self.bots = []
+        for bot_state in state["bots"]:
+            bot = PhoenixBot.__new__(PhoenixBot)
+            vars(bot).update(bot_state)
+            bot.settings = self.settings
+            self.bots.append(bot)
+
+
+# --- 4. BotPool 클래스 (봇 전체를 배열로 한 번에 진행) ---
+COOLDOWN_NS = COOLDOWN_MINUTES * 60 * 1_000_000_000
+NEVER_NS = int(np.iinfo(np.int64).max)
+GUARD_EPS = 1e-9  # 트리거 가격 여유폭 (트리거는 후보 봇만 고르고, 실제 판정은 run_tick 과 같은 식으로 다시 계산)
+ACTION_LABELS = {1: "SL", 2: "Reset", 3: "TP", 4: "Initial", 5: "Flow"}
+
+
+class BotPool:
+    """
+    봇 상태를 봇 축 NumPy 배열(struct-of-arrays)로 보관하고, PhoenixBot.run_tick 로직을 벡터 연산으로 적용합니다.
+    봇별 연산 순서가 run_tick 과 같아서 결과가 BotList 와 일치합니다.
+      - cooldown_until / entry_time 은 epoch 나노초 (0 = 없음)
+      - 봇별 MDD 는 평가액 이력 대신 누적 고점(eq_peak)/최대 낙폭(eq_mdd)으로 매 캔들 갱신, 보유 기간은 HoldingStats
+      - 이벤트 스케줄러: 쿨다운 봇은 cooldown_until 기준 힙(wake_heap)에 넣어 두었다가 시각이 되면 깨우고,
+        보유 봇은 다음 트리거 가격(손절 저가 / 리셋 종가 / 익절 고가 / 추가매수 저가)을 등록해 두어
+        트리거에 닿은 봇만 run_tick 로직을 실행합니다. 아무 봇도 닿지 않은 캔들은 평가액만 갱신하고,
+        그동안의 최고가는 다음 실행 때 hwm 에 한 번에 반영합니다.
+      - 코호트: 배열의 한 행은 상태(이력 포함)가 완전히 같은 봇 weight 개 (id ~ id + weight - 1).
+        같은 캔들에 같은 자본으로 생성된 봇은 이후 입력(캔들)도 같아 영원히 같이 움직이므로 한 번만 계산하고,
+        봇 단위 값(평가액, 리셋 수익, 손절 투입금, 액션, 통계)은 봇 순서대로 weight 번 펼쳐서 돌려줍니다.
+        봇끼리 주고받는 상태가 없어 코호트 안에서 이력이 갈라지는 일은 없고, 상태가 다른 봇은 처음부터 다른 행입니다.
+    """
+    FLOAT_FIELDS = ("initial_capital", "cash", "qty", "avg_price", "last_buy_price", "hwm", "eq_peak", "eq_mdd")
+    INT_FIELDS = ("id", "weight", "buy_step", "cooldown_until", "entry_time", "sell_count")
+    COHORT_KEYS = ("id", "weight")  # 코호트 병합 시 비교하지 않는 필드
+
+    def __init__(self, settings, capacity=8):
+        self.settings = settings
+        self.n = 0          # 코호트(행) 수
+        self.bot_count = 0  # 봇 수 (weight 합)
+        self.arrays = {name: np.zeros(capacity) for name in self.FLOAT_FIELDS}
+        self.arrays.update({name: np.zeros(capacity, dtype=np.int64) for name in self.INT_FIELDS})
+        self.holding_stats = []  # 코호트별 보유 기간 누적기 (HoldingStats)
+        self.wake_heap = []      # (cooldown_until, 코호트 인덱스)
+
+        self.init_buy_amt = settings["UNIT_SIZE"] * settings["INITIAL_UNITS"]
+        self.init_margin = (self.init_buy_amt / settings["LEVERAGE"]) * settings["MARGIN_BUFFER"]
+        self.flow_pct = {1: settings["SMALL_FLOW_PCT"], 2: settings["LARGE_FLOW_PCT"]}
+        self.flow_amt = {1: settings["UNIT_SIZE"] * settings["SMALL_FLOW_UNITS"],
+                         2: settings["UNIT_SIZE"] * settings["LARGE_FLOW_UNITS"]}
+        self.flow_margin = {step: (amt / settings["LEVERAGE"]) * settings["MARGIN_BUFFER"]
+                            for step, amt in self.flow_amt.items()}
+        self.pending_high = 0.0
+        self._bind()
+
+    def __len__(self):
+        return self.bot_count
+
+    def _bind(self):
+        """self.cash 등을 현재 봇 수만큼의 배열 뷰로 다시 묶고, 트리거를 새로 계산합니다."""
+        for name, arr in self.arrays.items():
+            setattr(self, name, arr[:self.n])
+        self._schedule()
+
+    def spawn(self, bot_id, capital):
+        self.bot_count += 1
+        if self._join_last_cohort(bot_id, capital):
+            return
+        if self.n == len(self.arrays["cash"]):
+            self.arrays = {name: np.concatenate([arr, np.zeros_like(arr)]) for name, arr in self.arrays.items()}
+        self._apply_pending_high()
+        i = self.n
+        for arr in self.arrays.values():
+            arr[i] = 0
+        self.arrays["id"][i] = bot_id
+        self.arrays["weight"][i] = 1
+        self.arrays["initial_capital"][i] = capital
+        self.arrays["cash"][i] = capital
+        self.arrays["eq_peak"][i] = capital
+        self.holding_stats.append(HoldingStats())
+        self.n += 1
+        self._bind()
+
+    def _join_last_cohort(self, bot_id, capital):
+        """새 봇이 마지막 코호트와 상태가 완전히 같으면 (이번 캔들에 같은 자본으로 생성된 경우) 그 코호트의 weight 만 늘립니다."""
+        c = self.n - 1
+        if c < 0 or self.holding_stats[c].count or int(self.id[c] + self.weight[c]) != bot_id:
+            return False
+        fresh = {"initial_capital": capital, "cash": capital, "eq_peak": capital}
+        for name, arr in self.arrays.items():
+            if name not in self.COHORT_KEYS and arr[c] != fresh.get(name, 0):
+                return False
+        self.weight[c] += 1
+        return True
+
+    def _apply_pending_high(self, high=0.0):
+        """트리거 없이 건너뛴 캔들들(+ 이번 캔들)의 최고가를 보유 봇의 hwm 에 반영합니다."""
+        high = max(self.pending_high, high)
+        if high > 0:
+            holding = self.qty > 0
+            self.hwm[holding] = np.maximum(self.hwm[holding], high)
+        self.pending_high = 0.0
+
+    def _schedule(self):
+        """
+        상태가 바뀐 뒤 봇별 다음 트리거 가격과 이를 모은 스칼라 가드를 계산합니다.
+        가드를 하나라도 건드리는 캔들에서만 봇별 트리거를 비교해 해당 봇을 실행합니다.
+        """
+        self.quiet_equity = None
+        holding = self.qty > 0
+        threshold = self.initial_capital * STOP_LOSS_THRESHOLD
+        reset_target = self.settings["PROFIT_RESET_TARGET"]
+
+        # 무포지션인데 이번 캔들에 무언가 하는 봇 (진입, 손절, 리셋). 현금이 변하지 않으니 나머지 무포지션 봇은 깨울 필요 없음
+        flat = ~holding & (self.cooldown_until == 0)
+        busy = flat & ((self.cash >= self.init_margin) | (self.cash <= threshold))
+        if reset_target is not None:
+            busy |= flat & (self.cash >= self.initial_capital * (1 + reset_target))
+        self.busy = busy
+        self.any_busy = bool(busy.any())
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 손절: cash + (low - avg) * qty <= threshold  ⇔  low <= avg + (threshold - cash) / qty
+            sl_low = np.where(holding, self.avg_price + (threshold - self.cash) / self.qty, -np.inf)
+            self.sl_low = sl_low + np.abs(sl_low) * GUARD_EPS
+            # 리셋: cash + (close - avg) * qty >= target  ⇔  close >= avg + (target - cash) / qty
+            if reset_target is not None:
+                target_equity = self.initial_capital * (1 + reset_target)
+                reset_close = np.where(holding, self.avg_price + (target_equity - self.cash) / self.qty, np.inf)
+                self.reset_close = reset_close - np.abs(reset_close) * GUARD_EPS
+            else:
+                self.reset_close = np.full(self.n, np.inf)
+        self.tp_high = np.where(holding, self.avg_price * (1 + self.settings["TAKE_PROFIT_PCT"]), np.inf)
+
+        # 추가 매수: low <= max(hwm, last_buy_price, 이후 최고가) * (1 - pct)
+        self.flow_low = np.full(self.n, -np.inf)
+        self.flow_keep = np.zeros(self.n)
+        for step in (1, 2):
+            flow = holding & (self.buy_step == step) & (self.cash >= self.flow_margin[step])
+            keep = 1 - self.flow_pct[step]
+            self.flow_low[flow] = np.maximum(self.hwm[flow], self.last_buy_price[flow]) * keep
+            self.flow_keep[flow] = keep
+
+        self.low_guard = max(self.sl_low.max(initial=-np.inf), self.flow_low.max(initial=-np.inf))
+        self.keep_guard = self.flow_keep.max(initial=0.0)
+        self.close_guard = self.reset_close.min(initial=np.inf)
+        self.high_guard = self.tp_high.min(initial=np.inf)
+
+    def _wake_at(self):
+        return self.wake_heap[0][0] if self.wake_heap else NEVER_NS
+
+    def _equity(self, price):
+        # 무포지션 봇은 qty = avg_price = 0 이므로 cash + 0.0 = cash (get_equity 와 같은 값)
+        return self.cash + (price - self.avg_price) * self.qty
+
+    def tick(self, row):
+        """BotList.tick 과 같은 값을 반환합니다. 봇 상태 배열은 제자리에서 갱신합니다."""
+        now, high, low, close = row.timestamp, row.high, row.low, row.close
+
+        # 평가액 기록 (run_tick 첫 줄의 equity_stats.update 시점) → 봇별 MDD
+        equity = self._equity(close)
+        np.maximum(self.eq_peak, equity, out=self.eq_peak)
+        np.minimum(self.eq_mdd, (equity - self.eq_peak) / self.eq_peak, out=self.eq_mdd)
+
+        now_ns = now.value
+        running_high = max(self.pending_high, high)
+        wake = now_ns >= self._wake_at()
+        if not (self.any_busy or wake or low <= self.low_guard or low <= running_high * self.keep_guard
+                or close >= self.close_guard or high >= self.high_guard):
+            self.pending_high = running_high
+            self.quiet_equity = (close, equity)  # 상태가 그대로이므로 이번 캔들 equities(close) 에 재사용
+            return [], [], []
+
+        # 트리거에 닿은 봇 + 쿨다운이 끝난 봇만 실행 (run_tick 은 쿨다운이 끝난 캔들에 바로 로직을 이어서 실행)
+        due = (self.busy | (low <= self.sl_low) | (low <= np.maximum(self.flow_low, running_high * self.flow_keep))
+               | (close >= self.reset_close) | (high >= self.tp_high))
+        while wake and self.wake_heap and self.wake_heap[0][0] <= now_ns:
+            _, i = heapq.heappop(self.wake_heap)
+            self.cooldown_until[i] = 0
+            due[i] = True
+        self._apply_pending_high(high)
+        idx = np.flatnonzero(due)
+        result = self._step(idx, now, now_ns, high, low, close, equity[idx])
+        self._schedule()
+        return result
+
+    def _step(self, idx, now, now_ns, high, low, close, equity):
+        """idx 봇들에 run_tick 의 손절 → 리셋 → 익절 → 최초 매수 → 추가 매수를 적용합니다 (hwm 갱신은 호출 전에 끝남)."""
+        settings = self.settings
+        cash, qty, avg_price = self.cash[idx], self.qty[idx], self.avg_price[idx]
+        last_buy_price, hwm, buy_step = self.last_buy_price[idx], self.hwm[idx], self.buy_step[idx]
+        initial_capital, weight = self.initial_capital[idx], self.weight[idx]
+        actions = np.zeros(len(idx), dtype=np.int8)
+        live = np.ones(len(idx), dtype=bool)
+        holding = qty > 0
+        flow_step = np.where(holding, buy_step, 0)  # 추가 매수 단계는 이번 캔들 시작 시점 기준
+
+        def flatten(mask):
+            """매도(손절/리셋/익절) 후 포지션 초기화 + 보유 기간 기록."""
+            for j in np.flatnonzero(mask).tolist():
+                i = int(idx[j])
+                if self.entry_time[i]:
+                    start = pd.Timestamp(int(self.entry_time[i]))
+                    self.holding_stats[i].add((now - start).total_seconds() / 60, start, now)
+                self.entry_time[i] = 0
+                self.sell_count[i] += 1
+            qty[mask] = 0.0
+            avg_price[mask] = 0.0
+            buy_step[mask] = 0
+            last_buy_price[mask] = 0.0
+            hwm[mask] = 0.0
+
+        # 방어 로직 (Stop Loss & Refill)
+        equity_at_low = np.where(holding, cash + (low - avg_price) * qty, cash)
+        stop = equity_at_low <= initial_capital * STOP_LOSS_THRESHOLD
+        injections = []
+        if stop.any():
+            salvaged_equity = equity_at_low[stop] * (1 - PANIC_SELL_PENALTY)
+            injections = np.repeat(initial_capital[stop] - salvaged_equity, weight[stop]).tolist()
+            cash[stop] = initial_capital[stop]
+            flatten(stop)
+            cooldown_until = now_ns + COOLDOWN_NS
+            for i in idx[stop].tolist():
+                self.cooldown_until[i] = cooldown_until
+                heapq.heappush(self.wake_heap, (cooldown_until, i))
+            actions[stop] = 1
+            live &= ~stop
+
+        # 수익 실현 로직 (Profit Reset)
+        profits = []
+        if settings["PROFIT_RESET_TARGET"] is not None:
+            reset = live & (equity >= initial_capital * (1 + settings["PROFIT_RESET_TARGET"]))
+            if reset.any():
+                sell = reset & holding
+                revenue = qty[sell] * (close * (1 - SLIPPAGE_RATE))
+                cost = qty[sell] * avg_price[sell]
+                cash[sell] += (revenue - cost) - revenue * FEE_RATE
+                profits = np.repeat(cash[reset] - initial_capital[reset], weight[reset]).tolist()
+                cash[reset] = initial_capital[reset]
+                flatten(reset)
+                actions[reset] = 2
+                live &= ~reset
+
+        # 매도(익절) 체크
+        target_price = avg_price * (1 + settings["TAKE_PROFIT_PCT"])
+        take = live & holding & (high >= target_price)
+        if take.any():
+            revenue = qty[take] * (target_price[take] * (1 - SLIPPAGE_RATE))
+            cost = qty[take] * avg_price[take]
+            cash[take] += (revenue - cost) - revenue * FEE_RATE
+            flatten(take)
+            actions[take] = 3
+            live &= ~take
+
+        # 최초 매수
+        entry = live & ~holding & (cash >= self.init_margin)
+        if entry.any():
+            exec_price = close * (1 + SLIPPAGE_RATE)
+            cash[entry] -= self.init_buy_amt * FEE_RATE
+            qty[entry] = self.init_buy_amt / exec_price
+            avg_price[entry] = exec_price
+            last_buy_price[entry] = exec_price
+            buy_step[entry] = 1
+            hwm[entry] = exec_price
+            self.entry_time[idx[entry]] = now_ns
+            actions[entry] = 4
+
+        # 추가 매수 (1단계 Small Flow, 2단계 Large Flow)
+        for step in (1, 2):
+            flow = live & (flow_step == step)
+            if not flow.any():
+                continue
+            flow_pct = self.flow_pct[step]
+            target_base = np.where(hwm > last_buy_price * (1 + (flow_pct * 0.5)), hwm, last_buy_price)
+            flow_target = target_base * (1 - flow_pct)
+            flow &= (low <= flow_target) & (cash >= self.flow_margin[step])
+            if not flow.any():
+                continue
+            buy_amt = self.flow_amt[step]
+            exec_price = flow_target[flow] * (1 + SLIPPAGE_RATE)
+            flow_qty = buy_amt / exec_price
+            cash[flow] -= buy_amt * FEE_RATE
+            old_qty = qty[flow]
+            new_qty = old_qty + flow_qty
+            avg_price[flow] = ((old_qty * avg_price[flow]) + (flow_qty * exec_price)) / new_qty
+            qty[flow] = new_qty
+            last_buy_price[flow] = exec_price
+            buy_step[flow] = step + 1
+            hwm[flow] = exec_price
+            actions[flow] = 5
+
+        self.cash[idx], self.qty[idx], self.avg_price[idx] = cash, qty, avg_price
+        self.last_buy_price[idx], self.hwm[idx], self.buy_step[idx] = last_buy_price, hwm, buy_step
+        acted = np.flatnonzero(actions)
+        labels = [f"{ACTION_LABELS[code]} (Bot {first_id + k})"
+                  for code, first_id, count in zip(actions[acted].tolist(), self.id[idx[acted]].tolist(), weight[acted].tolist())
+                  for k in range(count)]
+        return profits, injections, labels
+
+    def equities(self, price):
+        """봇 순서대로의 평가액 목록 (코호트는 weight 번 반복)."""
+        if self.quiet_equity is not None and self.quiet_equity[0] == price:
+            equity = self.quiet_equity[1]
+        else:
+            equity = self._equity(price)
+        return np.repeat(equity, self.weight).tolist()
+
+    def entry_timestamp(self, i):
+        """i 번째 봇의 포지션 진입 시각."""
+        i = int(np.searchsorted(np.cumsum(self.weight), i, side="right"))
+        value = int(self.entry_time[i])
+        return pd.Timestamp(value) if value else None
+
+    def bot_stats(self):
+        bot_stats = []
+        for i in range(self.n):
+            holding = self.holding_stats[i]
+            if not holding.count:
+                stats = {"mdd": 0, "max_dur": "N/A", "avg_dur": "N/A", "sell_cnt": 0}
+            else:
+                stats = {
+                    "mdd": self.eq_mdd[i] * 100,
+                    "max_dur": _format_max_holding(holding),
+                    "avg_dur": _format_duration(holding.average()),
+                    "sell_cnt": int(self.sell_count[i])
+                }
+            first_id = int(self.id[i])
+            for k in range(int(self.weight[i])):
+                bot_stats.append({"id": first_id + k, **stats})
+        return bot_stats
+
+    def checkpoint(self):
+        self._apply_pending_high()
+        self._schedule()
+        return {"arrays": {name: arr[:self.n].copy() for name, arr in self.arrays.items()},
+                "holding_stats": [copy.copy(holding) for holding in self.holding_stats]}
+
+    def restore(self, state):
+        self.n = len(state["arrays"]["cash"])
+        self.bot_count = int(state["arrays"]["weight"].sum())
+        self.arrays = {name: np.concatenate([arr, np.zeros_like(arr)]) for name, arr in state["arrays"].items()}
+        self.holding_stats = [copy.copy(holding) for holding in state["holding_stats"]]
+        self.pending_high = 0.0
+        self.wake_heap = [(int(until), i) for i, until in enumerate(self.arrays["cooldown_until"][:self.n].tolist()) if until]
+        heapq.heapify(self.wake_heap)
+        self._bind()
+
+
 # --- 5. 시뮬레이터 클래스 (봇 매니저) ---
+# 상세 로그(SAVE_FULL_LOG) 열 구성 (ColumnarLog 종류). Holding_Period 는 분 단위로 저장하고 파일로 쓸 때 문자열로 변환
+FULL_LOG_COLUMNS = {"Time": "time", "Price": "float64", "Action": "signal", "Total_Equity": "float64",
+                    "Bot_Count": "int64", "Wallet": "float64", "Secured_Profit": "float64",
+                    "Total_Injected": "float64", "Holding_Period": "float64"}
+
+
 class CompoundSimulator:
-    def __init__(self, df, settings):
+    def __init__(self, df, settings, pool_cls=None, profiler=None):
         self.df = df
         self.settings = settings
         self.wallet = 0.0
-        self.bots = []
+        self.pool = (pool_cls or BotPool)(settings)
         self.total_injected = 0.0
         self.next_bot_id = 1
         self.yearly_log = []
-        self.full_log = []
-        self.total_equity_history = []
+        self.full_log = ColumnarLog(FULL_LOG_COLUMNS) if SAVE_FULL_LOG else None
+        self.equity_stats = EquityStats()  # 전체 자산 고점 / MDD / 수중 기간 (이력은 저장하지 않음)
+        # 이어서 실행(체크포인트)할 때도 이어지는 진행 상태
+        self.last_year = None
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.last_close = None
+        self.end_state = None
+        self.profiler = profiler if profiler is not None else (EngineProfiler() if INSTRUMENT else None)
 
     def spawn_bot(self):
         if self.wallet >= REINVEST_MIN_CASH:
             capital_to_deploy = min(self.wallet, INITIAL_CASH)
             self.wallet -= capital_to_deploy
-            bot = PhoenixBot(self.next_bot_id, self.settings, initial_capital=capital_to_deploy)
-            self.bots.append(bot)
-            logger.info(f"🌱 Bot Spawned! ID: {self.next_bot_id}, Capital: ${capital_to_deploy:,.2f}, Total Bots: {len(self.bots)}, Wallet Rem: ${self.wallet:,.2f}")
+            self.pool.spawn(self.next_bot_id, capital_to_deploy)
+            logger.info(f"🌱 Bot Spawned! ID: {self.next_bot_id}, Capital: ${capital_to_deploy:,.2f}, Total Bots: {len(self.pool)}, Wallet Rem: ${self.wallet:,.2f}")
             self.next_bot_id += 1
 
+    def checkpoint(self):
+        """마지막 캔들까지 처리한 시점의 상태 (봇 포함). restore() 로 되살려 이후 캔들만 이어서 돌릴 수 있습니다."""
+        return {
+            "wallet": self.wallet, "total_injected": self.total_injected, "next_bot_id": self.next_bot_id,
+            "yearly_log": list(self.yearly_log), "equity_stats": copy.copy(self.equity_stats),
+            "last_year": self.last_year, "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp, "last_close": self.last_close, "pool": self.pool.checkpoint()
+        }
+
+    def restore(self, state):
+        for key in ("wallet", "total_injected", "next_bot_id", "yearly_log", "equity_stats",
+                    "last_year", "first_timestamp", "last_timestamp", "last_close"):
+            setattr(self, key, state[key])
+        self.pool.restore(state["pool"])
+
     def run(self):
-        initial_bot = PhoenixBot(self.next_bot_id, self.settings, initial_capital=INITIAL_CASH)
-        self.bots.append(initial_bot)
-        self.next_bot_id += 1
+        if not len(self.pool):
+            self.pool.spawn(self.next_bot_id, INITIAL_CASH)
+            self.next_bot_id += 1
         
-        last_year = None
+        last_year = self.last_year
+        profiler, t = self.profiler, None
+        if profiler is not None:
+            profiler.start()
 
         for row in self.df.itertuples():
-            actions_this_tick = []
+            if profiler is not None:
+                t = profiler.sample()
             current_total_equity = self.wallet
+            profits, injections, actions_this_tick = self.pool.tick(row)
+            if profiler is not None and actions_this_tick:
+                for action in actions_this_tick:
+                    profiler.event(action.split(" (Bot ")[0], row.timestamp)
+            if t is not None:
+                t = profiler.lap("tick", t)
+            for profit in profits:
+                self.wallet += profit
+            for injection in injections:
+                self.total_injected += injection
+            for equity in self.pool.equities(row.close):
+                current_total_equity += equity
             
-            for bot in self.bots:
-                status, profit, injection, action = bot.run_tick(row)
-                if status == "PROFIT_RESET":
-                    self.wallet += profit
-                elif status == "STOP_LOSS":
-                    self.total_injected += injection
-                if action:
-                    actions_this_tick.append(action)
-                
-                current_total_equity += bot.get_equity(row.close)
-            
-            self.total_equity_history.append(current_total_equity)
+            self.equity_stats.update(row.timestamp, current_total_equity)
+            if t is not None:
+                t = profiler.lap("equity", t)
 
             while self.wallet >= REINVEST_MIN_CASH:
+                if profiler is not None:
+                    profiler.count("spawn")
                 self.spawn_bot()
 
             current_year = row.timestamp.year
@@ -323,24 +761,34 @@ class CompoundSimulator:
                 if last_year is not None:
                     self.log_yearly_performance(last_year)
                 last_year = current_year
+            if self.first_timestamp is None:
+                self.first_timestamp = row.timestamp
+            self.last_timestamp, self.last_close = row.timestamp, row.close
             
             if SAVE_FULL_LOG:
-                holding_period_minutes = None
-                if self.bots and self.bots[0].position_entry_time:
-                    holding_period_minutes = (row.timestamp - self.bots[0].position_entry_time).total_seconds() / 60
+                holding_period_minutes = np.nan
+                if len(self.pool) and self.pool.entry_timestamp(0):
+                    holding_period_minutes = (row.timestamp - self.pool.entry_timestamp(0)).total_seconds() / 60
 
                 self.full_log.append({
                     "Time": row.timestamp,
                     "Price": row.close,
                     "Action": ", ".join(actions_this_tick),
                     "Total_Equity": current_total_equity,
-                    "Bot_Count": len(self.bots),
+                    "Bot_Count": len(self.pool),
                     "Wallet": self.wallet,
                     "Secured_Profit": self.wallet,
                     "Total_Injected": self.total_injected,
-                    "Holding_Period": _format_duration(holding_period_minutes)
+                    "Holding_Period": holding_period_minutes
                 })
+            if t is not None:
+                profiler.lap("logging", t)
         
+        if profiler is not None:
+            profiler.stop(profiler.ticks)
+            print(format_report(profiler.report(), title="복리 시뮬레이션 계측"))
+        self.last_year = last_year
+        self.end_state = self.checkpoint()  # 마지막 연도 로그는 이어서 실행할 때 다시 기록되므로 그 전에 저장
         self.log_yearly_performance(last_year)
         self.print_final_report()
         
@@ -348,92 +796,70 @@ class CompoundSimulator:
             self.save_log_to_excel()
 
     def get_total_equity(self, price):
-        total_bot_equity = sum(bot.get_equity(price) for bot in self.bots)
+        total_bot_equity = sum(self.pool.equities(price))
         return total_bot_equity + self.wallet
 
     def log_yearly_performance(self, year):
-        last_day_price = self.df[self.df['timestamp'].dt.year == year].iloc[-1].close
-        total_equity = self.get_total_equity(last_day_price)
+        # 호출 시점의 last_close 가 해당 연도 마지막 캔들의 종가 (연도가 바뀐 캔들은 아직 반영 전)
+        total_equity = self.get_total_equity(self.last_close)
         
         self.yearly_log.append({
             "Year": year,
-            "Bot Count": len(self.bots),
+            "Bot Count": len(self.pool),
             "Total Equity": total_equity,
             "Secured Wallet": self.wallet,
             "Total Injected": self.total_injected
         })
-        logger.info(f"📈 Year-End {year}: Bots: {len(self.bots)}, Total Equity: ${total_equity:,.2f}")
+        logger.info(f"📈 Year-End {year}: Bots: {len(self.pool)}, Total Equity: ${total_equity:,.2f}")
 
-    def print_final_report(self):
-        last_price = self.df.iloc[-1].close
-        final_total_equity = self.get_total_equity(last_price)
+    def summarize(self):
+        """최종 리포트에 필요한 값 묶음 (결과 캐시에 그대로 저장됩니다)."""
+        final_total_equity = self.get_total_equity(self.last_close)
         total_invested = INITIAL_CASH + self.total_injected
         net_profit = final_total_equity - total_invested
         
-        num_years = (self.df.iloc[-1].timestamp - self.df.iloc[0].timestamp).days / 365.25
+        num_years = (self.last_timestamp - self.first_timestamp).days / 365.25
         
         cagr = ((final_total_equity / total_invested) ** (1 / num_years) - 1) * 100 if total_invested > 0 and num_years > 0 else 0
         simple_roi = (net_profit / total_invested) * 100 if total_invested > 0 else 0
 
-        # 전체 시스템 MDD 계산
-        equity_series = pd.Series(self.total_equity_history)
-        peak = equity_series.cummax()
-        drawdown = (equity_series - peak) / peak
-        system_mdd = drawdown.min() * 100 if not drawdown.empty else 0
-
-        print("\n" + "="*120)
-        print("📊 복리 시뮬레이션 최종 결과")
-        print("="*120)
-        print(f"  - 최종 총 자산 (Total Equity): ${final_total_equity:,.2f}")
-        print(f"  - 생성된 총 봇 개수 (Bot Count): {len(self.bots)}")
-        print(f"  - 총 추가 투입금 (Total Injected): ${self.total_injected:,.2f}")
-        print(f"  - 총 투자 원금 (Total Invested): ${total_invested:,.2f}")
-        print(f"  - 순수익 (Net Profit): ${net_profit:,.2f}")
-        print("-" * 120)
-        print(f"  - 단순 수익률 (Simple ROI): {simple_roi:.2f}%")
-        print(f"  - 연 복리 수익률 (CAGR): {cagr:.2f}%")
-        print(f"  - 시스템 최대 낙폭 (System MDD): {system_mdd:.2f}%")
-        print("="*120)
-        
-        print("\n🤖 봇별 상세 통계 (Top 5 & Bottom 5)")
-        print("-" * 120)
-        # 컬럼 너비 조정
-        print(f"{'Bot ID':<8} | {'MDD':<10} | {'Max Duration (Period)':<60} | {'Avg Duration':<15} | {'Sell Count':<10}")
-        print("-" * 120)
-        
-        bot_stats = []
-        for bot in self.bots:
-            stats = bot.get_stats()
-            bot_stats.append({
-                "id": bot.id,
-                "mdd": stats['mdd'],
-                "max_dur": stats['max_duration_str'],
-                "avg_dur": stats['avg_duration_str'],
-                "sell_cnt": stats['sell_count']
-            })
-        
-        display_bots = bot_stats[:5] + bot_stats[-5:] if len(bot_stats) > 10 else bot_stats
-        
-        for stat in display_bots:
-            print(f"{stat['id']:<8} | {stat['mdd']:>9.2f}% | {stat['max_dur']:<60} | {stat['avg_dur']:<15} | {stat['sell_cnt']:<10}")
-        
-        if len(bot_stats) > 10:
-            print(f"... (Total {len(bot_stats)} bots) ...")
-        print("="*120)
+        # 전체 시스템 MDD / 수중 기간
+        stats = self.equity_stats
+        underwater_pct = stats.underwater_ticks / stats.count * 100 if stats.count else 0
+        max_underwater_minutes = None
+        if stats.max_underwater_start is not None:
+            max_underwater_minutes = (stats.max_underwater_end - stats.max_underwater_start).total_seconds() / 60
 
-        print("\n📜 연도별 상세 로그")
-        print("-" * 120)
-        if self.yearly_log:
-            df_log = pd.DataFrame(self.yearly_log)
-            print(df_log.to_string(index=False))
-        print("="*120)
+        bot_stats = self.pool.bot_stats()
+
+        return {
+            "final_total_equity": final_total_equity,
+            "bot_count": len(self.pool),
+            "total_injected": self.total_injected,
+            "total_invested": total_invested,
+            "net_profit": net_profit,
+            "simple_roi": simple_roi,
+            "cagr": cagr,
+            "system_mdd": stats.mdd_pct(),
+            "system_mdd_period": format_period(stats.mdd_peak_time, stats.mdd_trough_time),
+            "underwater_pct": underwater_pct,
+            "max_underwater": f"{_format_duration(max_underwater_minutes)} ({format_period(stats.max_underwater_start, stats.max_underwater_end)})",
+            "total_sell_count": sum(stat["sell_cnt"] for stat in bot_stats),
+            "bot_stats": bot_stats,
+            "yearly_log": self.yearly_log
+        }
+
+    def print_final_report(self):
+        print_summary(self.summarize())
 
     def save_log_to_excel(self):
         if not self.full_log:
             logger.warning("⚠️ 상세 로그 데이터가 없어 파일을 저장하지 않습니다.")
             return
         
-        log_df = pd.DataFrame(self.full_log)
+        log_df = self.full_log.to_frame()
+        print(format_metrics(performance_metrics(log_df["Time"], log_df["Total_Equity"])))
+        log_df["Holding_Period"] = log_df["Holding_Period"].map(_format_duration)
         
         start_str = self.df.iloc[0].timestamp.strftime('%Y%m%d')
         end_str = self.df.iloc[-1].timestamp.strftime('%Y%m%d')
@@ -447,6 +873,55 @@ class CompoundSimulator:
         except Exception as e:
             logger.error(f"❌ 상세 로그 파일 저장 실패: {e}")
 
+def print_summary(summary):
+    print("\n" + "="*120)
+    print("📊 복리 시뮬레이션 최종 결과")
+    print("="*120)
+    print(f"  - 최종 총 자산 (Total Equity): ${summary['final_total_equity']:,.2f}")
+    print(f"  - 생성된 총 봇 개수 (Bot Count): {summary['bot_count']}")
+    print(f"  - 총 추가 투입금 (Total Injected): ${summary['total_injected']:,.2f}")
+    print(f"  - 총 투자 원금 (Total Invested): ${summary['total_invested']:,.2f}")
+    print(f"  - 순수익 (Net Profit): ${summary['net_profit']:,.2f}")
+    print("-" * 120)
+    print(f"  - 단순 수익률 (Simple ROI): {summary['simple_roi']:.2f}%")
+    print(f"  - 연 복리 수익률 (CAGR): {summary['cagr']:.2f}%")
+    print(f"  - 시스템 최대 낙폭 (System MDD): {summary['system_mdd']:.2f}% ({summary['system_mdd_period']})")
+    print(f"  - 고점 아래 체류 비율 (Time Under Water): {summary['underwater_pct']:.2f}%")
+    print(f"  - 최장 수중 기간 (Max Under Water): {summary['max_underwater']}")
+    print(f"  - 총 매도 횟수 (Sell Count): {summary['total_sell_count']}")
+    print("="*120)
+    
+    print("\n🤖 봇별 상세 통계 (Top 5 & Bottom 5)")
+    print("-" * 120)
+    # 컬럼 너비 조정
+    print(f"{'Bot ID':<8} | {'MDD':<10} | {'Max Duration (Period)':<60} | {'Avg Duration':<15} | {'Sell Count':<10}")
+    print("-" * 120)
+    
+    bot_stats = summary['bot_stats']
+    display_bots = bot_stats[:5] + bot_stats[-5:] if len(bot_stats) > 10 else bot_stats
+    
+    for stat in display_bots:
+        print(f"{stat['id']:<8} | {stat['mdd']:>9.2f}% | {stat['max_dur']:<60} | {stat['avg_dur']:<15} | {stat['sell_cnt']:<10}")
+    
+    if len(bot_stats) > 10:
+        print(f"... (Total {len(bot_stats)} bots) ...")
+    print("="*120)
+
+    print("\n📜 연도별 상세 로그")
+    print("-" * 120)
+    if summary['yearly_log']:
+        df_log = pd.DataFrame(summary['yearly_log'])
+        print(df_log.to_string(index=False))
+    print("="*120)
+
+
+def cache_key_settings(settings):
+    """캐시 키용 settings: 결과에 영향을 주는 모듈 상수까지 포함합니다."""
+    constants = {"INITIAL_CASH": INITIAL_CASH, "REINVEST_MIN_CASH": REINVEST_MIN_CASH,
+                 "STOP_LOSS_THRESHOLD": STOP_LOSS_THRESHOLD, "PANIC_SELL_PENALTY": PANIC_SELL_PENALTY,
+                 "COOLDOWN_MINUTES": COOLDOWN_MINUTES, "FEE_RATE": FEE_RATE, "SLIPPAGE_RATE": SLIPPAGE_RATE}
+    return dict(settings, _constants=constants)
+
 # --- 6. 메인 실행 함수 ---
 def main():
     scenario = "Full"
@@ -472,10 +947,41 @@ def main():
     print(f"▶ 재투자: Min Cash=${REINVEST_MIN_CASH:,.0f}")
     print("="*80)
 
-    df = load_candles(MARKET, start_date, end_date)
-    if not df.empty:
+    reusable = not SAVE_FULL_LOG and os.path.exists(DB_PATH)
+    cache = SimCache() if USE_RESULT_CACHE and reusable else None
+    checkpoints = CheckpointStore() if USE_CHECKPOINTS and reusable else None
+    if reusable:
+        scope = f"{MARKET}|{start_date}|{end_date}"
+        fingerprint = db_fingerprint(DB_PATH, MARKET, start_date, end_date)
+    if cache is not None:
+        summary = cache.get(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint, cache_key_settings(settings))
+        if summary is not None:
+            print("⚡ 같은 데이터·설정의 캐시된 결과를 사용합니다.")
+            print_summary(summary)
+            return
+
+    resume = None
+    if checkpoints is not None:
+        resume = checkpoints.load(ENGINE_NAME, ENGINE_VERSION, f"{MARKET}|{start_date}", cache_key_settings(settings),
+                                  end_date, lambda last_ts: db_fingerprint(DB_PATH, MARKET, start_date, last_ts))
+    if resume is not None:
+        last_ts, state = resume
+        print(f"♻️ 체크포인트({last_ts}) 이후 캔들만 이어서 시뮬레이션합니다.")
+        df = load_candles(MARKET, last_ts, end_date)
+        if not df.empty:
+            df = df[df["timestamp"] > pd.Timestamp(last_ts)].reset_index(drop=True)
+    else:
+        df = load_candles(MARKET, start_date, end_date)
+    if resume is not None or not df.empty:
         simulator = CompoundSimulator(df, settings)
+        if resume is not None:
+            simulator.restore(state)
         simulator.run()
+        if cache is not None:
+            cache.put(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint, cache_key_settings(settings), simulator.summarize())
+        if checkpoints is not None:
+            checkpoints.save(ENGINE_NAME, ENGINE_VERSION, f"{MARKET}|{start_date}", cache_key_settings(settings),
+                             fingerprint_last_ts(fingerprint), fingerprint, simulator.end_state)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
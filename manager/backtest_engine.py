@@ -0,0 +1,225 @@
+# manager/backtest_engine.py
+import numpy as np
+
+from utils.candle_arrays import CandleArrays
+
+ABORTED_UNTIL = int(np.iinfo(np.int64).max)  # 조기 중단된 상태의 cooldown_until (이어서 실행해도 다시 매매하지 않음)
+GUARD_EPS = 1e-9  # 가격 가드 여유폭 (가드는 판정 후보만 거르고, 실제 판정은 원본 식으로 다시 계산)
+NO_GUARD = (-np.inf, np.inf, np.inf)
+
+
+class EngineState:
+    """
+    BacktestEngine 의 상태 묶음 (포지션, 사다리 단계, 누적 통계).
+    target_base / flow_pct / flow_units 는 사다리 마지막 단계 이후를 반복하는 정책(원본 stress 루프)이
+    직전 캔들의 값을 그대로 재사용하므로 상태로 함께 보관합니다. 정책 고유의 상태는 extra 에 둡니다.
+    """
+    __slots__ = ("cash", "qty", "avg_price", "buy_step", "last_buy_price", "hwm", "cooldown_until", "unit_size",
+                 "target_base", "flow_pct", "flow_units",
+                 "total_injected", "secured_profit", "sl_count", "reset_count", "realized_pnl", "extra")
+
+    def __init__(self, capital=0.0):
+        self.cash = capital
+        self.qty = 0.0
+        self.avg_price = 0.0
+        self.buy_step = 0
+        self.last_buy_price = 0.0
+        self.hwm = 0.0
+        self.cooldown_until = 0  # int64 ns, 0 이면 쿨다운 없음
+        self.unit_size = 0.0     # 현재 포지션의 1 유닛 금액 (최초 진입 시 사이징 정책이 정함)
+        self.target_base = 0.0
+        self.flow_pct = 0.0
+        self.flow_units = 0.0
+        self.total_injected = 0.0
+        self.secured_profit = 0.0
+        self.sl_count = 0
+        self.reset_count = 0
+        self.realized_pnl = 0.0
+        self.extra = {}
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in EngineState.__slots__}
+        data["extra"] = dict(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls.__new__(cls)
+        for name in EngineState.__slots__:
+            setattr(state, name, data[name])
+        state.extra = dict(data["extra"])
+        return state
+
+
+class BacktestEngine:
+    """
+    손절 / 리셋 / 익절 / 진입 / 물타기 규칙을 정책 객체(manager.risk_policies) 목록으로 받아 돌리는 공통 커널.
+    정책은 목록 순서대로 평가되고, 이벤트 이름을 돌려준 정책에서 그 캔들의 처리가 끝납니다 (원본 루프의 continue).
+    보유 중에는 정책들이 알려주는 가격 가드(low 이하 / high 이상 / close 이상)를 PriceIndex 로 찾아
+    가드를 건드리는 캔들까지 바로 점프하므로, 새 정책도 guards() 만 구현하면 커널 속도로 돌아갑니다.
+    무포지션 판정은 현금과 정책 상태에만 의존해야 합니다 (아무 일도 없으면 이후 캔들도 같으므로 종료).
+    설정 축 벡터화(lockstep) 그리드 커널과 compound_test 의 BotPool 은 아직 이 엔진이 아닌 자체 구현을 씁니다.
+    """
+
+    def __init__(self, policies, capital, fee_rate, slippage_rate, leverage, margin_buffer):
+        self.policies = list(policies)
+        self.capital = capital
+        self.fee_rate = fee_rate
+        self.sell_rate = 1 - slippage_rate
+        self.buy_rate = 1 + slippage_rate
+        self.leverage = leverage
+        self.margin_buffer = margin_buffer
+        self._profiler = None
+        self._dirty = False
+
+    def new_state(self) -> EngineState:
+        state = EngineState(self.capital)
+        for policy in self.policies:
+            policy.start(self, state)
+        return state
+
+    # --- 정책이 함께 쓰는 매매 연산 (모든 전략이 같은 식을 쓰도록 한 곳에 둠) ---
+    def affordable(self, cash, buy_amt):
+        return cash >= (buy_amt / self.leverage) * self.margin_buffer
+
+    def buy(self, state, buy_amt, exec_price):
+        qty = buy_amt / exec_price
+        fee = buy_amt * self.fee_rate
+        state.cash -= fee
+        state.realized_pnl -= fee
+        if state.qty > 0:
+            new_qty = state.qty + qty
+            state.avg_price = ((state.qty * state.avg_price) + (qty * exec_price)) / new_qty
+            state.qty = new_qty
+        else:
+            state.qty, state.avg_price = qty, exec_price
+        state.last_buy_price, state.buy_step, state.hwm = exec_price, state.buy_step + 1, exec_price
+
+    def sell(self, state, exec_price):
+        revenue = state.qty * exec_price
+        cost = state.qty * state.avg_price
+        fee = revenue * self.fee_rate
+        pnl = (revenue - cost) - fee
+        state.cash += pnl
+        state.realized_pnl += pnl
+        self.flatten(state)
+        return pnl
+
+    @staticmethod
+    def flatten(state):
+        state.qty, state.avg_price = 0.0, 0.0
+        state.buy_step, state.last_buy_price, state.hwm = 0, 0.0, 0.0
+
+    def notify(self, name, now):
+        """캔들을 끝내지 않는 정책 상태 변화 (예: 하드 데크 상향). 가드를 다시 계산하고 이벤트로 기록합니다."""
+        self._dirty = True
+        if self._profiler is not None:
+            self._profiler.event(name, now)
+
+    def guards(self, state):
+        low, high, close = NO_GUARD
+        for policy in self.policies:
+            guard = policy.guards(self, state)
+            if guard is None:
+                continue
+            if guard[0] > low:
+                low = guard[0]
+            if guard[1] < high:
+                high = guard[1]
+            if guard[2] < close:
+                close = guard[2]
+        return low, high, close
+
+    # --- 커널 ---
+    def run(self, candles, state=None, start=0, stop=None, profiler=None):
+        """
+        [start, stop) 구간을 처리합니다. 앞 구간의 state 를 넘기면 이어서 실행한 결과가 전체 실행과 같습니다.
+        profiler 를 넘기면 점프 / 평가 단계 시간과 분기 횟수를 계측합니다 (평가 시간은 다음 루프 시작 시점에 마감).
+        """
+        if not isinstance(candles, CandleArrays):
+            candles = CandleArrays.from_df(candles)
+        if state is None:
+            state = self.new_state()
+        policies = self.policies
+        highs, lows, closes = candles.high, candles.low, candles.close
+        timestamps = candles.timestamp
+        n = len(timestamps) if stop is None else min(stop, len(timestamps))
+        index = candles.price_index()
+        self._profiler = profiler
+
+        i = start
+        t = None
+        guards = None  # 보유 중 가드 (low 이하, high 이상, close 이상). None 이면 다시 계산
+        if profiler is not None:
+            profiler.start()
+        while i < n:
+            if profiler is not None:
+                if t is not None:
+                    profiler.lap("evaluate", t)
+                t = profiler.sample()
+            if state.cooldown_until:
+                resume = index.index_at_or_after(state.cooldown_until, i)
+                if profiler is not None:
+                    profiler.count("cooldown_skip", min(resume, n) - i)
+                i = resume
+                if i >= n:
+                    break
+                state.cooldown_until = 0
+                continue
+
+            if state.qty > 0:
+                # 가드를 건드리는 다음 캔들까지 점프 (건너뛴 캔들에서는 hwm 만 바뀜)
+                if guards is None:
+                    guards = self.guards(state)
+                j = min(index.next_trigger(i, guards[0], guards[1], guards[2]), n)
+                if j > i:
+                    if profiler is not None:
+                        profiler.count("jumped_candles", j - i)
+                    skipped_high = index.max_high(i, j)
+                    if skipped_high > state.hwm:
+                        state.hwm = skipped_high
+                    if j >= n:
+                        break
+                    i = j
+                if t is not None:
+                    t = profiler.lap("jump", t)
+                high, low, close = highs.item(i), lows.item(i), closes.item(i)
+                if high > state.hwm:
+                    state.hwm = high
+                equity = state.cash + (low - state.avg_price) * state.qty
+            else:
+                high, low, close = highs.item(i), lows.item(i), closes.item(i)
+                state.hwm = 0.0
+                equity = state.cash
+
+            now = timestamps.item(i)
+            self._dirty = False
+            event = None
+            for policy in policies:
+                event = policy.evaluate(self, state, now, high, low, close, equity)
+                if event is not None:
+                    break
+            i += 1
+            guards = None
+            if event is not None:
+                if profiler is not None:
+                    profiler.event(event, now)
+                if state.cooldown_until == ABORTED_UNTIL:
+                    break
+            elif state.qty == 0 and not self._dirty:
+                break
+
+        if t is not None:
+            profiler.lap("evaluate", t)
+        self._profiler = None
+
+        final_equity = state.cash
+        if state.qty > 0:
+            final_equity += (closes.item(n - 1) - state.avg_price) * state.qty
+        res = {"sl_count": state.sl_count, "reset_count": state.reset_count, "total_injected": state.total_injected,
+               "secured_profit": state.secured_profit, "final_equity": final_equity,
+               "aborted": state.cooldown_until == ABORTED_UNTIL, "log_df": None, "state": state}
+        if profiler is not None:
+            profiler.stop(max(n - start, 0))
+            res["profile"] = profiler.report()
+        return res
@@ -0,0 +1,140 @@
+# manager/job_queue.py
+import json
+import time
+import sqlite3
+import logging
+
+LEASE_SECONDS = 3600   # 작업을 잡은 워커가 이 시간 안에 끝내지 못하면 다른 워커가 다시 가져갈 수 있음
+MAX_ATTEMPTS = 3       # 실패한 작업의 최대 재시도 횟수
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_key TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        worker TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_until REAL,
+        result TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        finished_at REAL
+    )
+"""
+
+
+class JobQueue:
+    """
+    공유 SQLite 파일 위의 작업 큐.
+    코디네이터는 enqueue() 로 작업을 넣고, 여러 호스트의 워커가 claim() → complete()/fail() 로 처리합니다.
+    claim 은 BEGIN IMMEDIATE 트랜잭션 안에서 이뤄지므로 같은 작업을 두 워커가 동시에 잡지 않습니다.
+    워커가 죽으면 임대(lease) 만료 후 다른 워커가 다시 가져가고, 완료된 작업은 다시 실행되지 않습니다.
+    """
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+
+    def _connect(self):
+        # isolation_level=None: 트랜잭션을 직접 BEGIN/COMMIT 으로 관리
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        return _ClosingConnection(conn)
+
+    def enqueue(self, jobs):
+        """(job_key, payload dict) 목록을 넣습니다. 이미 있는 job_key 는 건너뛰므로 여러 번 호출해도 안전합니다."""
+        now = time.time()
+        rows = [(key, json.dumps(payload), now) for key, payload in jobs]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.executemany("INSERT OR IGNORE INTO jobs (job_key, payload, created_at) VALUES (?, ?, ?)", rows)
+            after = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.execute("COMMIT")
+        return after - before
+
+    def claim(self, worker_id):
+        """
+        처리할 작업 하나를 잡아 (job_id, payload) 를 반환합니다. 남은 작업이 없으면 None.
+        대기 작업 → 같은 워커 ID 로 잡혀 있던 작업(재시작 복구) → 임대가 만료된 작업 순으로 가져갑니다.
+        워커를 죽이는 작업(OOM 등)은 fail() 이 불리지 않으므로, 다시 가져갈 때 MAX_ATTEMPTS 를 다 쓴 작업은 실패로 닫습니다.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', error = COALESCE(error, '재시도 횟수 초과 (워커 비정상 종료)'),
+                                worker = NULL, lease_until = NULL
+                WHERE status = 'running' AND attempts >= ? AND (worker = ? OR lease_until < ?)
+                """, (MAX_ATTEMPTS, worker_id, now))
+            row = conn.execute(
+                """
+                SELECT id, payload FROM jobs
+                WHERE status = 'pending'
+                   OR (status = 'running' AND attempts < ? AND (worker = ? OR lease_until < ?))
+                ORDER BY status = 'running', id
+                LIMIT 1
+                """, (MAX_ATTEMPTS, worker_id, now)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, row[0]))
+            conn.execute("COMMIT")
+        return row[0], json.loads(row[1])
+
+    def complete(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE id = ? AND status != 'done'",
+                (json.dumps(result), time.time(), job_id))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        실패 기록. 재시도 횟수가 남아 있으면 대기 상태로 되돌립니다.
+        임대가 만료돼 다른 워커가 다시 가져간 작업이면 그 워커의 실행을 건드리지 않도록 무시합니다.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                                error = ?, worker = NULL, lease_until = NULL
+                WHERE id = ? AND status = 'running' AND worker = ?
+                """, (MAX_ATTEMPTS, str(error), job_id, worker_id))
+        logging.error(f"❌ 작업 {job_id} 실패: {error}")
+
+    def counts(self):
+        """상태별 작업 수 (예: {'pending': 10, 'running': 2, 'done': 88})."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def is_finished(self):
+        counts = self.counts()
+        return counts.get("pending", 0) == 0 and counts.get("running", 0) == 0
+
+    def results(self):
+        """완료된 작업의 (job_key, payload, result) 목록 (등록 순서)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT job_key, payload, result FROM jobs WHERE status = 'done' ORDER BY id").fetchall()
+        return [(key, json.loads(payload), json.loads(result)) for key, payload, result in rows]
+
+
+class _ClosingConnection:
+    """with 블록이 끝나면 연결을 닫고, 예외 시 열린 트랜잭션을 되돌립니다."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None and self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
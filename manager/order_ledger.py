@@ -0,0 +1,59 @@
+# manager/order_ledger.py
+
+
+class OrderLedger:
+    """
+    백테스트용 매수 주문 장부. buy_log_df 와 같은 정보를 마켓별 dict 목록으로 들고,
+    전략이 매 분 묻는 값(마지막 체결가, 대기 주문 유무, 최초 매수 유닛)은 체결/등록 시점에 갱신해 두어 O(1) 로 답합니다.
+    주문 dict 의 키는 generate_buy_orders 가 만드는 행과 같습니다 (market, target_price, buy_amount, buy_type, filled, ...).
+    """
+
+    OPEN_STATES = ("update", "wait")
+    # get_last_small_flow_or_initial_price / get_last_large_flow_or_initial_price 가 보는 체결 종류
+    LAST_PRICE_TYPES = {"small": ("initial", "small_flow"), "large": ("initial", "large_flow")}
+
+    def __init__(self):
+        self.orders = {}        # market → 등록 순서대로의 주문 목록
+        self.open = {}          # market → 미체결 주문 목록 (등록 순서)
+        self.last_price = {}    # market → {"small": 가격, "large": 가격}
+        self.base_unit = {}     # market → 마지막 최초 매수 주문의 base_unit_size
+
+    def is_empty(self, market):
+        return not self.orders.get(market)
+
+    def add(self, order):
+        market = order["market"]
+        self.orders.setdefault(market, []).append(order)
+        if order["buy_type"] == "initial":
+            self.base_unit[market] = order.get("base_unit_size")
+        if order["filled"] in self.OPEN_STATES:
+            self.open.setdefault(market, []).append(order)
+        elif order["filled"] == "done":
+            self._record_fill(order)
+
+    def open_orders(self, market):
+        """미체결 주문 목록의 복사본 (순회 중에 fill 해도 안전)."""
+        return list(self.open.get(market, ()))
+
+    def has_open(self, market, buy_type):
+        return any(order["buy_type"] == buy_type for order in self.open.get(market, ()))
+
+    def fill(self, order):
+        order["filled"] = "done"
+        self.open[order["market"]].remove(order)
+        self._record_fill(order)
+
+    def _record_fill(self, order):
+        prices = self.last_price.setdefault(order["market"], {})
+        for kind, types in self.LAST_PRICE_TYPES.items():
+            if order["buy_type"] in types:
+                prices[kind] = order["target_price"]
+
+    def last_fill_price(self, market, kind):
+        """kind = "small" / "large". 해당 체결이 없으면 None."""
+        return self.last_price.get(market, {}).get(kind)
+
+    def clear(self, market):
+        """매도 완료 후 마켓의 주문 기록을 모두 지웁니다."""
+        for table in (self.orders, self.open, self.last_price, self.base_unit):
+            table.pop(market, None)
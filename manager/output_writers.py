@@ -0,0 +1,243 @@
+# manager/output_writers.py
+import logging
+
+import numpy as np
+import pandas as pd
+
+OUTPUT_MODES = ("csv", "parquet", "excel", "excel_files", "minmax", "lttb")
+EXCEL_MAX_ROWS = 1_048_576      # 시트당 최대 행 수 (헤더 포함)
+CHUNK_ROWS = 50_000             # CSV / Parquet 로 한 번에 내려쓰는 행 수
+DOWNSAMPLE_BUCKET_ROWS = 1440   # 다운샘플 버킷 크기 (1분봉 기준 하루)
+
+
+class OutputWriter:
+    """
+    시뮬레이션 로그를 행 단위로 받아 바로 내려쓰는 출력 단계의 공통 인터페이스.
+    write(row) 는 한 행(dict), close() 는 남은 행을 마저 쓰고 만든 파일 경로 목록을 반환합니다.
+    """
+
+    def write(self, row: dict):
+        raise NotImplementedError
+
+    def close(self) -> list:
+        raise NotImplementedError
+
+
+class CsvWriter(OutputWriter):
+    """CHUNK_ROWS 행씩 모아 CSV 파일 뒤에 이어 씁니다 (메모리에는 청크 하나만 유지)."""
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.chunk = []
+        self.header = True
+
+    def write(self, row):
+        self.chunk.append(row)
+        if len(self.chunk) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self.chunk and not self.header:
+            return
+        pd.DataFrame(self.chunk).to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.chunk, self.header = [], False
+
+    def close(self):
+        self._flush()
+        return [self.path]
+
+
+class ParquetWriter(OutputWriter):
+    """CHUNK_ROWS 행씩 Parquet row group 으로 씁니다 (pyarrow 필요)."""
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.chunk = []
+        self.writer = None
+
+    def write(self, row):
+        self.chunk.append(row)
+        if len(self.chunk) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self.chunk:
+            return
+        table = self.pa.Table.from_pandas(pd.DataFrame(self.chunk), preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+        self.chunk = []
+
+    def close(self):
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+        return [self.path]
+
+
+class ExcelWriter(OutputWriter):
+    """
+    openpyxl write-only 모드로 한 행씩 씁니다. 시트가 max_rows 에 닿으면
+    split="sheet" 는 같은 파일에 다음 시트를, split="file" 은 다음 파일(_part2.xlsx ...)을 엽니다.
+    """
+
+    def __init__(self, base, split="sheet", max_rows=EXCEL_MAX_ROWS):
+        import openpyxl
+        self.openpyxl = openpyxl
+        self.base = base
+        self.split = split
+        self.max_rows = max_rows
+        self.paths = []
+        self.workbook = None
+        self.sheet = None
+        self.sheet_count = 0
+        self.rows_in_sheet = 0
+        self.columns = None
+
+    def _open_sheet(self):
+        if self.workbook is None or self.split == "file":
+            self._save()
+            self.workbook = self.openpyxl.Workbook(write_only=True)
+            suffix = "" if not self.paths else f"_part{len(self.paths) + 1}"
+            self.paths.append(f"{self.base}{suffix}.xlsx")
+        self.sheet_count += 1
+        self.sheet = self.workbook.create_sheet(f"log{self.sheet_count}")
+        self.sheet.append(self.columns)
+        self.rows_in_sheet = 1
+
+    def _save(self):
+        if self.workbook is not None:
+            self.workbook.save(self.paths[-1])
+            self.workbook = None
+
+    def write(self, row):
+        if self.columns is None:
+            self.columns = list(row)
+        if self.sheet is None or self.rows_in_sheet >= self.max_rows:
+            self._open_sheet()
+        self.sheet.append([_excel_value(row.get(col)) for col in self.columns])
+        self.rows_in_sheet += 1
+
+    def close(self):
+        if self.sheet is None and self.columns is None:
+            return []
+        self._save()
+        return list(self.paths)
+
+
+def _excel_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class DownsampleWriter(OutputWriter):
+    """
+    사람이 볼 용도의 축약 곡선. value_column 기준으로 bucket_rows 행마다 대표 행만 남겨 CSV 로 이어 씁니다.
+      - "minmax": 버킷마다 최솟값 / 최댓값 행 (시간 순, 같은 행이면 하나)
+      - "lttb"  : Largest-Triangle-Three-Buckets. 직전 선택 점과 다음 버킷 평균이 이루는 삼각형 넓이가 가장 큰 점 하나.
+                  다음 버킷 평균이 필요하므로 버킷 두 개만 메모리에 둡니다. 첫 행과 마지막 행은 항상 포함
+    """
+
+    def __init__(self, path, value_column, method="minmax", bucket_rows=DOWNSAMPLE_BUCKET_ROWS):
+        if method not in ("minmax", "lttb"):
+            raise ValueError(f"method 는 minmax / lttb 중 하나여야 합니다: {method}")
+        self.out = CsvWriter(path)
+        self.value_column = value_column
+        self.method = method
+        self.bucket_rows = bucket_rows
+        self.count = 0
+        self.bucket = []        # 채우는 중인 버킷 [(x, y, row)]
+        self.pending = None     # lttb: 대표점을 아직 고르지 않은 직전 버킷
+        self.selected = None    # lttb: 마지막으로 고른 점 (x, y)
+        self.last = None
+
+    def write(self, row):
+        point = (self.count, float(row[self.value_column]), row)
+        self.count += 1
+        if self.method == "lttb" and self.selected is None:
+            self._emit(point)
+            return
+        # 꽉 찬 버킷은 다음 행이 와서 마지막 행이 아님이 확인된 뒤에 처리
+        if len(self.bucket) >= self.bucket_rows:
+            self._bucket_done()
+        self.last = point
+        self.bucket.append(point)
+
+    def _emit(self, point):
+        self.out.write(point[2])
+        self.selected = point[:2]
+
+    def _bucket_done(self):
+        bucket, self.bucket = self.bucket, []
+        if self.method == "minmax":
+            ys = [p[1] for p in bucket]
+            lo, hi = int(np.argmin(ys)), int(np.argmax(ys))
+            for k in sorted({lo, hi}):
+                self.out.write(bucket[k][2])
+            return
+        if self.pending is not None:
+            self._emit(self._pick(self.pending, _mean_point(bucket)))
+        self.pending = bucket
+
+    def _pick(self, bucket, target):
+        ax, ay = self.selected
+        tx, ty = target
+        areas = [abs((ax - tx) * (y - ay) - (ax - x) * (ty - ay)) for x, y, _ in bucket]
+        return bucket[int(np.argmax(areas))]
+
+    def close(self):
+        if self.method == "minmax":
+            if self.bucket:
+                self._bucket_done()
+        elif self.last is not None:
+            # 남은 점: pending + 채우던 버킷 (마지막 행 포함). 마지막 행은 그대로 두고 나머지에서 대표점을 고름
+            tail = self.bucket[:-1]
+            if self.pending is not None:
+                self._emit(self._pick(self.pending, _mean_point(tail) if tail else self.last[:2]))
+            if tail:
+                self._emit(self._pick(tail, self.last[:2]))
+            self._emit(self.last)
+        return self.out.close()
+
+
+def _mean_point(bucket):
+    return sum(p[0] for p in bucket) / len(bucket), sum(p[1] for p in bucket) / len(bucket)
+
+
+def make_writers(modes, base, value_column):
+    """
+    출력 모드 목록으로 writer 들을 만듭니다 (파일 이름은 base + 확장자).
+    Parquet(pyarrow) / Excel(openpyxl) 라이브러리가 없으면 경고 후 청크 CSV 로 대신 씁니다.
+    """
+    writers = []
+    for mode in modes:
+        if isinstance(mode, OutputWriter):
+            writers.append(mode)
+            continue
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"출력 모드는 {OUTPUT_MODES} 중 하나여야 합니다: {mode}")
+        try:
+            if mode == "parquet":
+                writers.append(ParquetWriter(f"{base}.parquet"))
+            elif mode in ("excel", "excel_files"):
+                writers.append(ExcelWriter(base, split="file" if mode == "excel_files" else "sheet"))
+            elif mode in ("minmax", "lttb"):
+                writers.append(DownsampleWriter(f"{base}_equity_{mode}.csv", value_column, method=mode))
+            else:
+                writers.append(CsvWriter(f"{base}.csv"))
+        except ImportError as e:
+            logging.warning(f"⚠️ '{mode}' 출력에 필요한 라이브러리가 없어 CSV 로 저장합니다: {e}")
+            if not any(isinstance(w, CsvWriter) and w.path == f"{base}.csv" for w in writers):
+                writers.append(CsvWriter(f"{base}.csv"))
+    return writers
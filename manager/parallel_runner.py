@@ -0,0 +1,92 @@
+# manager/parallel_runner.py
+import os
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.candle_arrays import CandleArrays
+
+COLUMNS = ("timestamp", "open", "high", "low", "close")  # 공유 메모리 블록 안의 배열 순서 (모두 8바이트 원소)
+
+
+class SharedCandles:
+    """
+    CandleArrays 를 하나의 shared_memory 블록에 올려 여러 프로세스가 복사 없이 읽게 합니다.
+    생성한 쪽(코디네이터)은 with 블록이 끝나면 블록을 해제하고, 워커는 attach() 로 뷰만 만듭니다.
+    """
+
+    def __init__(self, candles: CandleArrays):
+        self.n = n = len(candles)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(n * 8 * len(COLUMNS), 1))
+        for pos, col in enumerate(COLUMNS):
+            src = getattr(candles, col)
+            np.ndarray(n, dtype=src.dtype, buffer=self.shm.buf, offset=pos * n * 8)[:] = src
+
+    @property
+    def spec(self):
+        """워커에 넘기는 (블록 이름, 캔들 수). pickle 비용이 거의 없습니다."""
+        return self.shm.name, self.n
+
+    @staticmethod
+    def attach(spec):
+        """spec 으로 블록에 붙어 CandleArrays 뷰와 SharedMemory 핸들을 반환합니다 (핸들은 살아 있어야 함)."""
+        name, n = spec
+        shm = shared_memory.SharedMemory(name=name)
+        arrays = [np.ndarray(n, dtype=np.int64 if col == "timestamp" else np.float64,
+                             buffer=shm.buf, offset=pos * n * 8)
+                  for pos, col in enumerate(COLUMNS)]
+        return CandleArrays(*arrays), shm
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- 워커 프로세스 전역 (initializer 에서 한 번만 설정) ---
+_worker_candles = None
+_worker_shm = None
+
+
+def _init_worker(spec):
+    global _worker_candles, _worker_shm
+    _worker_candles, _worker_shm = SharedCandles.attach(spec)
+    _worker_candles.price_index()  # 트리거 인덱스는 워커마다 한 번만 생성
+
+
+def _run_task(args):
+    func, task = args
+    return func(_worker_candles, task)
+
+
+def default_workers():
+    """머신 코어 수에 맞춘 워커 수."""
+    return os.cpu_count() or 1
+
+
+def run_parallel(candles: CandleArrays, tasks, func, workers=None):
+    """
+    tasks 의 각 항목을 func(candles, task) 로 프로세스 풀에서 실행하고, 끝나는 순서대로 결과를 yield 합니다.
+    캔들은 공유 메모리로 한 번만 게시되고 워커는 복사 없이 같은 배열을 읽습니다.
+    func 는 모듈 최상위 함수여야 합니다 (pickle 가능).
+    """
+    workers = workers or default_workers()
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield func(candles, task)
+        return
+
+    with SharedCandles(candles) as shared:
+        with mp.Pool(processes=min(workers, len(tasks)), initializer=_init_worker,
+                     initargs=(shared.spec,)) as pool:
+            logging.info(f"🧵 병렬 실행: 워커 {min(workers, len(tasks))}개, 작업 {len(tasks)}개")
+            for result in pool.imap_unordered(_run_task, [(func, task) for task in tasks]):
+                yield result
@@ -0,0 +1,265 @@
+# manager/portfolio_engine.py
+import math
+
+import numpy as np
+
+from manager.backtest_engine import BacktestEngine, EngineState, ABORTED_UNTIL
+
+
+class PortfolioState:
+    """공유 증거금 지갑(account) + 종목별 포지션 상태. account.cash 가 지갑 잔고이고, 종목 상태의 cash 는 평가 때만 맞춰 씁니다."""
+    __slots__ = ("account", "markets")
+
+    def __init__(self, account, markets):
+        self.account = account
+        self.markets = markets
+
+    def to_dict(self):
+        return {"account": self.account.to_dict(), "markets": [state.to_dict() for state in self.markets]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(EngineState.from_dict(data["account"]), [EngineState.from_dict(d) for d in data["markets"]])
+
+
+class PortfolioEngine:
+    """
+    여러 종목을 하나의 증거금 지갑으로 함께 돌리는 백테스트 엔진.
+    종목별 매매 규칙은 종목마다의 BacktestEngine(정책 목록)이 맡고, 지갑 전체 손절은 account_stop
+    (manager.risk_policies.StopLossRefill) 을 계좌 상태에 적용합니다 (main.py 의 계좌 손절 → 전 종목 청산 → 쿨다운과 같은 구조).
+    한 분봉은 계좌 손절 판정 → 종목 순서대로 매매 판정 순이고, 앞 종목의 매매가 바꾼 잔고로 뒤 종목의 증거금을 판정합니다.
+
+    종목마다 가드를 건드리는 다음 캔들을 따로 찾아 두고, 그 사이 구간의 계좌 손절은 종목 수만큼의 배열 연산으로 판정하므로
+    이벤트가 없는 캔들은 파이썬 루프를 돌지 않습니다. 가드가 지갑 잔고에 따라 달라지는 종목(증거금 부족으로 빠진 물타기,
+    잔고가 모자라 못 한 최초 진입)만 다른 종목의 매매로 잔고가 바뀔 때 다시 계산합니다.
+    """
+
+    def __init__(self, markets, engines, capital, account_stop):
+        self.markets = list(markets)
+        self.engines = list(engines)
+        self.capital = capital
+        self.account_stop = account_stop
+
+    flatten = staticmethod(BacktestEngine.flatten)
+
+    def new_state(self) -> PortfolioState:
+        markets = []
+        for engine in self.engines:
+            state = engine.new_state()
+            state.cash = self.capital
+            markets.append(state)
+        return PortfolioState(EngineState(self.capital), markets)
+
+    # --- 계좌 단위 연산 ---
+    def _stop_account(self, state, now, equity, profiler):
+        account = state.account
+        self.account_stop.evaluate(self, account, now, 0.0, 0.0, 0.0, equity)
+        for market_state in state.markets:
+            self.flatten(market_state)
+            market_state.cash = account.cash
+        if profiler is not None:
+            profiler.event("stop_loss", now)
+
+    def _evaluate_market(self, state, k, now, high, low, close, profiler):
+        """k 번째 종목을 한 캔들 판정합니다 (지갑 잔고를 종목 상태에 맞췄다가 결과를 지갑에 반영)."""
+        account, market_state = state.account, state.markets[k]
+        market_state.cash = account.cash
+        equity = account.cash + (low - market_state.avg_price) * market_state.qty if market_state.qty > 0 else account.cash
+        event = None
+        for policy in self.engines[k].policies:
+            event = policy.evaluate(self.engines[k], market_state, now, high, low, close, equity)
+            if event is not None:
+                break
+        account.cash = market_state.cash
+        if event is not None:
+            if event == "take_profit":
+                market_state.extra["sell_count"] = market_state.extra.get("sell_count", 0) + 1
+            if profiler is not None:
+                profiler.event(f"{self.markets[k]}:{event}", now)
+        return event
+
+    def _schedule(self, k, state, indexes, seen, start, n):
+        """
+        k 번째 종목의 다음 판정 캔들과, 그 판정이 지갑 잔고에 묶여 있는지를 반환합니다.
+        잔고가 모자라 빠진 가드(예: 증거금 부족으로 못 하는 물타기)가 있으면 잔고가 바뀔 때 다시 계산해야 합니다.
+        """
+        market_state = state.markets[k]
+        if market_state.qty == 0:
+            return start, True
+        if seen[k] < start:
+            skipped_high = indexes[k].max_high(seen[k], start)
+            if skipped_high > market_state.hwm:
+                market_state.hwm = skipped_high
+            seen[k] = start
+        engine = self.engines[k]
+        market_state.cash = math.inf
+        unbounded = engine.guards(market_state)
+        market_state.cash = state.account.cash
+        guards = engine.guards(market_state)
+        return min(indexes[k].next_trigger(start, *guards), n), guards != unbounded
+
+    def _result(self, candles, state, n, profiler):
+        account = state.account
+        final_equity = account.cash
+        markets = {}
+        for market, arrays, market_state in zip(self.markets, candles, state.markets):
+            if market_state.qty > 0:
+                final_equity += (arrays.close.item(n - 1) - market_state.avg_price) * market_state.qty
+            markets[market] = {"realized_pnl": market_state.realized_pnl, "sell_count": market_state.extra.get("sell_count", 0),
+                               "final_qty": market_state.qty}
+        res = {"sl_count": account.sl_count, "total_injected": account.total_injected, "final_equity": final_equity,
+               "aborted": account.cooldown_until == ABORTED_UNTIL, "markets": markets, "state": state}
+        if profiler is not None:
+            res["profile"] = profiler.report()
+        return res
+
+    # --- 기준 루프 (분봉마다 전 종목 평가, 빠른 경로 검증용) ---
+    def run_reference(self, candles, state=None, start=0, stop=None, profiler=None):
+        if state is None:
+            state = self.new_state()
+        account = state.account
+        timestamps = candles[0].timestamp
+        n = len(timestamps) if stop is None else min(stop, len(timestamps))
+        stop_equity = self.account_stop.stop_equity(self, account)
+        if profiler is not None:
+            profiler.start()
+        for i in range(start, n):
+            now = timestamps.item(i)
+            if account.cooldown_until:
+                if now < account.cooldown_until:
+                    continue
+                account.cooldown_until = 0
+
+            equity = account.cash
+            for arrays, market_state in zip(candles, state.markets):
+                if market_state.qty > 0:
+                    equity += (arrays.low.item(i) - market_state.avg_price) * market_state.qty
+            if equity <= stop_equity:
+                self._stop_account(state, now, equity, profiler)
+                if account.cooldown_until == ABORTED_UNTIL:
+                    break
+                continue
+
+            for k, (arrays, market_state) in enumerate(zip(candles, state.markets)):
+                high, low, close = arrays.high.item(i), arrays.low.item(i), arrays.close.item(i)
+                if market_state.qty > 0:
+                    if high > market_state.hwm:
+                        market_state.hwm = high
+                else:
+                    market_state.hwm = 0.0
+                self._evaluate_market(state, k, now, high, low, close, profiler)
+        if profiler is not None:
+            profiler.stop(max(n - start, 0))
+        return self._result(candles, state, n, profiler)
+
+    # --- 커널 ---
+    def _first_account_stop(self, candles, indexes, state, lo, hi, stop_equity):
+        """[lo, hi) 에서 계좌 손절 조건(저가 기준 평가액 <= stop_equity)을 처음 만족하는 캔들. 없으면 None."""
+        cash = state.account.cash
+        held = [(k, s.qty, s.avg_price) for k, s in enumerate(state.markets) if s.qty > 0]
+        if not held:
+            return lo if cash <= stop_equity else None
+        # 종목별 구간 최저가로 잡은 하한이 손절선 위면 구간 전체가 안전
+        bound = cash
+        for k, qty, avg_price in held:
+            bound += (-indexes[k].low_neg.range_max(lo, hi) - avg_price) * qty
+        if bound > stop_equity:
+            return None
+        equity = np.full(hi - lo, cash)
+        for k, qty, avg_price in held:
+            equity += (candles[k].low[lo:hi] - avg_price) * qty
+        hit = equity <= stop_equity
+        j = int(hit.argmax())
+        return lo + j if hit[j] else None
+
+    def run(self, candles, state=None, start=0, stop=None, profiler=None):
+        """
+        candles 는 align_candles 로 맞춘 종목별 CandleArrays (markets 순서). [start, stop) 구간을 처리하고,
+        앞 구간의 state 를 넘기면 이어서 실행한 결과가 전체 실행과 같습니다. 결과는 run_reference 와 같습니다.
+        """
+        if state is None:
+            state = self.new_state()
+        account, market_states = state.account, state.markets
+        timestamps = candles[0].timestamp
+        n = len(timestamps) if stop is None else min(stop, len(timestamps))
+        indexes = [arrays.price_index() for arrays in candles]
+        stop_equity = self.account_stop.stop_equity(self, account)
+        m = len(candles)
+
+        i = start
+        next_at = [None] * m     # 종목별 다음 판정 캔들 (None 이면 다시 계산)
+        cash_bound = [False] * m  # 판정 일정이 지갑 잔고에 묶인 종목 (잔고가 바뀌면 다시 계산)
+        seen = [start] * m       # 종목별 hwm 을 반영한 캔들 (미만)
+        if profiler is not None:
+            profiler.start()
+        while i < n:
+            if account.cooldown_until:
+                resume = indexes[0].index_at_or_after(account.cooldown_until, i)
+                if profiler is not None:
+                    profiler.count("cooldown_skip", min(resume, n) - i)
+                i = resume
+                if i >= n:
+                    break
+                account.cooldown_until = 0
+                next_at, seen = [None] * m, [i] * m
+                continue
+
+            for k in range(m):
+                if next_at[k] is None:
+                    next_at[k], cash_bound[k] = self._schedule(k, state, indexes, seen, i, n)
+            j = min(next_at)
+            if profiler is not None and j > i:
+                profiler.count("jumped_candles", j - i)
+
+            # 다음 매매 캔들까지 포지션과 잔고가 고정이므로 계좌 손절을 구간 단위로 판정 (j 캔들도 손절 판정이 먼저)
+            hit = self._first_account_stop(candles, indexes, state, i, min(j + 1, n), stop_equity)
+            if hit is not None:
+                equity = account.cash
+                for arrays, market_state in zip(candles, market_states):
+                    if market_state.qty > 0:
+                        equity += (arrays.low.item(hit) - market_state.avg_price) * market_state.qty
+                self._stop_account(state, timestamps.item(hit), equity, profiler)
+                if account.cooldown_until == ABORTED_UNTIL:
+                    break
+                i = hit + 1
+                next_at, seen = [None] * m, [i] * m
+                continue
+            if j >= n:
+                break
+
+            now = timestamps.item(j)
+            for k in range(m):
+                if next_at[k] != j:
+                    continue
+                arrays, market_state = candles[k], market_states[k]
+                high, low, close = arrays.high.item(j), arrays.low.item(j), arrays.close.item(j)
+                if market_state.qty > 0:
+                    skipped_high = indexes[k].max_high(seen[k], j + 1)
+                    if skipped_high > market_state.hwm:
+                        market_state.hwm = skipped_high
+                else:
+                    market_state.hwm = 0.0
+                seen[k] = j + 1
+                cash = account.cash
+                event = self._evaluate_market(state, k, now, high, low, close, profiler)
+                # 무포지션 판정은 잔고에만 의존하므로, 아무 일도 없었으면 잔고가 바뀔 때까지 건너뜀
+                next_at[k] = n if event is None and market_state.qty == 0 else None
+                if account.cash != cash:
+                    # 잔고에 묶인 종목: 같은 캔들에서 뒤 순서 종목은 이 캔들부터, 앞 순서 종목은 다음 캔들부터 다시 판정
+                    for k2 in range(m):
+                        if k2 != k and cash_bound[k2] and next_at[k2] is not None:
+                            if k2 > k:
+                                next_at[k2], cash_bound[k2] = self._schedule(k2, state, indexes, seen, j, n)
+                            else:
+                                next_at[k2] = None
+            i = j + 1
+
+        # 판정하지 않고 지나간 구간의 hwm 반영 (이어서 실행할 때 같은 상태가 되도록)
+        for k, market_state in enumerate(market_states):
+            if market_state.qty > 0 and seen[k] < n:
+                skipped_high = indexes[k].max_high(seen[k], n)
+                if skipped_high > market_state.hwm:
+                    market_state.hwm = skipped_high
+        if profiler is not None:
+            profiler.stop(max(n - start, 0))
+        return self._result(candles, state, n, profiler)
@@ -0,0 +1,248 @@
+# manager/risk_policies.py
+"""
+BacktestEngine 에 끼워 쓰는 리스크 / 사이징 정책.
+각 정책은 evaluate() 로 한 캔들을 원본 루프와 같은 식으로 판정하고(이벤트 이름을 돌려주면 그 캔들 처리 종료),
+guards() 로 보유 중 판정이 바뀔 수 있는 가격 가드 (low 이하, high 이상, close 이상) 를 알려줍니다.
+가드는 후보 캔들만 고르는 용도라 넉넉해도 되지만, 판정이 바뀌는 캔들을 빠뜨리면 안 됩니다.
+"""
+import math
+
+from manager.backtest_engine import ABORTED_UNTIL, GUARD_EPS
+
+MINUTE_NS = 60 * 1_000_000_000
+
+
+class Policy:
+    def start(self, engine, state):
+        """새 실행의 초기 상태를 준비합니다 (정책 고유 상태는 state.extra 에)."""
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        """now 는 int64 ns, equity 는 저가 기준 평가액. 캔들을 끝내는 이벤트가 있으면 그 이름을 반환합니다."""
+        return None
+
+    def guards(self, engine, state):
+        """보유 중 가격 가드 (low 이하, high 이상, close 이상). 보유 중 판정이 없으면 None."""
+        return None
+
+
+# --- 1. 손절 ---
+class StopLossRefill(Policy):
+    """
+    저가 기준 평가액이 capital * threshold 이하가 되면 penalty 만큼 손해 보고 청산한 뒤, capital 까지 다시 채우고
+    cooldown_minutes 동안 매매를 쉽니다. 손절 횟수 / 누적 투입금이 상한을 넘으면 실행을 조기 중단합니다.
+    """
+
+    def __init__(self, threshold, penalty, cooldown_minutes, max_sl_count=None, max_injected=None):
+        self.threshold = threshold
+        self.salvage_rate = 1 - penalty
+        self.cooldown_ns = cooldown_minutes * MINUTE_NS
+        self.max_sl_count = math.inf if max_sl_count is None else max_sl_count
+        self.max_injected = math.inf if max_injected is None else max_injected
+
+    def stop_equity(self, engine, state):
+        return engine.capital * self.threshold
+
+    def on_stop(self, engine, state):
+        pass
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        if equity > self.stop_equity(engine, state):
+            return None
+        state.sl_count += 1
+        salvaged_equity = equity * self.salvage_rate
+        needed = engine.capital - salvaged_equity
+        if needed > 0:
+            state.total_injected += needed
+        state.realized_pnl += (salvaged_equity - state.cash)
+        state.cash = engine.capital
+        engine.flatten(state)
+        state.cooldown_until = now + self.cooldown_ns
+        self.on_stop(engine, state)
+        if state.sl_count > self.max_sl_count or state.total_injected > self.max_injected:
+            state.cooldown_until = ABORTED_UNTIL
+        return "stop_loss"
+
+    def guards(self, engine, state):
+        sl_guard = state.avg_price + (self.stop_equity(engine, state) - state.cash) / state.qty
+        return sl_guard + abs(sl_guard) * GUARD_EPS, math.inf, math.inf
+
+
+class StepUpHardDeck(StopLossRefill):
+    """
+    계단식 하드 데크: 저가 기준 평가액이 capital * trigger 에 닿으면 손절선을 capital * lock 으로 올립니다.
+    levels 는 (trigger, lock) 을 오름차순으로, 한 캔들에 한 단계씩 올라갑니다. 손절하면 처음 손절선으로 돌아갑니다.
+    """
+
+    def __init__(self, threshold, penalty, cooldown_minutes, levels, **limits):
+        super().__init__(threshold, penalty, cooldown_minutes, **limits)
+        self.levels = list(levels)
+
+    def start(self, engine, state):
+        state.extra["step_level"] = 0
+        state.extra["hard_deck"] = engine.capital * self.threshold
+
+    def stop_equity(self, engine, state):
+        return state.extra["hard_deck"]
+
+    def on_stop(self, engine, state):
+        self.start(engine, state)
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        level = state.extra["step_level"]
+        for k, (trigger, lock) in enumerate(self.levels):
+            if level < k + 1 and equity >= engine.capital * trigger:
+                state.extra["step_level"] = k + 1
+                state.extra["hard_deck"] = engine.capital * lock
+                engine.notify("level_up", now)
+                break
+        return super().evaluate(engine, state, now, high, low, close, equity)
+
+    def guards(self, engine, state):
+        low, _, _ = super().guards(engine, state)
+        level = state.extra["step_level"]
+        if level >= len(self.levels):
+            return low, math.inf, math.inf
+        # 저가 평가액이 다음 trigger 에 닿으려면 적어도 고가가 그 가격 이상이어야 함
+        level_guard = state.avg_price + (engine.capital * self.levels[level][0] - state.cash) / state.qty
+        return low, level_guard - abs(level_guard) * GUARD_EPS, math.inf
+
+
+# --- 2. 수익 실현 ---
+class ProfitReset(Policy):
+    """종가 기준 평가액이 capital * (1 + target) 이상이면 전량 정리하고, capital 초과분을 수익으로 확보합니다."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        target_equity = engine.capital * (1 + self.target)
+        current_eval_equity = state.cash + ((close - state.avg_price) * state.qty) if state.qty > 0 else state.cash
+        if current_eval_equity < target_equity:
+            return None
+        state.reset_count += 1
+        if state.qty > 0:
+            engine.sell(state, close * engine.sell_rate)
+        profit = state.cash - engine.capital
+        if profit > 0:
+            state.secured_profit += profit
+        state.cash = engine.capital
+        engine.flatten(state)
+        return "profit_reset"
+
+    def guards(self, engine, state):
+        reset_guard = state.avg_price + (engine.capital * (1 + self.target) - state.cash) / state.qty
+        return -math.inf, math.inf, reset_guard - abs(reset_guard) * GUARD_EPS
+
+
+class TakeProfit(Policy):
+    """고가가 평단가 * (1 + pct) 에 닿으면 그 가격에 전량 익절합니다."""
+
+    def __init__(self, pct):
+        self.pct = pct
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        if state.qty > 0:
+            target_price = state.avg_price * (1 + self.pct)
+            if high >= target_price:
+                engine.sell(state, target_price * engine.sell_rate)
+                return "take_profit"
+        return None
+
+    def guards(self, engine, state):
+        return -math.inf, state.avg_price * (1 + self.pct), math.inf
+
+
+# --- 3. 사이징 / 진입 ---
+class FixedUnit:
+    """1 유닛 = 고정 금액."""
+
+    def __init__(self, unit_size):
+        self.unit_size = unit_size
+
+    def entry_unit(self, state, equity):
+        return self.unit_size
+
+
+class EquityRatioUnit:
+    """1 유닛 = 진입 시점 평가액 * ratio (포지션이 끝날 때까지 유지)."""
+
+    def __init__(self, ratio):
+        self.ratio = ratio
+
+    def entry_unit(self, state, equity):
+        return equity * self.ratio
+
+
+class InitialEntry(Policy):
+    """무포지션이면 sizing 이 정한 유닛 * units 만큼 종가에 최초 매수합니다 (증거금이 모자라면 건너뜀)."""
+
+    def __init__(self, units, sizing):
+        self.units = units
+        self.sizing = sizing
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        if state.qty != 0:
+            return None
+        unit_size = self.sizing.entry_unit(state, equity)
+        buy_amt = unit_size * self.units
+        if not engine.affordable(state.cash, buy_amt):
+            return None
+        state.unit_size = unit_size
+        engine.buy(state, buy_amt, close * engine.buy_rate)
+        return "initial_buy"
+
+
+# --- 4. 추가 매수 사다리 ---
+class FlowLadder(Policy):
+    """
+    직전 매수가 대비 rungs[단계] 의 (하락폭, 유닛) 만큼 내려오면 추가 매수합니다.
+    rebalance 면 보유 중 고점(HWM)이 직전 매수가 * (1 + 하락폭 / 2) 를 넘을 때 HWM 기준으로 타겟을 올립니다.
+    repeat_last 면 마지막 단계 이후에도 직전 캔들의 기준가 / 하락폭으로 계속 추가 매수합니다 (원본 stress 루프 동작).
+    """
+
+    def __init__(self, rungs, rebalance=True, repeat_last=False):
+        self.rungs = list(rungs)
+        self.rebalance = rebalance
+        self.repeat_last = repeat_last
+
+    def _rung(self, state):
+        """(하락폭, 유닛, 기준가). 더 살 단계가 없으면 None."""
+        if 0 < state.buy_step <= len(self.rungs):
+            flow_pct, flow_units = self.rungs[state.buy_step - 1]
+            return flow_pct, flow_units, state.last_buy_price
+        if state.buy_step > 0 and self.repeat_last:
+            return state.flow_pct, state.flow_units, state.target_base
+        return None
+
+    def evaluate(self, engine, state, now, high, low, close, equity):
+        if state.qty <= 0:
+            return None
+        rung = self._rung(state)
+        if rung is None:
+            return None
+        flow_pct, flow_units, target_base = rung
+        if self.rebalance and state.hwm > state.last_buy_price * (1 + (flow_pct * 0.5)):
+            target_base = state.hwm
+        state.target_base, state.flow_pct, state.flow_units = target_base, flow_pct, flow_units
+        target_price = target_base * (1 - flow_pct)
+        if low <= target_price:
+            buy_amt = state.unit_size * flow_units
+            if engine.affordable(state.cash, buy_amt):
+                engine.buy(state, buy_amt, target_price * engine.buy_rate)
+                return "flow_buy"
+        return None
+
+    def guards(self, engine, state):
+        rung = self._rung(state)
+        if rung is None:
+            return None
+        flow_pct, flow_units, static_base = rung
+        if not engine.affordable(state.cash, state.unit_size * flow_units):
+            return None
+        flow_thr = state.last_buy_price * (1 + (flow_pct * 0.5))
+        if not self.rebalance:
+            return static_base * (1 - flow_pct), math.inf, math.inf
+        if state.hwm > flow_thr:
+            # 고점이 더 오르면 타겟도 같이 오르므로 새 고점 캔들마다 다시 판정
+            return state.hwm * (1 - flow_pct), state.hwm, math.inf
+        return static_base * (1 - flow_pct), flow_thr, math.inf
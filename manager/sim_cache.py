@@ -0,0 +1,181 @@
+# manager/sim_cache.py
+import os
+import json
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import logging
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_PATH = os.path.join(PROJECT_ROOT, "db", "sim_cache.sqlite")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sim_results (
+        engine TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        settings_hash TEXT NOT NULL,
+        version TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        settings TEXT NOT NULL,
+        result TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (engine, scope, settings_hash)
+    )
+"""
+
+CHECKPOINT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sim_checkpoints (
+        engine TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        settings_hash TEXT NOT NULL,
+        last_ts TEXT NOT NULL,
+        version TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        state BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (engine, scope, settings_hash, last_ts)
+    )
+"""
+
+
+def _to_json(obj):
+    """numpy 스칼라/Timestamp 등 json 이 모르는 값 변환."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def settings_hash(settings):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=_to_json).encode()).hexdigest()
+
+
+def db_fingerprint(db_path, market, start, end):
+    """
+    DB 의 캔들 구간 지문 (행 수, 최소/최대 timestamp, 가격 합계 체크섬).
+    캔들을 읽지 않고 집계 쿼리 한 번으로 계산하므로, 캐시가 맞으면 데이터 로드 자체를 건너뛸 수 있습니다.
+    """
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*), MIN(timestamp), MAX(timestamp), TOTAL(open), TOTAL(high), TOTAL(low), TOTAL(close)
+            FROM minute_candles WHERE market = ? AND timestamp BETWEEN ? AND ?
+            """, (market, start, end)).fetchone()
+    count, min_ts, max_ts, *totals = row
+    return f"{count}|{min_ts}|{max_ts}|" + ":".join(repr(t) for t in totals)
+
+
+def fingerprint_last_ts(fingerprint):
+    """db_fingerprint 에 담긴 마지막 캔들 timestamp (DB 표기 그대로). 체크포인트 키로 사용합니다."""
+    return fingerprint.split("|")[2]
+
+
+def arrays_fingerprint(candles):
+    """메모리에 올라온 CandleArrays 의 지문 (행 수, 최소/최대 timestamp, crc32)."""
+    n = len(candles)
+    if n == 0:
+        return "0||"
+    crc = 0
+    for col in (candles.timestamp, candles.open, candles.high, candles.low, candles.close):
+        crc = zlib.crc32(col.data, crc)
+    return f"{n}|{candles.timestamp.item(0)}|{candles.timestamp.item(n - 1)}|{crc:08x}"
+
+
+class SimCache:
+    """
+    시뮬레이션 결과 디스크 캐시.
+    키 = (엔진, 구간 scope, settings 해시) 이고, 엔진 버전이나 캔들 지문이 바뀐 항목은 조회 시 삭제됩니다.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(SCHEMA)
+        self._checked = set()
+
+    def evict_stale(self, engine, version, scope, fingerprint):
+        """같은 엔진·구간에서 버전 또는 데이터 지문이 다른 항목을 지웁니다. 지운 개수를 반환합니다."""
+        with sqlite3.connect(self.path, timeout=60) as conn:
+            removed = conn.execute(
+                "DELETE FROM sim_results WHERE engine = ? AND scope = ? AND (version != ? OR fingerprint != ?)",
+                (engine, scope, version, fingerprint)).rowcount
+        if removed:
+            logging.info(f"🧹 캐시 무효화: {engine} [{scope}] 항목 {removed}개 삭제 (데이터/엔진 변경)")
+        return removed
+
+    def get(self, engine, version, scope, fingerprint, settings):
+        key = (engine, version, scope, fingerprint)
+        if key not in self._checked:
+            self.evict_stale(engine, version, scope, fingerprint)
+            self._checked.add(key)
+        with sqlite3.connect(self.path, timeout=60) as conn:
+            row = conn.execute(
+                "SELECT result FROM sim_results WHERE engine = ? AND scope = ? AND settings_hash = ? "
+                "AND version = ? AND fingerprint = ?",
+                (engine, scope, settings_hash(settings), version, fingerprint)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, engine, version, scope, fingerprint, settings, result):
+        self.put_many(engine, version, scope, fingerprint, [(settings, result)])
+
+    def put_many(self, engine, version, scope, fingerprint, items):
+        """(settings, result) 목록을 한 트랜잭션으로 저장합니다."""
+        now = time.time()
+        rows = [(engine, scope, settings_hash(settings), version, fingerprint,
+                 json.dumps(settings, sort_keys=True, default=_to_json),
+                 json.dumps(result, default=_to_json), now) for settings, result in items]
+        with sqlite3.connect(self.path, timeout=60) as conn:
+            conn.executemany("INSERT OR REPLACE INTO sim_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+class CheckpointStore:
+    """
+    시뮬레이션 종료 상태(체크포인트) 저장소. 결과 캐시와 같은 DB 파일을 씁니다.
+    키 = (엔진, 시작 시점 scope, settings 해시, 마지막 캔들 timestamp(DB 표기 그대로)) 이고,
+    지문은 [시작, last_ts] 구간의 db_fingerprint 입니다. 데이터가 뒤로 늘어나기만 했다면 지문이 그대로이므로
+    저장된 상태에서 새 캔들만 이어서 돌리면 처음부터 다시 돌린 것과 같은 결과가 나옵니다.
+    상태는 엔진 클래스가 아닌 dict/list 로 저장합니다 (스크립트가 바뀌어도 pickle 이 깨지지 않도록).
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(CHECKPOINT_SCHEMA)
+
+    def load(self, engine, version, scope, settings, end_ts, fingerprint_fn):
+        """
+        last_ts <= end_ts 인 가장 최근 체크포인트를 (last_ts, state) 로 반환합니다. 없으면 None.
+        fingerprint_fn(last_ts) 가 저장 당시 지문과 다르면 (과거 데이터 수정) 그 체크포인트는 삭제하고 이전 것을 찾습니다.
+        """
+        key = (engine, scope, settings_hash(settings))
+        with sqlite3.connect(self.path, timeout=60) as conn:
+            conn.execute("DELETE FROM sim_checkpoints WHERE engine = ? AND scope = ? AND settings_hash = ? "
+                         "AND version != ?", (*key, version))
+            rows = conn.execute(
+                "SELECT last_ts, fingerprint, state FROM sim_checkpoints "
+                "WHERE engine = ? AND scope = ? AND settings_hash = ? AND last_ts <= ? ORDER BY last_ts DESC",
+                (*key, end_ts)).fetchall()
+            for last_ts, fingerprint, state in rows:
+                if fingerprint_fn(last_ts) == fingerprint:
+                    return last_ts, pickle.loads(state)
+                conn.execute("DELETE FROM sim_checkpoints WHERE engine = ? AND scope = ? AND settings_hash = ? "
+                             "AND last_ts = ?", (*key, last_ts))
+                logging.info(f"🧹 체크포인트 무효화: {engine} [{scope}] last_ts={last_ts} (데이터 변경)")
+        return None
+
+    def save(self, engine, version, scope, settings, last_ts, fingerprint, state):
+        self.save_many(engine, version, scope, [(settings, last_ts, fingerprint, state)])
+
+    def save_many(self, engine, version, scope, items):
+        """(settings, last_ts, fingerprint, state) 목록을 한 트랜잭션으로 저장합니다."""
+        now = time.time()
+        rows = [(engine, scope, settings_hash(settings), str(last_ts), version, fingerprint,
+                 pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), now)
+                for settings, last_ts, fingerprint, state in items]
+        with sqlite3.connect(self.path, timeout=60) as conn:
+            conn.executemany("INSERT OR REPLACE INTO sim_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
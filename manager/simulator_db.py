@@ -2,7 +2,14 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime
-from strategy.casino_strategy import generate_buy_orders, generate_sell_orders
+from strategy.casino_strategy import generate_buy_orders, generate_sell_orders, decide_buy_orders
+from manager.sim_cache import SimCache, db_fingerprint
+from manager.output_writers import make_writers
+from manager.order_ledger import OrderLedger
+from manager.trading_context import simulation_context
+from utils.online_stats import EquityStats
+from utils.instrumentation import EngineProfiler, format_report
+import config
 import os
 import logging
 import numpy as np
@@ -12,6 +19,19 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DB_PATH = os.path.join(PROJECT_ROOT, "db", "candle_db.sqlite")
 
+ENGINE_NAME = "simulate_with_db"
+ENGINE_VERSION = "1"  # simulate_with_db 또는 casino_strategy 의 매매 로직을 바꾸면 반드시 올릴 것
+
+# 분 단위 상세 로그 출력 방식 (manager/output_writers.OUTPUT_MODES 중 여러 개 가능, 모두 실행 중에 바로 내려씀)
+#   "csv" 청크 CSV / "parquet" (pyarrow 필요) / "excel" 시트 분할 / "excel_files" 파일 분할 / "minmax"·"lttb" 축약 자산 곡선
+OUTPUT_MODES = ["excel"]
+
+# True 면 buy_log_df(DataFrame) 대신 OrderLedger 로 주문을 관리하는 빠른 경로 사용
+# (매수 판단은 두 경로 모두 casino_strategy.decide_buy_orders 를 부르므로 매매 결과는 동일)
+FAST_MODE = os.getenv("SIM_FAST_MODE", "true").lower() == "true"
+# True 면 단계별(strategy / fill / sell / logging) 시간과 체결 횟수를 계측해 요약과 함께 출력
+INSTRUMENT = os.getenv("SIM_INSTRUMENT", "false").lower() == "true"
+
 
 def _format_duration(minutes: int) -> str:
     # (이전 단계에서 추가한 헬퍼 함수 - 변경 없음)
@@ -52,11 +72,32 @@ def simulate_with_db(
         # --- 👇👇👇 2. 파라미터 3개 추가 (기본값 설정) 👇👇👇 ---
         initial_cash: float = 60_000.0,
         buy_fee: float = 0.0005,
-        sell_fee: float = 0.0005
+        sell_fee: float = 0.0005,
         # --- 👆👆👆 2. 파라미터 추가 완료 ---
+        use_cache: bool = True,
+        outputs: list = None,
+        fast: bool = None,
+        profiler: EngineProfiler = None
 ):
     logging.info(f"--- ⏱️ DB 기반 백테스트 시작: {market}, 기간: {start} ~ {end} ---")
 
+    # 같은 데이터 구간 + 같은 설정으로 이미 돌린 결과가 있으면 요약을 바로 반환 (상세 로그 파일은 이전 실행의 것)
+    cache = SimCache() if use_cache and os.path.exists(DB_PATH) else None
+    if cache is not None:
+        scope = f"{market}|{start}|{end}"
+        fingerprint = db_fingerprint(DB_PATH, market, start, end)
+        cache_settings = {
+            "unit_size": unit_size, "small_flow_pct": small_flow_pct, "small_flow_units": small_flow_units,
+            "large_flow_pct": large_flow_pct, "large_flow_units": large_flow_units,
+            "take_profit_pct": take_profit_pct, "leverage": leverage, "initial_cash": initial_cash,
+            "buy_fee": buy_fee, "sell_fee": sell_fee, "margin_buffer_factor": config.MARGIN_BUFFER_FACTOR
+        }
+        summary = cache.get(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint, cache_settings)
+        if summary is not None:
+            logging.info(f"⚡ 캐시된 결과 사용 (상세 로그: {summary['log_file']})")
+            _print_summary(summary)
+            return summary
+
     df_candles = load_candles_from_db(market, start, end)
     if df_candles.empty:
         logging.warning("⚠️ 캔들 데이터가 없습니다. 백테스트를 종료합니다.")
@@ -73,40 +114,74 @@ def simulate_with_db(
     cash = initial_cash
     # --- 👆 3. ---
 
+    # 전략 코드가 실거래 HWM 파일 / 텔레그램을 건드리지 않도록 실행마다 독립된 메모리 컨텍스트 사용
+    context = simulation_context(start=df_candles["시간"].iloc[0])
     holdings = {}
     buy_log_df = pd.DataFrame(
         columns=["time", "market", "target_price", "buy_amount", "buy_units", "buy_type", "buy_uuid", "filled"])
     sell_log_df = pd.DataFrame(columns=["market", "target_price", "sell_amount", "sell_uuid", "filled"])
     realized_pnl, cumulative_fee = 0.0, 0.0
     total_buy_info = {'amount': 0.0, 'volume': 0.0}
-    logs = []
+
+    # 로그는 메모리에 쌓지 않고 writer 로 바로 내려쓰고, 요약에 필요한 값만 누적
+    base_name = f"DB_시뮬_{market}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    writers = make_writers(outputs or OUTPUT_MODES, base_name, "총 포트폴리오 값")
+    run_stats = {"rows": 0, "first_value": None, "last": None, "max_holding": 0, "max_units": 0.0,
+                 "equity": EquityStats()}
 
     current_holding_minutes = 0
     current_units_held = 0.0
     total_sell_trades = 0
     progress_interval = len(df_candles) // 10 or 1
 
-    for i, row in df_candles.iterrows():
+    # 빠른 경로: 캔들은 열 단위로 순회하고, 주문은 OrderLedger 에 dict 로 보관 (DataFrame concat / iterrows 없음)
+    fast = FAST_MODE if fast is None else fast
+    ledger = OrderLedger() if fast else None
+    fast_setting = setting_df.iloc[0].to_dict()
+    if fast:
+        candles = enumerate(zip(df_candles["시간"], df_candles["종가"].tolist()))
+    else:
+        candles = ((i, (row["시간"], row["종가"])) for i, row in df_candles.iterrows())
+
+    t = None
+    if profiler is None and INSTRUMENT:
+        profiler = EngineProfiler()
+    if profiler is not None:
+        profiler.start()
+
+    for i, (now, current_price) in candles:
+        if profiler is not None:
+            t = profiler.sample()
         # (중간 로직... 변경 없음)
         if (i + 1) % progress_interval == 0:
             logging.info(
-                f"⏳ 시뮬레이션 진행 중: {row['시간'].strftime('%Y-%m-%d %H:%M:%S')} ({((i + 1) / len(df_candles) * 100):.1f}%)")
+                f"⏳ 시뮬레이션 진행 중: {now.strftime('%Y-%m-%d %H:%M:%S')} ({((i + 1) / len(df_candles) * 100):.1f}%)")
 
-        now, current_price = row["시간"], row["종가"]
         events, last_trade_amount, last_trade_fee = [], 0.0, 0.0
+        context.clock.set(now)
 
         if market in holdings:
             current_holding_minutes += 1
 
-        new_buy_orders_df = generate_buy_orders(setting_df, buy_log_df, {market: current_price}, holdings, cash)
-
-        if not new_buy_orders_df.empty:
-            if buy_log_df.empty:
-                buy_log_df = new_buy_orders_df.copy()
-            else:
-                buy_log_df = pd.concat([buy_log_df, new_buy_orders_df], ignore_index=True)
-
-        for idx, r_buy in buy_log_df.iterrows():
+        if fast:
+            for order in _fast_buy_orders(ledger, fast_setting, current_price, holdings, cash,
+                                          context.hwm.get_hwm(market)):
+                ledger.add(order)
+            open_orders = [(None, order) for order in ledger.open_orders(market)]
+        else:
+            new_buy_orders_df = generate_buy_orders(setting_df, buy_log_df, {market: current_price}, holdings, cash,
+                                                    context=context)
+
+            if not new_buy_orders_df.empty:
+                if buy_log_df.empty:
+                    buy_log_df = new_buy_orders_df.copy()
+                else:
+                    buy_log_df = pd.concat([buy_log_df, new_buy_orders_df], ignore_index=True)
+            open_orders = buy_log_df.iterrows()
+        if t is not None:
+            t = profiler.lap("strategy", t)
+
+        for idx, r_buy in open_orders:
             if r_buy["filled"] in ["update", "wait"]:
                 price_to_check, amount_to_buy, buy_type = float(r_buy["target_price"]), float(r_buy["buy_amount"]), \
                     r_buy["buy_type"]
@@ -129,9 +204,16 @@ def simulate_with_db(
                         current_units_held += (amount_to_buy / unit_size) if unit_size > 0 else 0
 
                         holdings[market] = {'balance': holdings.get(market, {}).get('balance', 0) + volume}
-                        buy_log_df.at[idx, "filled"] = "done"
+                        if fast:
+                            ledger.fill(r_buy)
+                        else:
+                            buy_log_df.at[idx, "filled"] = "done"
                         last_trade_amount, last_trade_fee = amount_to_buy, fee
                         events.append(f"{buy_type} 매수 체결")
+                        if profiler is not None:
+                            profiler.event(f"{buy_type}_fill", now)
+        if t is not None:
+            t = profiler.lap("fill", t)
 
         if market in holdings:
             avg_buy_price = total_buy_info['amount'] / total_buy_info['volume'] if total_buy_info['volume'] > 0 else 0
@@ -154,98 +236,154 @@ def simulate_with_db(
                 realized_pnl += pnl - fee
                 last_trade_amount, last_trade_fee = proceeds, fee
                 events.append("매도 체결")
+                if profiler is not None:
+                    profiler.event("take_profit", now)
 
                 total_sell_trades += 1
                 current_holding_minutes = 0
                 current_units_held = 0.0
 
-                indices_to_drop = buy_log_df[(buy_log_df['market'] == market) & (buy_log_df['filled'] == 'wait')].index
-                buy_log_df.drop(indices_to_drop, inplace=True)
-
                 holdings.pop(market, None)
-                sell_log_df = sell_log_df[sell_log_df['market'] != market]
                 total_buy_info = {'amount': 0.0, 'volume': 0.0}
 
-                buy_log_df = buy_log_df[buy_log_df['market'] != market].copy()
+                if fast:
+                    ledger.clear(market)
+                else:
+                    indices_to_drop = buy_log_df[(buy_log_df['market'] == market) & (buy_log_df['filled'] == 'wait')].index
+                    buy_log_df.drop(indices_to_drop, inplace=True)
+                    sell_log_df = sell_log_df[sell_log_df['market'] != market]
+                    buy_log_df = buy_log_df[buy_log_df['market'] != market].copy()
                 logging.info(f"🧹 {market} 매도 완료. 매수 기록을 초기화합니다.")
+        if t is not None:
+            t = profiler.lap("sell", t)
 
         quantity = holdings.get(market, {}).get('balance', 0)
         avg_price = holdings.get(market, {}).get('avg_price', 0)
         portfolio_value = cash + quantity * current_price
 
-        logs.append({
+        log_row = {
             "시간": now, "종가": current_price, "신호": " / ".join(events) if events else "보유 중",
             "매매금액": round(last_trade_amount, 2), "현재 평단가": round(avg_price, 5),
             "실현 손익": round(realized_pnl, 2), "보유 현금": round(cash, 2),
             "총 누적 수수료": round(cumulative_fee, 2), "총 포트폴리오 값": round(portfolio_value, 2),
             "현재 유닛": current_units_held,
             "연속 보유(분)": current_holding_minutes
-        })
-
-    result_df = pd.DataFrame(logs)
-
-    filename = f"DB_시뮬_{market}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    result_df.to_excel(filename, index=False)
+        }
+        for writer in writers:
+            writer.write(log_row)
+        _update_run_stats(run_stats, log_row)
+        if t is not None:
+            profiler.lap("logging", t)
+
+    files = [path for writer in writers for path in writer.close()]
+    filename = ", ".join(files)
     logging.info(f"✅ 백테스트 결과 파일 저장 완료: {filename}")
+    if profiler is not None:
+        profiler.stop(profiler.ticks)
+        print(format_report(profiler.report(), title="DB 시뮬레이션 계측"))
 
     # --- (이전 단계에서 추가한 '결과 요약' 로직 - 변경 없음) ---
-    if not result_df.empty:
-        # 1. 기본 정보
-        final_portfolio_value = result_df['총 포트폴리오 값'].iloc[-1]
-
-        total_roi_pct = ((final_portfolio_value - initial_cash) / initial_cash) * 100 if initial_cash > 0 else 0
-        final_realized_pnl = result_df['실현 손익'].iloc[-1]
-
-        # 2. 최장 보유 시간
-        max_duration_minutes = result_df['연속 보유(분)'].max()
-        max_duration_str = _format_duration(int(max_duration_minutes))
-
-        # 3. 최다 보유 유닛
-        max_units = result_df['현재 유닛'].max()
-
-        # 4. 최대 낙폭(MDD) 계산
-        peak = result_df['총 포트폴리오 값'].cummax()
-        drawdown = (result_df['총 포트폴리오 값'] - peak) / peak
-        max_drawdown_pct = drawdown.min() * 100
-
-        try:
-            mdd_end_index = drawdown.idxmin()
-            mdd_trough_value = result_df.loc[mdd_end_index, '총 포트폴리오 값']  # <--- '최저점' 값
-            mdd_peak_value = peak.loc[mdd_end_index]
-            mdd_detail_str = f" (Peak {mdd_peak_value:,.2f} USDT -> Trough {mdd_trough_value:,.2f} USDT)"
-        except Exception:
-            mdd_trough_value = 0  # 예외 발생 시 기본값
-            mdd_detail_str = ""
-
-        # --- 👇👇👇 1. 청산 발생 여부 확인 로직 추가 👇👇👇 ---
-        # (총 자산 최저점이 0 이하로 내려갔는지 확인)
-        liquidation_occurred = "🚨 예 (총 자산 0 이하 도달)" if mdd_trough_value <= 0 else "✅ 아니오"
-        # --- 👆👆👆 1. 수정 완료 --- 👆👆👆
-
-        # --- 요약 출력 ---
-        print("\n" + "=" * 50)
-        print("          📈 백테스트 결과 요약 📈          ")
-        print("=" * 50)
-        print(f"  - 마켓 (Market):       {market}")
-        print(f"  - 기간 (Period):       {start} ~ {end}")
-        print(f"  - 초기 자본 (Initial): {initial_cash:,.2f} USDT")
-        print("." * 50)
-        print("  --- 💰 수익성 (Profitability) ---")
-        print(f"  - 최종 포트폴리오 가치:   {final_portfolio_value:,.2f} USDT")
-        print(f"  - 총 수익률 (Total ROI): {total_roi_pct:,.2f} %")
-        print(f"  - 기간 내 실현 손익:     {final_realized_pnl:,.2f} USDT")
-        print(f"  - 총 거래 횟수 (매도):   {total_sell_trades} 회")
-        print("." * 50)
-        print("  --- 📊 안정성 (Stability & Stats) ---")
-
-        # --- 👇👇👇 2. 청산 여부 출력 라인 추가 👇👇👇 ---
-        print(f"  - 청산 발생 여부:      {liquidation_occurred}")
-        # --- 👆👆👆 2. 수정 완료 --- 👆👆👆
-
-        print(f"  - 최대 낙폭 (MDD):      {max_drawdown_pct:,.2f} %{mdd_detail_str}")
-        print(f"  - 최장기간 보유:         {max_duration_str}")
-        print(f"  - 최다보유 유닛:         {max_units:,.2f} units")
-        print(f"  - 총 누적 수수료:        {result_df['총 누적 수수료'].iloc[-1]:,.2f} USDT")
-        print("=" * 50)
+    if run_stats["rows"]:
+        summary = _summarize(run_stats, market, start, end, initial_cash, total_sell_trades)
+        summary["log_file"] = filename
+        _print_summary(summary)
+        if cache is not None:
+            cache.put(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint, cache_settings, summary)
+        if profiler is not None:
+            summary["profile"] = profiler.report()  # 캐시에는 넣지 않음 (실행마다 다름)
+        return summary
+    else:
+        logging.warning("⚠️ 백테스트 결과 데이터가 비어있어 요약을 생성할 수 없습니다.")
+
+
+def _fast_buy_orders(ledger: OrderLedger, setting, current_price: float, holdings: dict, usdt_balance: float,
+                     hwm: float = 0.0) -> list:
+    """generate_buy_orders 와 같은 판단(decide_buy_orders)을 buy_log_df 대신 OrderLedger 조회 값으로 내립니다."""
+    market = setting["market"]
+    return decide_buy_orders(
+        setting, current_price, usdt_balance,
+        is_new=ledger.is_empty(market) and market not in holdings,
+        base_unit_size=ledger.base_unit.get(market),
+        last_small_flow_price=ledger.last_fill_price(market, "small"),
+        last_large_flow_price=ledger.last_fill_price(market, "large"),
+        small_flow_open=ledger.has_open(market, "small_flow"), large_flow_open=ledger.has_open(market, "large_flow"),
+        hwm=hwm, quiet=True)
+
+
+def _update_run_stats(run_stats: dict, log_row: dict):
+    """요약에 필요한 값만 행마다 누적합니다 (로그 전체를 메모리에 두지 않음)."""
+    value = log_row["총 포트폴리오 값"]
+    if run_stats["first_value"] is None:
+        run_stats["first_value"] = value
+    run_stats["rows"] += 1
+    run_stats["last"] = log_row
+    run_stats["max_holding"] = max(run_stats["max_holding"], log_row["연속 보유(분)"])
+    run_stats["max_units"] = max(run_stats["max_units"], log_row["현재 유닛"])
+    run_stats["equity"].update(log_row["시간"], value)
+
+
+def _summarize(run_stats: dict, market: str, start: str, end: str, initial_cash: float,
+               total_sell_trades: int) -> dict:
+    # 1. 기본 정보
+    last = run_stats["last"]
+    final_portfolio_value = last['총 포트폴리오 값']
+
+    total_roi_pct = ((final_portfolio_value - initial_cash) / initial_cash) * 100 if initial_cash > 0 else 0
+    final_realized_pnl = last['실현 손익']
+
+    # 2. 최장 보유 시간
+    max_duration_str = _format_duration(int(run_stats["max_holding"]))
+
+    # 3. 최다 보유 유닛
+    max_units = run_stats["max_units"]
+
+    # 4. 최대 낙폭(MDD): 낙폭이 없으면 첫 행이 고점이자 최저점
+    equity = run_stats["equity"]
+    max_drawdown_pct = equity.mdd_pct()
+    if equity.mdd_trough_value is None:
+        mdd_peak_value = mdd_trough_value = run_stats["first_value"]
     else:
-        logging.warning("⚠️ 백테스트 결과 데이터가 비어있어 요약을 생성할 수 없습니다.")
\ No newline at end of file
+        mdd_peak_value, mdd_trough_value = equity.mdd_peak_value, equity.mdd_trough_value
+    mdd_detail_str = f" (Peak {mdd_peak_value:,.2f} USDT -> Trough {mdd_trough_value:,.2f} USDT)"
+
+    # --- 👇👇👇 1. 청산 발생 여부 확인 로직 추가 👇👇👇 ---
+    # (총 자산 최저점이 0 이하로 내려갔는지 확인)
+    liquidation_occurred = "🚨 예 (총 자산 0 이하 도달)" if mdd_trough_value <= 0 else "✅ 아니오"
+    # --- 👆👆👆 1. 수정 완료 --- 👆👆👆
+
+    return {
+        "market": market, "start": start, "end": end, "initial_cash": initial_cash,
+        "final_portfolio_value": final_portfolio_value, "total_roi_pct": total_roi_pct,
+        "final_realized_pnl": final_realized_pnl, "total_sell_trades": total_sell_trades,
+        "liquidation_occurred": liquidation_occurred, "max_drawdown_pct": max_drawdown_pct,
+        "mdd_detail_str": mdd_detail_str, "max_duration_str": max_duration_str, "max_units": max_units,
+        "cumulative_fee": last['총 누적 수수료']
+    }
+
+
+def _print_summary(summary: dict):
+    # --- 요약 출력 ---
+    print("\n" + "=" * 50)
+    print("          📈 백테스트 결과 요약 📈          ")
+    print("=" * 50)
+    print(f"  - 마켓 (Market):       {summary['market']}")
+    print(f"  - 기간 (Period):       {summary['start']} ~ {summary['end']}")
+    print(f"  - 초기 자본 (Initial): {summary['initial_cash']:,.2f} USDT")
+    print("." * 50)
+    print("  --- 💰 수익성 (Profitability) ---")
+    print(f"  - 최종 포트폴리오 가치:   {summary['final_portfolio_value']:,.2f} USDT")
+    print(f"  - 총 수익률 (Total ROI): {summary['total_roi_pct']:,.2f} %")
+    print(f"  - 기간 내 실현 손익:     {summary['final_realized_pnl']:,.2f} USDT")
+    print(f"  - 총 거래 횟수 (매도):   {summary['total_sell_trades']} 회")
+    print("." * 50)
+    print("  --- 📊 안정성 (Stability & Stats) ---")
+
+    # --- 👇👇👇 2. 청산 여부 출력 라인 추가 👇👇👇 ---
+    print(f"  - 청산 발생 여부:      {summary['liquidation_occurred']}")
+    # --- 👆👆👆 2. 수정 완료 --- 👆👆👆
+
+    print(f"  - 최대 낙폭 (MDD):      {summary['max_drawdown_pct']:,.2f} %{summary['mdd_detail_str']}")
+    print(f"  - 최장기간 보유:         {summary['max_duration_str']}")
+    print(f"  - 최다보유 유닛:         {summary['max_units']:,.2f} units")
+    print(f"  - 총 누적 수수료:        {summary['cumulative_fee']:,.2f} USDT")
+    print("=" * 50)
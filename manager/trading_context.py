@@ -0,0 +1,119 @@
+# manager/trading_context.py
+import logging
+from datetime import datetime, timedelta
+
+import config
+
+
+class TradingContext:
+    """
+    전략 코드가 쓰는 외부 상태 묶음: HWM 저장소 / 쿨다운 저장소 / 알림(notifier) / 시계(clock).
+      - live_context()       : 실거래용. hwm_data.json · cooldown_status.json 싱글톤과 텔레그램 알림, datetime.now
+      - simulation_context() : 백테스트용. 모두 메모리 안에서만 동작 (파일 / 네트워크 I/O 없음, 실행마다 독립)
+    notifier 는 utils.telegram_notifier 와 같은 이름의 함수(notify_hwm_event, notify_error, ...)를 가진 객체입니다.
+    """
+
+    def __init__(self, hwm, cooldown, notifier, clock):
+        self.hwm = hwm
+        self.cooldown = cooldown
+        self.notifier = notifier
+        self.clock = clock
+
+    def now(self) -> datetime:
+        return self.clock.now()
+
+
+# --- 1. 실거래용 ---
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+
+def live_context() -> TradingContext:
+    """기존 싱글톤을 그대로 묶습니다 (import 할 때 상태 파일을 읽으므로 실제로 필요할 때만 불러옴)."""
+    from manager.hwm_manager import hwm_manager
+    from manager.cooldown_manager import cooldown_manager
+    import utils.telegram_notifier as telegram_notifier
+    return TradingContext(hwm_manager, cooldown_manager, telegram_notifier, SystemClock())
+
+
+# --- 2. 시뮬레이션용 (메모리 전용) ---
+class SimClock:
+    """시뮬레이터가 캔들마다 set() 으로 맞춰 주는 시계."""
+
+    def __init__(self, start=None):
+        self.current = start
+
+    def set(self, timestamp):
+        self.current = timestamp
+
+    def now(self):
+        return self.current
+
+
+class RecordingNotifier:
+    """알림을 보내지 않고 (함수 이름, 인자) 를 events 에 쌓아 둡니다. notify_xxx 어떤 이름이든 받습니다."""
+
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        if not name.startswith("notify_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.events.append((name, args, kwargs))
+        return record
+
+
+class InMemoryHwmStore:
+    """HighWaterMarkManager 와 같은 인터페이스. 파일에 저장하지 않습니다."""
+
+    def __init__(self, notifier, initial=None):
+        self.hwm_data = dict(initial or {})
+        self.notifier = notifier
+
+    def update_hwm(self, market: str, price: float):
+        if price > self.hwm_data.get(market, 0.0):
+            self.hwm_data[market] = price
+
+    def get_hwm(self, market: str) -> float:
+        return self.hwm_data.get(market, 0.0)
+
+    def reset_hwm(self, market: str, new_price: float = 0.0):
+        self.hwm_data[market] = new_price
+        self.notifier.notify_hwm_event("리셋", market, new_price)
+
+
+class InMemoryCooldownStore:
+    """CooldownManager 와 같은 인터페이스. 현재 시각은 주입된 clock 으로 계산하고 파일에 저장하지 않습니다."""
+
+    def __init__(self, clock, minutes=None):
+        self.clock = clock
+        self.minutes = config.COOLDOWN_MINUTES if minutes is None else minutes
+        self.status = {"is_active": False, "start_time": None, "end_time": None}
+
+    def start_cooldown(self):
+        now = self.clock.now()
+        end_time = now + timedelta(minutes=self.minutes)
+        self.status = {"is_active": True, "start_time": now.isoformat(), "end_time": end_time.isoformat()}
+        logging.debug(f"❄️ [시뮬] 쿨다운 시작! 종료 예정 시간: {end_time}")
+
+    def end_cooldown(self):
+        self.status = {"is_active": False, "start_time": None, "end_time": None}
+
+    def is_cooldown_active(self) -> bool:
+        return self.status["is_active"]
+
+    def get_end_time(self):
+        if self.status["end_time"]:
+            return datetime.fromisoformat(self.status["end_time"])
+        return None
+
+
+def simulation_context(start=None, hwm=None, cooldown_minutes=None) -> TradingContext:
+    """백테스트 한 번에 쓰는 독립된 메모리 컨텍스트 (hwm: 시작 HWM dict)."""
+    clock = SimClock(start)
+    notifier = RecordingNotifier()
+    return TradingContext(InMemoryHwmStore(notifier, hwm), InMemoryCooldownStore(clock, cooldown_minutes),
+                          notifier, clock)
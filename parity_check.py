@@ -0,0 +1,182 @@
+# parity_check.py
+"""
+백테스트 엔진 차등(differential) 검증.
+같은 캔들 구간 / 같은 설정을 기준 구현과 최적화 엔진에 모두 돌려 매매 이벤트 열과 최종 통계를 비교하고,
+어긋나면 처음 어긋난 캔들을 보고합니다.
+  - stress_test_btc_final : run_simulation (기준) ↔ run_simulation_fast / 이어서 실행 / run_simulation_grid
+  - stress_test_step_up   : run_simulation (기준) ↔ run_simulation_fast (BacktestEngine) / run_simulation_grid
+  - compound_test         : BotList(PhoenixBot.run_tick, 기준) ↔ BotPool
+  - simulate_with_db      : DataFrame + 실거래 generate_buy_orders (기준) ↔ OrderLedger 빠른 경로
+  - portfolio_test        : PortfolioEngine.run_reference (분봉마다 전 종목, 기준) ↔ PortfolioEngine.run
+이벤트 열이 없는 lockstep 커널은 앞 k 캔들만 돌린 결과를 이분 탐색해 처음 달라지는 캔들을 찾습니다.
+"""
+import os
+import logging
+import tempfile
+
+import stress_test_btc_final as stress
+import stress_test_step_up as step_up
+import compound_test as compound
+import portfolio_test as portfolio
+import manager.simulator_db as simulator_db
+from manager.output_writers import CsvWriter
+from utils.candle_arrays import CandleArrays
+from utils.parity import (EventRecorder, first_divergence, compare_stats, bisect_divergence, parity_report,
+                          format_parity_report)
+
+# --- 1. 설정 ---
+PARITY_START = os.getenv("PARITY_START", "2024-01-01 00:00:00")
+PARITY_END = os.getenv("PARITY_END", "2024-03-31 23:59:59")
+STEP_UP_FIELDS = ("sl_count", "total_injected", "final_equity")
+PORTFOLIO_FIELDS = ("sl_count", "total_injected", "final_equity", "markets")
+COMPOUND_FIELDS = ("final_total_equity", "bot_count", "total_injected", "net_profit", "system_mdd",
+                   "total_sell_count", "bot_stats", "yearly_log")
+DB_SUMMARY_FIELDS = ("final_portfolio_value", "total_roi_pct", "final_realized_pnl", "total_sell_trades",
+                     "max_drawdown_pct", "mdd_detail_str", "max_duration_str", "max_units", "cumulative_fee")
+
+
+# --- 2. 엔진별 검증 ---
+def _trail_report(engine, ref_recorder, cand_recorder, stat_diffs):
+    divergence = first_divergence(ref_recorder.trail, cand_recorder.trail)
+    at = None
+    if divergence is not None:
+        times = [event[0] for event in (divergence["reference"], divergence["candidate"]) if event is not None]
+        at = min(times)
+    return parity_report(engine, stat_diffs, divergence, at)
+
+
+def _bisect_report(engine, df, stat_diffs, same_prefix):
+    if not stat_diffs:
+        return parity_report(engine, stat_diffs)
+    position = bisect_divergence(len(df), same_prefix)
+    at = df["timestamp"].iloc[position] if position is not None else None
+    return parity_report(engine, stat_diffs, {"position": position}, at)
+
+
+def check_stress(df, settings):
+    """stress_test_btc_final 의 최적화 경로 3 가지를 run_simulation 과 비교합니다."""
+    fields = stress.RESULT_FIELDS
+    arrays = CandleArrays.from_df(df)
+    ref_recorder = EventRecorder()
+    reference = stress.run_simulation(df, settings, profiler=ref_recorder)
+
+    fast_recorder = EventRecorder()
+    fast = stress.run_simulation_fast(arrays, settings, profiler=fast_recorder)
+    reports = [_trail_report("stress.run_simulation_fast", ref_recorder, fast_recorder,
+                             compare_stats(reference, fast, fields))]
+
+    # 체크포인트 이어서 실행: 절반까지 돌린 state 로 나머지를 이어 붙임
+    half = len(df) // 2
+    resume_recorder = EventRecorder()
+    first = stress.run_simulation_fast(arrays, settings, stop=half, profiler=resume_recorder)
+    resumed = stress.run_simulation_fast(arrays, settings, state=first["state"], start=half, profiler=resume_recorder)
+    reports.append(_trail_report("stress.run_simulation_fast (resume)", ref_recorder, resume_recorder,
+                                 compare_stats(reference, resumed, fields)))
+
+    grid = stress.run_simulation_grid(arrays, [settings])[0]
+
+    def grid_same(k):
+        part = df.iloc[:k]
+        return not compare_stats(stress.run_simulation(part, settings),
+                                 stress.run_simulation_grid(CandleArrays.from_df(part), [settings])[0], fields)
+    reports.append(_bisect_report("stress.run_simulation_grid", df, compare_stats(reference, grid, fields), grid_same))
+    return reports
+
+
+def check_step_up(df, settings):
+    reference = step_up.run_simulation(df, settings)
+    fast = step_up.run_simulation_fast(df, settings)
+    grid = step_up.run_simulation_grid(CandleArrays.from_df(df), [settings])[0]
+
+    def fast_same(k):
+        part = df.iloc[:k]
+        return not compare_stats(step_up.run_simulation(part, settings),
+                                 step_up.run_simulation_fast(part, settings), STEP_UP_FIELDS)
+
+    def grid_same(k):
+        part = df.iloc[:k]
+        return not compare_stats(step_up.run_simulation(part, settings),
+                                 step_up.run_simulation_grid(CandleArrays.from_df(part), [settings])[0], STEP_UP_FIELDS)
+    return [_bisect_report("step_up.run_simulation_fast", df, compare_stats(reference, fast, STEP_UP_FIELDS), fast_same),
+            _bisect_report("step_up.run_simulation_grid", df, compare_stats(reference, grid, STEP_UP_FIELDS), grid_same)]
+
+
+def check_compound(df, settings):
+    recorders, summaries = [], []
+    for pool_cls in (compound.BotList, compound.BotPool):
+        recorder = EventRecorder()
+        simulator = compound.CompoundSimulator(df, settings, pool_cls=pool_cls, profiler=recorder)
+        simulator.run()
+        recorders.append(recorder)
+        summaries.append(simulator.summarize())
+    return [_trail_report("compound.BotPool", recorders[0], recorders[1],
+                          compare_stats(summaries[0], summaries[1], COMPOUND_FIELDS))]
+
+
+def check_simulate_with_db(**kwargs):
+    """kwargs 는 simulate_with_db 인자 (market / start / end / unit_size ...). 결과 캐시는 쓰지 않습니다."""
+    recorders, summaries = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fast in (False, True):
+            recorder = EventRecorder()
+            summary = simulator_db.simulate_with_db(
+                **dict(kwargs, use_cache=False, fast=fast, profiler=recorder,
+                       outputs=[CsvWriter(os.path.join(tmp, f"fast_{fast}.csv"))]))
+            if summary is None:
+                return [parity_report("simulate_with_db (fast)", {"summary": ("캔들 없음", None)})]
+            recorders.append(recorder)
+            summaries.append(summary)
+    return [_trail_report("simulate_with_db (fast)", recorders[0], recorders[1],
+                          compare_stats(summaries[0], summaries[1], DB_SUMMARY_FIELDS))]
+
+
+def check_portfolio(candles, settings_list):
+    """candles 는 align_candles 로 맞춘 종목별 CandleArrays, settings_list 는 portfolio_test.load_market_settings 형식."""
+    engine = portfolio.build_portfolio(settings_list)
+    ref_recorder, fast_recorder = EventRecorder(), EventRecorder()
+    reference = engine.run_reference(candles, profiler=ref_recorder)
+    fast = engine.run(candles, profiler=fast_recorder)
+    return [_trail_report("portfolio.PortfolioEngine.run", ref_recorder, fast_recorder,
+                          compare_stats(reference, fast, PORTFOLIO_FIELDS))]
+
+
+def run_all(df, stress_settings, step_up_settings, compound_settings, db_kwargs=None):
+    reports = check_stress(df, stress_settings) + check_step_up(df, step_up_settings) + \
+        check_compound(df, compound_settings)
+    if db_kwargs is not None:
+        reports += check_simulate_with_db(**db_kwargs)
+    return reports
+
+
+# --- 3. 메인 ---
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"🔍 엔진 차등 검증: {stress.MARKET} {PARITY_START} ~ {PARITY_END}")
+    df = stress.load_candles(stress.MARKET, PARITY_START, PARITY_END)
+    if df.empty:
+        print("⚠️ 캔들 데이터가 없습니다.")
+        return
+    compound_settings = {k: getattr(compound, k) for k in
+                         ("UNIT_SIZE", "TAKE_PROFIT_PCT", "SMALL_FLOW_PCT", "LARGE_FLOW_PCT", "INITIAL_UNITS",
+                          "SMALL_FLOW_UNITS", "LARGE_FLOW_UNITS", "LEVERAGE", "PROFIT_RESET_TARGET", "MARGIN_BUFFER")}
+    db_kwargs = {"market": stress.MARKET, "start": PARITY_START, "end": PARITY_END, "unit_size": 100,
+                 "small_flow_pct": 0.004, "small_flow_units": 2, "large_flow_pct": 0.013, "large_flow_units": 4,
+                 "take_profit_pct": 0.003, "leverage": 10, "initial_cash": 3000.0}
+    reports = run_all(df,
+                      stress_settings=stress.grid_settings_list()[0],
+                      step_up_settings={k: v[0] for k, v in step_up.GRID_PARAMS.items()},
+                      compound_settings=compound_settings, db_kwargs=db_kwargs)
+    settings_list = portfolio.load_market_settings()
+    candles = portfolio.load_portfolio_candles([settings["MARKET"] for settings in settings_list], PARITY_START, PARITY_END)
+    if candles and len(candles[0]):
+        reports += check_portfolio(candles, settings_list)
+    print("=" * 80)
+    for report in reports:
+        print(format_parity_report(report))
+    print("=" * 80)
+    failed = [r for r in reports if not r["ok"]]
+    print(f"{'✅ 모든 엔진 일치' if not failed else f'❌ {len(failed)}개 엔진 불일치'} ({len(reports)}개 비교)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import sqlite3
+import pandas as pd
+import os
+import logging
+import multiprocessing as mp
+from utils.candle_arrays import align_candles
+from utils.instrumentation import EngineProfiler, format_report
+from manager.backtest_engine import BacktestEngine
+from manager.portfolio_engine import PortfolioEngine
+from manager.risk_policies import StopLossRefill, TakeProfit, InitialEntry, FixedUnit, FlowLadder
+
+# --- 1. 시스템 설정 (Configuration) ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+logger = logging.getLogger("Portfolio_Test")
+
+# 데이터베이스 / 종목 설정 경로 (setting.csv 의 종목 전부를 하나의 지갑으로 시뮬레이션)
+DB_PATH = os.path.join(os.path.dirname(__file__), "db", "candle_db.sqlite")
+SETTING_PATH = os.path.join(os.path.dirname(__file__), "setting.csv")
+
+# 공유 지갑 및 계좌 손절 설정 (main.py 와 같은 구조: 계좌 평가액이 기준 이하면 전 종목 청산 후 쿨다운)
+INITIAL_CASH = 3000.0
+STOP_LOSS_THRESHOLD = 0.65
+PANIC_SELL_PENALTY = 0.02
+COOLDOWN_MINUTES = 1440
+MARGIN_BUFFER = 1.5
+
+# 수수료 및 슬리피지
+FEE_RATE = 0.0004
+SLIPPAGE_RATE = 0.0005
+
+# 기간
+START_DATE = os.getenv("PORTFOLIO_START", "2023-01-01 00:00:00")
+END_DATE = os.getenv("PORTFOLIO_END", "2025-12-28 23:59:59")
+
+# 종목별 캔들 로드 병렬 워커 수 (None 이면 min(종목 수, CPU 코어 수), 1 이면 순차 로드)
+LOAD_WORKERS = None
+# 엔진 계측 (분기 횟수 / candles·events per sec)
+INSTRUMENT = os.getenv("PORTFOLIO_INSTRUMENT", "false").lower() == "true"
+
+# --- 2. 데이터 / 설정 로드 함수 ---
+def load_candles(market, start, end):
+    if not os.path.exists(DB_PATH):
+        logger.error(f"❌ DB 파일을 찾을 수 없습니다: {DB_PATH}")
+        return pd.DataFrame()
+
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            query = "SELECT timestamp, open, high, low, close FROM minute_candles WHERE market = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp"
+            df = pd.read_sql_query(query, conn, params=[market, start, end])
+        if df.empty: return df
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        for col in ["open", "high", "low", "close"]:
+            df[col] = pd.to_numeric(df[col])
+        return df
+    except Exception as e:
+        logger.error(f"❌ {market} 데이터 로드 중 오류 발생: {e}")
+        return pd.DataFrame()
+
+
+def _load_market(args):
+    return load_candles(*args)
+
+
+def load_portfolio_candles(markets, start, end, workers=LOAD_WORKERS):
+    """
+    종목별 캔들을 프로세스 풀로 동시에 읽어 공통 분 인덱스에 맞춥니다 (종목마다 독립인 DB 조회 / 파싱이 로딩 시간의 대부분).
+    반환값은 markets 순서의 CandleArrays 목록이고, 한 종목이라도 비어 있으면 빈 목록입니다.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(markets))
+    tasks = [(market, start, end) for market in markets]
+    if workers <= 1:
+        frames = [_load_market(task) for task in tasks]
+    else:
+        with mp.Pool(processes=workers) as pool:
+            frames = pool.map(_load_market, tasks)
+    for market, df in zip(markets, frames):
+        if df.empty:
+            logger.error(f"❌ {market}: 기간 내 캔들이 없습니다.")
+            return []
+    return align_candles(frames)
+
+
+def load_market_settings(path=SETTING_PATH):
+    """setting.csv 의 종목별 전략 설정을 엔진 설정 키(UNIT_SIZE, TAKE_PROFIT_PCT ...)로 읽습니다."""
+    setting_df = pd.read_csv(path)
+    return [{
+        "MARKET": row.market,
+        "UNIT_SIZE": float(row.unit_size),
+        "TAKE_PROFIT_PCT": float(row.take_profit_pct),
+        "SMALL_FLOW_PCT": float(row.small_flow_pct),
+        "LARGE_FLOW_PCT": float(row.large_flow_pct),
+        "INITIAL_UNITS": float(row.initial_entry_units),
+        "SMALL_FLOW_UNITS": float(row.small_flow_units),
+        "LARGE_FLOW_UNITS": float(row.large_flow_units),
+        "LEVERAGE": float(row.leverage),
+        "MARGIN_BUFFER": MARGIN_BUFFER,
+    } for row in setting_df.itertuples()]
+
+# --- 3. 포트폴리오 엔진 구성 ---
+def market_engine(settings):
+    """한 종목의 매매 규칙 (익절 → 최초 진입 → 물타기). 손절은 종목이 아니라 계좌 단위로 PortfolioEngine 이 판정합니다."""
+    policies = [
+        TakeProfit(settings["TAKE_PROFIT_PCT"]),
+        InitialEntry(settings["INITIAL_UNITS"], FixedUnit(settings["UNIT_SIZE"])),
+        FlowLadder([(settings["SMALL_FLOW_PCT"], settings["SMALL_FLOW_UNITS"]),
+                    (settings["LARGE_FLOW_PCT"], settings["LARGE_FLOW_UNITS"])]),
+    ]
+    return BacktestEngine(policies, INITIAL_CASH, FEE_RATE, SLIPPAGE_RATE, settings["LEVERAGE"], settings["MARGIN_BUFFER"])
+
+
+def build_portfolio(settings_list):
+    return PortfolioEngine([settings["MARKET"] for settings in settings_list],
+                           [market_engine(settings) for settings in settings_list], INITIAL_CASH,
+                           StopLossRefill(STOP_LOSS_THRESHOLD, PANIC_SELL_PENALTY, COOLDOWN_MINUTES))
+
+# --- 4. 결과 출력 ---
+def print_summary(res, settings_list, n_candles):
+    net_profit = res["final_equity"] - INITIAL_CASH - res["total_injected"]
+    print("\n" + "=" * 100)
+    print(f"📊 포트폴리오 시뮬레이션 결과 ({len(settings_list)}개 종목, {n_candles:,} 분봉)")
+    print("=" * 100)
+    print(f"  - 최종 자산 (Final Equity): ${res['final_equity']:,.2f}")
+    print(f"  - 계좌 손절 횟수 (SL Count): {res['sl_count']}")
+    print(f"  - 총 추가 투입금 (Total Injected): ${res['total_injected']:,.2f}")
+    print(f"  - 순수익 (Net Profit): ${net_profit:,.2f}")
+    print("-" * 100)
+    print(f"{'Market':<12} | {'Realized PnL':>14} | {'Sell Count':>10} | {'Final Qty':>12}")
+    print("-" * 100)
+    for market, stat in res["markets"].items():
+        print(f"{market:<12} | {stat['realized_pnl']:>14,.2f} | {stat['sell_count']:>10} | {stat['final_qty']:>12.6f}")
+    print("=" * 100)
+
+# --- 5. 메인 실행 ---
+def main():
+    settings_list = load_market_settings()
+    markets = [settings["MARKET"] for settings in settings_list]
+    print(f"🚀 포트폴리오 백테스트 시작: {', '.join(markets)}")
+    print(f"▶ 기간: {START_DATE} ~ {END_DATE}")
+    print(f"💰 공유 지갑: ${INITIAL_CASH:,.0f}, 계좌 손절선: {STOP_LOSS_THRESHOLD * 100:.0f}%, 증거금 버퍼: {MARGIN_BUFFER}")
+    print("=" * 100)
+
+    print("\n▶ 데이터 로딩 중... (종목별 병렬 로드 후 공통 분 인덱스 정렬)")
+    candles = load_portfolio_candles(markets, START_DATE, END_DATE)
+    if not candles or len(candles[0]) == 0:
+        print("❌ 모든 종목에 캔들이 있는 공통 구간이 없습니다.")
+        return
+    print(f"  데이터 로드 완료: 종목당 {len(candles[0]):,} candles "
+          f"({candles[0].timestamp_at(0)} ~ {candles[0].timestamp_at(len(candles[0]) - 1)})")
+
+    profiler = EngineProfiler() if INSTRUMENT else None
+    res = build_portfolio(settings_list).run(candles, profiler=profiler)
+    print_summary(res, settings_list, len(candles[0]))
+    if profiler is not None:
+        print(format_report(res["profile"], "포트폴리오 엔진 계측"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 # strategy/casino_strategy.py
 import pandas as pd
-from datetime import datetime
 import logging
 import numpy as np
 import config
-from manager.hwm_manager import hwm_manager
+from manager.trading_context import live_context
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -27,8 +26,72 @@ def get_last_large_flow_or_initial_price(market_buy_log: pd.DataFrame) -> float
     return filtered_log.iloc[-1]["target_price"] if not filtered_log.empty else None
 
 
+def decide_buy_orders(setting, current_price: float, usdt_balance: float, is_new: bool, base_unit_size,
+                      last_small_flow_price, last_large_flow_price, small_flow_open: bool, large_flow_open: bool,
+                      hwm: float = 0.0, enable_rebalance: bool = False, quiet: bool = False) -> list:
+    """
+    한 마켓의 매수 판단 (최초 매수 / small_flow / large_flow 목표가, 대기 주문 중복 방지, 증거금 확인).
+    주문 기록은 값으로만 받으므로 generate_buy_orders (buy_log_df) 와 백테스트 빠른 경로 (OrderLedger) 가 같이 씁니다.
+    반환값은 time 을 뺀 주문 dict 목록입니다. quiet 이면 분마다 반복되는 info / 경고 로그를 debug 로만 남깁니다.
+    """
+    warn, info = (logging.debug, logging.debug) if quiet else (logging.warning, logging.info)
+    market = setting["market"]
+    try:
+        leverage = float(setting["leverage"])
+        if leverage <= 0: leverage = 1.0
+    except (KeyError, TypeError, ValueError):
+        warn(f"⚠️ {market}의 레버리지 설정이 없거나 잘못되었습니다. [1.0]배로 간주합니다.")
+        leverage = 1.0
+
+    if is_new:
+        base_unit_size = float(setting["unit_size"])
+        initial_entry_multiplier = float(setting.get("initial_entry_units", 1.0))
+        buy_amount = base_unit_size * initial_entry_multiplier
+        required_margin = (buy_amount / leverage) * config.MARGIN_BUFFER_FACTOR
+        if usdt_balance < required_margin:
+            warn(f"⚠️ {market} 최초 매수 실패 (잔고 부족). 필요 증거금(버퍼 포함): {required_margin:.2f}, 보유: {usdt_balance:.2f}")
+            return []
+        info(f"🆕 {market}: 최초 매수 주문 생성을 시도합니다. (Buy Amount: {buy_amount:.2f}, Base Unit: {base_unit_size})")
+        return [{"market": market, "target_price": current_price, "buy_amount": buy_amount, "buy_units": 0,
+                 "buy_type": "initial", "filled": "update", "base_unit_size": base_unit_size}]
+
+    if pd.isna(base_unit_size):
+        base_unit_size = float(setting["unit_size"])
+
+    if last_small_flow_price is None or last_large_flow_price is None:
+        logging.debug(f"ℹ️ {market}: 이전 체결 기록이 부족하여 추가 매수 주문을 생성하지 않습니다.")
+        return []
+
+    orders = []
+    for buy_type, last_price, is_open, pct_key, units_key in (
+            ("small_flow", last_small_flow_price, small_flow_open, "small_flow_pct", "small_flow_units"),
+            ("large_flow", last_large_flow_price, large_flow_open, "large_flow_pct", "large_flow_units")):
+        flow_pct = float(setting[pct_key])
+        if enable_rebalance and hwm > last_price * (1 + (flow_pct * 0.5)):
+            target_price = round(hwm * (1 - flow_pct), 8)
+            info(f"🔄 [Rebalance] {market}: {buy_type} HWM({hwm}) 기반 타겟 조정 -> {target_price} (기존 매수가: {last_price})")
+        else:
+            target_price = round(last_price * (1 - flow_pct), 8)
+
+        if current_price > target_price:
+            continue
+        if is_open:
+            logging.debug(f"ℹ️ {market}: 이미 대기 중인 {buy_type} 주문이 있어 건너뜁니다.")
+            continue
+        buy_amount = base_unit_size * float(setting[units_key])
+        required_margin = (buy_amount / leverage) * config.MARGIN_BUFFER_FACTOR
+        if usdt_balance >= required_margin:
+            orders.append({"market": market, "target_price": target_price, "buy_amount": buy_amount,
+                           "buy_units": 1, "buy_type": buy_type, "filled": "update", "base_unit_size": np.nan})
+        else:
+            warn(f"⚠️ {market} {buy_type} 매수 실패 (잔고 부족). 필요 증거금(버퍼 포함): {required_margin:.2f}, 보유: {usdt_balance:.2f}")
+    return orders
+
+
 def generate_buy_orders(setting_df: pd.DataFrame, buy_log_df: pd.DataFrame, current_prices: dict, holdings: dict,
-                        usdt_balance: float, enable_rebalance: bool = False) -> pd.DataFrame:
+                        usdt_balance: float, enable_rebalance: bool = False, context=None) -> pd.DataFrame:
+    # context: HWM / 시계 등 외부 상태 (manager.trading_context). 없으면 실거래용 싱글톤 사용
+    context = context or live_context()
     new_orders = []
 
     for _, setting in setting_df.iterrows():
@@ -38,104 +101,35 @@ def generate_buy_orders(setting_df: pd.DataFrame, buy_log_df: pd.DataFrame, curr
             logging.warning(f"⚠️ {market}의 현재 가격 정보가 없어 매수 주문 생성을 건너뜁니다.")
             continue
 
-        try:
-            leverage = float(setting["leverage"])
-            if leverage <= 0: leverage = 1.0
-        except (KeyError, TypeError, ValueError):
-            logging.warning(f"⚠️ {market}의 레버리지 설정이 없거나 잘못되었습니다. [1.0]배로 간주합니다.")
-            leverage = 1.0
-
         market_buy_log = buy_log_df[buy_log_df["market"] == market] if not buy_log_df.empty else pd.DataFrame()
 
-        if market_buy_log.empty and market not in holdings:
-            base_unit_size = float(setting["unit_size"])
-            initial_entry_multiplier = float(setting.get("initial_entry_units", 1.0))
-            buy_amount = base_unit_size * initial_entry_multiplier
-            
-            required_margin = (buy_amount / leverage) * config.MARGIN_BUFFER_FACTOR
-
-            if usdt_balance >= required_margin:
-                logging.info(f"🆕 {market}: 최초 매수 주문 생성을 시도합니다. (Buy Amount: {buy_amount:.2f}, Base Unit: {base_unit_size})")
-                new_orders.append({
-                    "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "market": market,
-                    "target_price": current_price, "buy_amount": buy_amount,
-                    "buy_units": 0, "buy_type": "initial", "filled": "update",
-                    "base_unit_size": base_unit_size
-                })
-            else:
-                logging.warning(
-                    f"⚠️ {market} 최초 매수 실패 (잔고 부족). 필요 증거금(버퍼 포함): {required_margin:.2f}, 보유: {usdt_balance:.2f}")
-            continue
-
         base_unit_size_for_flow = None
+        small_flow_open = large_flow_open = False
         if not market_buy_log.empty:
             initial_buys = market_buy_log[market_buy_log['buy_type'] == 'initial']
             if not initial_buys.empty:
                 base_unit_size_for_flow = initial_buys.iloc[-1].get('base_unit_size')
-
-        if pd.isna(base_unit_size_for_flow):
-            base_unit_size_for_flow = float(setting["unit_size"])
-
-        last_small_flow_price = get_last_small_flow_or_initial_price(market_buy_log)
-        last_large_flow_price = get_last_large_flow_or_initial_price(market_buy_log)
-
-        if last_small_flow_price is None or last_large_flow_price is None:
-            logging.debug(f"ℹ️ {market}: 이전 체결 기록이 부족하여 추가 매수 주문을 생성하지 않습니다.")
-            continue
-
-        hwm = hwm_manager.get_hwm(market)
-        small_flow_pct = float(setting["small_flow_pct"])
-        large_flow_pct = float(setting["large_flow_pct"])
-        
-        rebalance_small_target_price = None
-        if enable_rebalance and hwm > last_small_flow_price * (1 + (small_flow_pct * 0.5)):
-            rebalance_small_target_price = round(hwm * (1 - small_flow_pct), 8)
-            logging.info(f"🔄 [Rebalance] {market}: small_flow HWM({hwm}) 기반 타겟 조정 -> {rebalance_small_target_price} (기존 매수가: {last_small_flow_price})")
-
-        rebalance_large_target_price = None
-        if enable_rebalance and hwm > last_large_flow_price * (1 + (large_flow_pct * 0.5)):
-            rebalance_large_target_price = round(hwm * (1 - large_flow_pct), 8)
-            logging.info(f"🔄 [Rebalance] {market}: large_flow HWM({hwm}) 기반 타겟 조정 -> {rebalance_large_target_price} (기존 매수가: {last_large_flow_price})")
-
-        small_target_price = rebalance_small_target_price if rebalance_small_target_price is not None else round(last_small_flow_price * (1 - small_flow_pct), 8)
-        large_target_price = rebalance_large_target_price if rebalance_large_target_price is not None else round(last_large_flow_price * (1 - large_flow_pct), 8)
-        
-        if current_price <= small_target_price:
-            if not market_buy_log[(market_buy_log["buy_type"] == "small_flow") & (market_buy_log["filled"].isin(["wait", "update"]))].empty:
-                logging.debug(f"ℹ️ {market}: 이미 대기 중인 small_flow 주문이 있어 건너뜁니다.")
-            else:
-                buy_amount = base_unit_size_for_flow * float(setting["small_flow_units"])
-                required_margin = (buy_amount / leverage) * config.MARGIN_BUFFER_FACTOR
-                if usdt_balance >= required_margin:
-                    new_orders.append({
-                        "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "market": market,
-                        "target_price": small_target_price, "buy_amount": buy_amount,
-                        "buy_units": 1, "buy_type": "small_flow", "filled": "update",
-                        "base_unit_size": np.nan
-                    })
-                else:
-                    logging.warning(f"⚠️ {market} small_flow 매수 실패 (잔고 부족). 필요 증거금(버퍼 포함): {required_margin:.2f}, 보유: {usdt_balance:.2f}")
-
-        if current_price <= large_target_price:
-            if not market_buy_log[(market_buy_log["buy_type"] == "large_flow") & (market_buy_log["filled"].isin(["wait", "update"]))].empty:
-                logging.debug(f"ℹ️ {market}: 이미 대기 중인 large_flow 주문이 있어 건너뜁니다.")
-            else:
-                buy_amount = base_unit_size_for_flow * float(setting["large_flow_units"])
-                required_margin = (buy_amount / leverage) * config.MARGIN_BUFFER_FACTOR
-                if usdt_balance >= required_margin:
-                    new_orders.append({
-                        "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "market": market,
-                        "target_price": large_target_price, "buy_amount": buy_amount,
-                        "buy_units": 1, "buy_type": "large_flow", "filled": "update",
-                        "base_unit_size": np.nan
-                    })
-                else:
-                    logging.warning(f"⚠️ {market} large_flow 매수 실패 (잔고 부족). 필요 증거금(버퍼 포함): {required_margin:.2f}, 보유: {usdt_balance:.2f}")
+            open_types = set(market_buy_log.loc[market_buy_log["filled"].isin(["wait", "update"]), "buy_type"])
+            small_flow_open, large_flow_open = "small_flow" in open_types, "large_flow" in open_types
+
+        orders = decide_buy_orders(
+            setting, current_price, usdt_balance,
+            is_new=market_buy_log.empty and market not in holdings,
+            base_unit_size=base_unit_size_for_flow,
+            last_small_flow_price=get_last_small_flow_or_initial_price(market_buy_log),
+            last_large_flow_price=get_last_large_flow_or_initial_price(market_buy_log),
+            small_flow_open=small_flow_open, large_flow_open=large_flow_open,
+            hwm=context.hwm.get_hwm(market), enable_rebalance=enable_rebalance)
+        now = context.now().strftime('%Y-%m-%d %H:%M:%S')
+        new_orders.extend({"time": now, **order} for order in orders)
 
     return pd.DataFrame(new_orders)
 
 
-def generate_sell_orders(setting_df: pd.DataFrame, holdings: dict, sell_log_df: pd.DataFrame) -> pd.DataFrame:
+def generate_sell_orders(setting_df: pd.DataFrame, holdings: dict, sell_log_df: pd.DataFrame,
+                         context=None) -> pd.DataFrame:
+    context = context or live_context()
+    now = context.now()
     orders_to_action = []
     processed_markets = set()
 
@@ -160,7 +154,7 @@ def generate_sell_orders(setting_df: pd.DataFrame, holdings: dict, sell_log_df:
         new_order = {
             "market": market, "avg_buy_price": info['avg_price'], "quantity": info['balance'],
             "target_sell_price": target_price, "sell_uuid": "new", "filled": "new",
-            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            "time": now.strftime('%Y-%m-%d %H:%M:%S')
         }
         orders_to_action.append(new_order)
 
@@ -4,7 +4,22 @@ import numpy as np
 import os
 import logging
 import itertools
+import json
+import time
+import socket
 from datetime import datetime, timedelta
+from utils.candle_arrays import CandleArrays
+from utils.scenario_candles import ScenarioCandles
+from utils.worst_windows import worst_window_scenarios
+from utils.block_bootstrap import BlockBootstrap
+from utils.log_buffer import ColumnarLog
+from utils.instrumentation import EngineProfiler, merge_reports, format_report
+from utils.metrics import max_drawdown, performance_metrics, format_metrics
+from manager.backtest_engine import BacktestEngine, EngineState, ABORTED_UNTIL
+from manager.risk_policies import StopLossRefill, ProfitReset, TakeProfit, InitialEntry, FixedUnit, FlowLadder
+from manager.parallel_runner import run_parallel, default_workers
+from manager.job_queue import JobQueue
+from manager.sim_cache import SimCache, CheckpointStore, db_fingerprint, fingerprint_last_ts
 
 # --- 1. 시스템 설정 (Configuration) ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -37,6 +52,27 @@ GRID_PARAMS = {
     "SAVE_FULL_LOG": [False]
 }
 
+# 조기 중단 상한 (None 이면 사용 안 함). 손절 횟수나 누적 투입금이 이 값을 넘는 순간 시뮬레이션을 멈춥니다.
+# settings 에 같은 이름의 키가 있으면 그 값을 우선 사용합니다.
+MAX_SL_COUNT = None
+MAX_INJECTED = None
+
+# 조합 수가 이 값 이상이면 설정 축 벡터화(lockstep) 커널로 한 번에 평가
+LOCKSTEP_MIN_COMBOS = 64
+# 병렬 워커 수 (None 이면 CPU 코어 수, 1 이면 단일 프로세스)
+PARALLEL_WORKERS = None
+# 결과 테이블에 필요한 run_simulation 결과 필드 (작업 큐 기록 대상)
+RESULT_FIELDS = ("sl_count", "reset_count", "total_injected", "secured_profit", "final_equity", "aborted")
+
+# 결과 캐시 (같은 데이터 구간 + 같은 설정이면 저장된 결과를 재사용)
+USE_RESULT_CACHE = True
+ENGINE_NAME = "stress_test_btc_final"
+ENGINE_VERSION = "2"  # 시뮬레이션 로직(결과에 영향을 주는 코드) 또는 체크포인트 상태 형식을 바꾸면 반드시 올릴 것
+# 체크포인트 (데이터가 뒤로 늘어난 경우, 이전 실행의 종료 상태에서 새 캔들만 이어서 시뮬레이션)
+USE_CHECKPOINTS = True
+# 엔진 계측 (분기 횟수 / 단계별 시간 / candles·events per sec). 켜면 lockstep 대신 조합별 커널로 돌려 조합마다 계측
+INSTRUMENT = os.getenv("STRESS_INSTRUMENT", "false").lower() == "true"
+
 # --- 3. 데이터 로드 함수 ---
 def load_candles(market, start, end):
     if not os.path.exists(DB_PATH):
@@ -57,7 +93,16 @@ def load_candles(market, start, end):
         return pd.DataFrame()
 
 # --- 4. 시뮬레이션 엔진 (Core Logic) ---
-def run_simulation(df, settings):
+# 상세 로그(SAVE_FULL_LOG) 열 구성 (ColumnarLog 종류)
+FULL_LOG_COLUMNS = {
+    "시간": "time", "종가": "float64", "신호": "signal", "총 자산": "float64", "보유 현금": "float64",
+    "사용 증거금": "float64", "가용 증거금": "float64", "미실현 손익": "float64", "실현 손익": "float64",
+    "보유 수량": "float64", "평단가": "float64", "포지션 가치": "float64", "현재 유닛": "float64",
+    "전고점(HWM)": "float64", "단계": "int8",
+}
+
+def run_simulation(df, settings, profiler=None):
+    # profiler: utils.instrumentation.EngineProfiler (분기 횟수 / 단계별 시간 계측, None 이면 끔)
     # 설정값 언패킹
     unit_size = settings["UNIT_SIZE"]
     tp_pct = settings["TAKE_PROFIT_PCT"]
@@ -70,10 +115,12 @@ def run_simulation(df, settings):
     profit_reset_target = settings["PROFIT_RESET_TARGET"]
     margin_buffer = settings["MARGIN_BUFFER"]
     save_full_log = settings.get("SAVE_FULL_LOG", False)
+    max_sl, max_injected = _abort_limits(settings)
 
     # 상태 변수 초기화
     cash = INITIAL_CASH
     position = {'qty': 0.0, 'avg_price': 0.0}
+    aborted = False
     
     # 성과 추적 변수
     total_injected = 0.0
@@ -88,15 +135,26 @@ def run_simulation(df, settings):
     last_buy_price = 0.0
     hwm = 0.0
 
-    log_data = []
+    log_data = ColumnarLog(FULL_LOG_COLUMNS) if save_full_log else None
+    t = None
+    if profiler is not None:
+        profiler.start()
 
     for row in df.itertuples():
         now, high, low, close = row.timestamp, row.high, row.low, row.close
         action = ""
+        if profiler is not None:
+            t = profiler.sample()
 
         if cooldown_until and now < cooldown_until:
+            if profiler is not None:
+                profiler.count("cooldown_skip")
+            if t is not None:
+                t = profiler.lap("cooldown", t)
             if save_full_log:
                 log_data.append({"시간": now, "종가": close, "신호": "Cooldown", "보유 현금": cash, "총 자산": cash})
+                if t is not None:
+                    profiler.lap("logging", t)
             continue
         elif cooldown_until:
             cooldown_until = None
@@ -109,9 +167,13 @@ def run_simulation(df, settings):
         # 자산 평가
         unrealized_pnl = (low - position['avg_price']) * position['qty'] if position['qty'] > 0 else 0.0
         equity = cash + unrealized_pnl
+        if t is not None:
+            t = profiler.lap("equity", t)
 
         # 방어 로직 (Stop Loss & Refill)
         if equity <= INITIAL_CASH * STOP_LOSS_THRESHOLD:
+            if profiler is not None:
+                profiler.event("stop_loss", now)
             sl_count += 1
             salvaged_equity = equity * (1 - PANIC_SELL_PENALTY)
             needed = INITIAL_CASH - salvaged_equity
@@ -125,13 +187,22 @@ def run_simulation(df, settings):
             action = "Stop Loss & Refill"
             if save_full_log:
                 log_data.append({"시간": now, "종가": close, "신호": action, "보유 현금": cash, "총 자산": equity})
+            if t is not None:
+                profiler.lap("stop_loss", t)
+            if sl_count > max_sl or total_injected > max_injected:
+                aborted = True
+                break
             continue
 
         # 수익 실현 로직 (Profit Reset)
         if profit_reset_target is not None:
             target_equity = INITIAL_CASH * (1 + profit_reset_target)
             current_eval_equity = cash + ((close - position['avg_price']) * position['qty']) if position['qty'] > 0 else cash
+            if profiler is not None:
+                profiler.count("reset_check")
             if current_eval_equity >= target_equity:
+                if profiler is not None:
+                    profiler.event("profit_reset", now)
                 reset_count += 1
                 if position['qty'] > 0:
                     exec_price = close * (1 - SLIPPAGE_RATE)
@@ -150,12 +221,20 @@ def run_simulation(df, settings):
                 action = "Profit Reset"
                 if save_full_log:
                     log_data.append({"시간": now, "종가": close, "신호": action, "보유 현금": cash, "총 자산": current_eval_equity})
+                if t is not None:
+                    profiler.lap("profit_reset", t)
                 continue
+            if t is not None:
+                t = profiler.lap("profit_reset", t)
 
         # 매도(익절) 체크
         if position['qty'] > 0:
             target_price = position['avg_price'] * (1 + tp_pct)
+            if profiler is not None:
+                profiler.count("tp_check")
             if high >= target_price:
+                if profiler is not None:
+                    profiler.event("take_profit", now)
                 exec_price = target_price * (1 - SLIPPAGE_RATE)
                 revenue = position['qty'] * exec_price
                 cost = position['qty'] * position['avg_price']
@@ -169,7 +248,11 @@ def run_simulation(df, settings):
                 action = "Take Profit"
                 if save_full_log:
                     log_data.append({"시간": now, "종가": close, "신호": action, "보유 현금": cash, "총 자산": cash})
+                if t is not None:
+                    profiler.lap("take_profit", t)
                 continue
+            if t is not None:
+                t = profiler.lap("take_profit", t)
 
         # 매수 로직
         if position['qty'] == 0:
@@ -184,6 +267,8 @@ def run_simulation(df, settings):
                 position = {'qty': qty, 'avg_price': exec_price}
                 last_buy_price, buy_step, hwm = exec_price, 1, exec_price
                 action = "Initial Buy"
+                if profiler is not None:
+                    profiler.event("initial_buy", now)
         elif buy_step > 0:
             if buy_step == 1:
                 target_base, flow_pct, flow_units = last_buy_price, sf_pct, sf_units
@@ -195,6 +280,8 @@ def run_simulation(df, settings):
             if hwm > last_buy_price * (1 + (flow_pct * 0.5)):
                 target_base = hwm
             target_price = target_base * (1 - flow_pct)
+            if profiler is not None:
+                profiler.count("flow_check")
             
             if low <= target_price:
                 buy_amt = unit_size * flow_units
@@ -212,6 +299,10 @@ def run_simulation(df, settings):
                     
                     last_buy_price, buy_step, hwm = exec_price, buy_step + 1, exec_price
                     action = f"{'Small' if buy_step == 2 else 'Large'} Flow Buy"
+                    if profiler is not None:
+                        profiler.event("flow_buy", now)
+        if t is not None:
+            t = profiler.lap("buy", t)
         
         if save_full_log:
             pos_val = position['qty'] * close
@@ -234,81 +325,791 @@ def run_simulation(df, settings):
                 "전고점(HWM)": hwm,
                 "단계": buy_step
             })
+            if t is not None:
+                profiler.lap("logging", t)
 
     final_equity = cash
     if position['qty'] > 0:
         final_equity += (df.iloc[-1].close - position['avg_price']) * position['qty']
 
-    log_df = pd.DataFrame(log_data) if save_full_log else None
-    return {"sl_count": sl_count, "reset_count": reset_count, "total_injected": total_injected, "secured_profit": secured_profit, "final_equity": final_equity, "log_df": log_df}
+    log_df = log_data.to_frame() if save_full_log else None
+    res = {"sl_count": sl_count, "reset_count": reset_count, "total_injected": total_injected, "secured_profit": secured_profit, "final_equity": final_equity, "aborted": aborted, "log_df": log_df}
+    if profiler is not None:
+        profiler.stop(profiler.ticks)
+        res["profile"] = profiler.report()
+    return res
 
-# --- 5. 메인 실행 함수 ---
-def main():
-    scenarios = [
-        # {"name": "A (Bull)", "start": "2020-01-01 00:00:00", "end": "2021-06-01 23:59:59"},
-        # {"name": "B (Bear)", "start": "2022-01-01 00:00:00", "end": "2023-12-31 23:59:59"},
-        # {"name": "C (2025 10)", "start": "2025-10-01 00:00:00", "end": "2025-10-30 23:59:59"},
-        # {"name": "D (Full)", "start": "2020-01-01 00:00:00", "end": "2025-12-28 23:59:59"},
-        {"name": "E (최근3년)", "start": "2023-01-01 00:00:00", "end": "2025-12-28 23:59:59"}
+
+def _abort_limits(settings):
+    """(손절 횟수 상한, 누적 투입금 상한). 설정이 없으면 무한대."""
+    max_sl = settings.get("MAX_SL_COUNT", MAX_SL_COUNT)
+    max_injected = settings.get("MAX_INJECTED", MAX_INJECTED)
+    return (np.inf if max_sl is None else max_sl), (np.inf if max_injected is None else max_injected)
+
+# --- 4-1. 배열 기반 고속 시뮬레이션 커널 ---
+COOLDOWN_NS = COOLDOWN_MINUTES * 60 * 1_000_000_000
+GUARD_EPS = 1e-9  # 가격 가드 여유폭 (가드는 판정 후보만 거르고, 실제 판정은 원본 식으로 다시 계산)
+
+
+class SimState(EngineState):
+    """run_simulation_fast 의 상태 묶음 (manager.backtest_engine.EngineState, 초기 자본 INITIAL_CASH)."""
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(INITIAL_CASH)
+
+
+def engine_policies(settings):
+    """run_simulation 의 매매 규칙을 BacktestEngine 정책 목록으로 (손절 & 리필 → 리셋 → 익절 → 최초 매수 → 물타기)."""
+    policies = [StopLossRefill(STOP_LOSS_THRESHOLD, PANIC_SELL_PENALTY, COOLDOWN_MINUTES,
+                               max_sl_count=settings.get("MAX_SL_COUNT", MAX_SL_COUNT),
+                               max_injected=settings.get("MAX_INJECTED", MAX_INJECTED))]
+    if settings["PROFIT_RESET_TARGET"] is not None:
+        policies.append(ProfitReset(settings["PROFIT_RESET_TARGET"]))
+    policies += [
+        TakeProfit(settings["TAKE_PROFIT_PCT"]),
+        InitialEntry(settings["INITIAL_UNITS"], FixedUnit(settings["UNIT_SIZE"])),
+        # 원본 루프는 large flow 이후에도 직전 기준가로 추가 매수를 반복함
+        FlowLadder([(settings["SMALL_FLOW_PCT"], settings["SMALL_FLOW_UNITS"]),
+                    (settings["LARGE_FLOW_PCT"], settings["LARGE_FLOW_UNITS"])], repeat_last=True),
     ]
+    return policies
+
+
+def build_engine(settings):
+    return BacktestEngine(engine_policies(settings), INITIAL_CASH, FEE_RATE, SLIPPAGE_RATE,
+                          settings["LEVERAGE"], settings["MARGIN_BUFFER"])
+
+
+def run_simulation_fast(candles, settings, state=None, start=0, stop=None, profiler=None):
+    """
+    run_simulation 과 동일한 결과를 내는 배열 기반 커널입니다 (공통 BacktestEngine + engine_policies).
+    판정 임계값은 포지션이 바뀔 때만 다시 계산하고, PriceIndex 로 그 임계값을 처음 건드리는 캔들까지 바로 점프합니다.
+    [start, stop) 구간만 처리하며, 앞 구간의 state 를 넘기면 이어서 실행한 결과가 전체 실행과 같습니다.
+    SAVE_FULL_LOG 는 지원하지 않으므로 상세 로그가 필요하면 run_simulation 을 사용하세요.
+    profiler 를 넘기면 점프 / 평가 단계 시간과 분기 횟수를 계측합니다.
+    """
+    return build_engine(settings).run(candles, state if state is not None else SimState(), start, stop, profiler)
+
+
+# --- 4-2. 설정 축 벡터화 (Lockstep) 그리드 커널 ---
+def run_simulation_grid(candles, settings_list):
+    """
+    K 개의 파라미터 조합을 캔들 한 번 순회로 동시에 평가합니다.
+    cash/qty/avg_price/buy_step/hwm/cooldown_until 등을 길이 K 벡터로 두고
+    손절·리셋·익절·최초매수·추가매수 분기를 마스크로 적용하므로 결과는 조합별 run_simulation 과 같습니다.
+    어떤 조합도 임계값을 건드리지 않는 캔들은 PriceIndex 로 건너뜁니다.
+    """
+    if not isinstance(candles, CandleArrays):
+        candles = CandleArrays.from_df(candles)
+    k = len(settings_list)
+    index = candles.price_index()
+    highs, lows, closes, timestamps = candles.high, candles.low, candles.close, candles.timestamp
+    n = len(timestamps)
+
+    def _param(key):
+        return np.array([s[key] for s in settings_list], dtype=np.float64)
+
+    unit_size = _param("UNIT_SIZE")
+    sf_pct, lf_pct = _param("SMALL_FLOW_PCT"), _param("LARGE_FLOW_PCT")
+    sf_units, lf_units = _param("SMALL_FLOW_UNITS"), _param("LARGE_FLOW_UNITS")
+    leverage, margin_buffer = _param("LEVERAGE"), _param("MARGIN_BUFFER")
+    tp_rate = 1 + _param("TAKE_PROFIT_PCT")
+    init_buy_amt = unit_size * _param("INITIAL_UNITS")
+    init_required_margin = (init_buy_amt / leverage) * margin_buffer
+    use_reset = np.array([s["PROFIT_RESET_TARGET"] is not None for s in settings_list])
+    target_equity = np.array([INITIAL_CASH * (1 + s["PROFIT_RESET_TARGET"]) if s["PROFIT_RESET_TARGET"] is not None
+                              else np.inf for s in settings_list])
+    sl_equity = INITIAL_CASH * STOP_LOSS_THRESHOLD
+    salvage_rate = 1 - PANIC_SELL_PENALTY
+    sell_rate = 1 - SLIPPAGE_RATE
+    buy_rate = 1 + SLIPPAGE_RATE
+    limits = [_abort_limits(s) for s in settings_list]
+    max_sl = np.array([lim[0] for lim in limits], dtype=np.float64)
+    max_injected = np.array([lim[1] for lim in limits], dtype=np.float64)
+
+    cash = np.full(k, INITIAL_CASH)
+    qty, avg_price = np.zeros(k), np.zeros(k)
+    buy_step = np.zeros(k, dtype=np.int64)
+    last_buy_price, hwm = np.zeros(k), np.zeros(k)
+    cooldown_until = np.zeros(k, dtype=np.int64)
+    target_base, flow_pct, flow_units = np.zeros(k), np.zeros(k), np.zeros(k)
+    total_injected, secured_profit, realized_pnl = np.zeros(k), np.zeros(k), np.zeros(k)
+    sl_count, reset_count = np.zeros(k, dtype=np.int64), np.zeros(k, dtype=np.int64)
+    aborted = np.zeros(k, dtype=bool)
+
+    def _close_position(mask):
+        qty[mask] = 0.0
+        avg_price[mask] = 0.0
+        buy_step[mask] = 0
+        last_buy_price[mask] = 0.0
+        hwm[mask] = 0.0
+
+    i = 0
+    while i < n:
+        # 1) 모든 조합의 다음 트리거 캔들 찾기 (가드는 후보만 거르고 판정은 아래 마스크 로직이 담당)
+        holding = (qty > 0) & (cooldown_until == 0)
+        # 무포지션 조합은 다음 캔들에서 바로 진입/손절/리셋이 일어날 수 있으면 즉시 처리
+        idle = (qty == 0) & (cooldown_until == 0) & (
+            (cash >= init_required_margin) | (cash <= sl_equity) | (use_reset & (cash >= target_equity)))
+        if idle.any():
+            j = i
+        else:
+            j = n
+            cooling = cooldown_until > 0
+            if cooling.any():
+                j = index.index_at_or_after(int(cooldown_until[cooling].min()), i)
+            if holding.any():
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    sl_guard = avg_price + (sl_equity - cash) / qty
+                    sl_guard += np.abs(sl_guard) * GUARD_EPS
+                    reset_guard = avg_price + (target_equity - cash) / qty
+                    reset_guard -= np.abs(reset_guard) * GUARD_EPS
+                step_pct = np.where(buy_step == 1, sf_pct, np.where(buy_step == 2, lf_pct, flow_pct))
+                step_units = np.where(buy_step == 1, sf_units, np.where(buy_step == 2, lf_units, flow_units))
+                step_base = np.where(buy_step <= 2, last_buy_price, target_base)
+                flow_thr = last_buy_price * (1 + (step_pct * 0.5))
+                flow_target = np.where(hwm > flow_thr, hwm, step_base) * (1 - step_pct)
+                affordable = cash >= ((unit_size * step_units) / leverage) * margin_buffer
+                low_trigger = np.where(affordable, np.maximum(sl_guard, flow_target), sl_guard)
+                high_trigger = np.minimum(avg_price * tp_rate, np.where(affordable, np.maximum(hwm, flow_thr), np.inf))
+                reset_trigger = np.where(use_reset, reset_guard, np.inf)
+                j = min(j, index.next_trigger(i, low_trigger[holding].max(), high_trigger[holding].min(),
+                                              reset_trigger[holding].min()))
+                if j > i:
+                    np.maximum(hwm, index.max_high(i, j), out=hwm, where=holding)
+        if j >= n:
+            break
+
+        # 2) 캔들 j 를 모든 조합에 대해 원본 루프와 같은 순서로 처리
+        now, high, low, close = timestamps.item(j), highs.item(j), lows.item(j), closes.item(j)
+        i = j + 1
+
+        active = cooldown_until <= now
+        cooldown_until[active] = 0
+        holding = active & (qty > 0)
+        np.maximum(hwm, high, out=hwm, where=holding)
+        hwm[active & ~holding] = 0.0
+
+        equity = cash + (low - avg_price) * qty
+        done = active & (equity <= sl_equity)
+        if done.any():
+            sl_count += done
+            salvaged_equity = equity * salvage_rate
+            needed = INITIAL_CASH - salvaged_equity
+            total_injected += np.where(done & (needed > 0), needed, 0.0)
+            realized_pnl += np.where(done, salvaged_equity - cash, 0.0)
+            cash[done] = INITIAL_CASH
+            _close_position(done)
+            cooldown_until[done] = now + COOLDOWN_NS
+            # 상한을 넘은 조합은 영원히 쿨다운 상태로 두어 이후 캔들에서 제외
+            over = done & ((sl_count > max_sl) | (total_injected > max_injected))
+            aborted |= over
+            cooldown_until[over] = ABORTED_UNTIL
+
+        live = active & ~done
+        eval_equity = cash + (close - avg_price) * qty
+        reset = live & use_reset & (eval_equity >= target_equity)
+        if reset.any():
+            reset_count += reset
+            revenue = qty * (close * sell_rate)
+            pnl = (revenue - qty * avg_price) - revenue * FEE_RATE
+            pnl_mask = reset & (qty > 0)
+            cash += np.where(pnl_mask, pnl, 0.0)
+            realized_pnl += np.where(pnl_mask, pnl, 0.0)
+            profit = cash - INITIAL_CASH
+            secured_profit += np.where(reset & (profit > 0), profit, 0.0)
+            cash[reset] = INITIAL_CASH
+            _close_position(reset)
+            live &= ~reset
+
+        flat = live & (qty == 0)
+        holding = live & (qty > 0)
+        tp_target = avg_price * tp_rate
+        take = holding & (high >= tp_target)
+        if take.any():
+            revenue = qty * (tp_target * sell_rate)
+            pnl = (revenue - qty * avg_price) - revenue * FEE_RATE
+            cash += np.where(take, pnl, 0.0)
+            realized_pnl += np.where(take, pnl, 0.0)
+            _close_position(take)
+            holding &= ~take
+
+        entry = flat & (cash >= init_required_margin)
+        if entry.any():
+            exec_price = close * buy_rate
+            fee = init_buy_amt * FEE_RATE
+            cash -= np.where(entry, fee, 0.0)
+            realized_pnl -= np.where(entry, fee, 0.0)
+            qty[entry] = (init_buy_amt / exec_price)[entry]
+            avg_price[entry] = exec_price
+            last_buy_price[entry] = exec_price
+            buy_step[entry] = 1
+            hwm[entry] = exec_price
+
+        if holding.any():
+            # buy_step >= 3 이면 직전 target_base / flow_pct / flow_units 를 그대로 재사용 (원본과 동일)
+            first, second = holding & (buy_step == 1), holding & (buy_step == 2)
+            ladder = first | second
+            target_base[ladder] = last_buy_price[ladder]
+            flow_pct[first], flow_pct[second] = sf_pct[first], lf_pct[second]
+            flow_units[first], flow_units[second] = sf_units[first], lf_units[second]
+            rebalance = holding & (hwm > last_buy_price * (1 + (flow_pct * 0.5)))
+            target_base[rebalance] = hwm[rebalance]
+            target_price = target_base * (1 - flow_pct)
+            buy_amt = unit_size * flow_units
+            flow = holding & (low <= target_price) & (cash >= (buy_amt / leverage) * margin_buffer)
+            if flow.any():
+                exec_price = target_price * buy_rate
+                fee = buy_amt * FEE_RATE
+                cash -= np.where(flow, fee, 0.0)
+                realized_pnl -= np.where(flow, fee, 0.0)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    add_qty = buy_amt / exec_price
+                    new_qty = qty + add_qty
+                    new_avg = ((qty * avg_price) + (add_qty * exec_price)) / new_qty
+                qty[flow], avg_price[flow] = new_qty[flow], new_avg[flow]
+                last_buy_price[flow] = exec_price[flow]
+                buy_step[flow] += 1
+                hwm[flow] = exec_price[flow]
+
+    final_equity = cash + np.where(qty > 0, (closes.item(n - 1) - avg_price) * qty, 0.0) if n else cash
+
+    # run_simulation_fast 로 이어서 실행할 수 있는 상태 (끝 시점 target_base 는 fast 커널과 같은 규칙으로 맞춤)
+    holding = qty > 0
+    step_pct = np.where(buy_step == 1, sf_pct, np.where(buy_step == 2, lf_pct, flow_pct))
+    step_base = np.where(buy_step <= 2, last_buy_price, target_base)
+    target_base = np.where(holding & (hwm > last_buy_price * (1 + (step_pct * 0.5))), hwm,
+                           np.where(holding, step_base, target_base))
+    results = []
+    for c in range(k):
+        state = SimState()
+        state.cash, state.qty, state.avg_price = cash.item(c), qty.item(c), avg_price.item(c)
+        state.unit_size = unit_size.item(c)
+        state.buy_step, state.last_buy_price, state.hwm = int(buy_step[c]), last_buy_price.item(c), hwm.item(c)
+        state.cooldown_until = int(cooldown_until[c])
+        state.target_base, state.flow_pct, state.flow_units = target_base.item(c), flow_pct.item(c), flow_units.item(c)
+        state.total_injected, state.secured_profit = total_injected.item(c), secured_profit.item(c)
+        state.sl_count, state.reset_count, state.realized_pnl = int(sl_count[c]), int(reset_count[c]), realized_pnl.item(c)
+        results.append({"sl_count": state.sl_count, "reset_count": state.reset_count,
+                        "total_injected": state.total_injected, "secured_profit": state.secured_profit,
+                        "final_equity": final_equity.item(c), "aborted": bool(aborted[c]), "log_df": None,
+                        "state": state})
+    return results
+
+
+def simulate_batch(candles, batch):
+    """
+    (조합 번호, settings) 묶음을 평가해 (조합 번호, 결과) 리스트를 반환합니다.
+    묶음이 LOCKSTEP_MIN_COMBOS 이상이면 lockstep 커널, 아니면 조합별 배열 커널을 사용합니다.
+    병렬 워커에서도 그대로 호출되므로 모듈 최상위에 둡니다.
+    """
+    settings_list = [settings for _, settings in batch]
+    if INSTRUMENT:
+        results = [run_simulation_fast(candles, settings, profiler=EngineProfiler()) for settings in settings_list]
+    elif len(batch) >= LOCKSTEP_MIN_COMBOS:
+        results = run_simulation_grid(candles, settings_list)
+    else:
+        results = [run_simulation_fast(candles, settings) for settings in settings_list]
+    return [(c, res) for (c, _), res in zip(batch, results)]
+
+
+def make_batches(items, workers):
+    """워커당 몫이 lockstep 기준 이상이면 워커 수만큼 나누고, 아니면 조합 하나씩 작업으로 만듭니다."""
+    per_worker = -(-len(items) // max(workers, 1))
+    if per_worker >= LOCKSTEP_MIN_COMBOS:
+        return [items[w:w + per_worker] for w in range(0, len(items), per_worker)]
+    return [[item] for item in items]
+
+
+# --- 5. 메인 실행 함수 ---
+SCENARIOS = [
+    # {"name": "A (Bull)", "start": "2020-01-01 00:00:00", "end": "2021-06-01 23:59:59"},
+    # {"name": "B (Bear)", "start": "2022-01-01 00:00:00", "end": "2023-12-31 23:59:59"},
+    # {"name": "C (2025 10)", "start": "2025-10-01 00:00:00", "end": "2025-10-30 23:59:59"},
+    # {"name": "D (Full)", "start": "2020-01-01 00:00:00", "end": "2025-12-28 23:59:59"},
+    {"name": "E (최근3년)", "start": "2023-01-01 00:00:00", "end": "2025-12-28 23:59:59"}
+]
+
+# 자동 스트레스 구간: 전체 이력에서 가장 나쁜 구간 top_n 개를 찾아 SCENARIOS 뒤에 추가 (None 이면 사용 안 함)
+# metric: drawdown(구간 내 최대 낙폭) / crash(전고점 대비 급락) / underwater(전고점 회복까지 가장 긴 기간)
+WORST_WINDOWS = None  # 예: [{"metric": "drawdown", "days": 30, "top_n": 3}, {"metric": "crash", "days": 3, "top_n": 2}]
+
+# 실행 모드: local(한 대에서 전부 실행) / coordinator(작업 큐 생성 + 결과 취합) / worker(작업 큐 처리)
+#           / halving(Successive Halving 최적화 탐색) / montecarlo(블록 부트스트랩 합성 경로 분포)
+RUN_MODE = os.getenv("STRESS_RUN_MODE", "local").lower()
+# 코디네이터와 워커가 함께 보는 작업 큐 SQLite 파일 (다른 호스트에서는 공유 경로 지정)
+JOB_QUEUE_PATH = os.getenv("STRESS_JOB_QUEUE", os.path.join(os.path.dirname(__file__), "db", "stress_jobs.sqlite"))
+JOB_POLL_SECONDS = 10
+
+
+def cache_key_settings(settings):
+    """캐시 키용 settings: 결과에 영향을 주는 모듈 상수까지 포함합니다."""
+    constants = {"INITIAL_CASH": INITIAL_CASH, "STOP_LOSS_THRESHOLD": STOP_LOSS_THRESHOLD,
+                 "PANIC_SELL_PENALTY": PANIC_SELL_PENALTY, "COOLDOWN_MINUTES": COOLDOWN_MINUTES,
+                 "FEE_RATE": FEE_RATE, "SLIPPAGE_RATE": SLIPPAGE_RATE,
+                 "MAX_SL_COUNT": MAX_SL_COUNT, "MAX_INJECTED": MAX_INJECTED}
+    return dict(settings, _constants=constants)
+
+
+def find_worst_scenarios(specs=None):
+    """
+    minute_candles 에 있는 MARKET 전체 이력을 한 번 읽어 WORST_WINDOWS 조건별 최악 구간을 시나리오로 만듭니다.
+    단조 deque 기반 선형 스캔이라 수년치 1분봉도 몇 초 안에 끝납니다.
+    """
+    specs = WORST_WINDOWS if specs is None else specs
+    if not specs or not os.path.exists(DB_PATH):
+        return []
+    with sqlite3.connect(DB_PATH) as conn:
+        first, last = conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM minute_candles WHERE market = ?",
+                                   (MARKET,)).fetchone()
+    if first is None:
+        return []
+    arrays = CandleArrays.from_df(load_candles(MARKET, first, last))
+    scenarios = []
+    for spec in specs:
+        found = worst_window_scenarios(arrays, spec["days"] * 1440, spec["metric"], spec.get("top_n", 3))
+        for sc in found:
+            print(f"  🔎 {sc['name']}: {sc['start']} ~ {sc['end']}")
+        scenarios.extend(found)
+    return scenarios
+
+
+def scenario_list():
+    """실행할 시나리오: 수동 SCENARIOS + 자동으로 찾은 최악 구간."""
+    return SCENARIOS + find_worst_scenarios()
+
+
+def load_checkpoints(store, scenario, settings_list, pending):
+    """
+    pending 조합 중 이전 실행의 체크포인트가 있는 것을 {조합 번호: (last_ts, SimState)} 로 반환합니다.
+    체크포인트 검증용 구간 지문은 last_ts 별로 한 번만 계산합니다.
+    """
+    scope = f"{MARKET}|{scenario['start']}"
+    fingerprints = {}
+
+    def fingerprint_at(last_ts):
+        if last_ts not in fingerprints:
+            fingerprints[last_ts] = db_fingerprint(DB_PATH, MARKET, scenario['start'], last_ts)
+        return fingerprints[last_ts]
+
+    found = {}
+    for c in pending:
+        hit = store.load(ENGINE_NAME, ENGINE_VERSION, scope, cache_key_settings(settings_list[c]),
+                         scenario['end'], fingerprint_at)
+        if hit is not None:
+            last_ts, state = hit
+            found[c] = (last_ts, SimState.from_dict(state))
+    return found
+
+
+def plan_scenario(scenario, settings_list, cache, checkpoints):
+    """
+    캔들을 읽기 전에 시나리오 하나의 실행 계획을 세웁니다.
+    캐시에 있는 조합은 결과를 바로 가져오고 (상세 로그 조합은 제외), 체크포인트가 있는 조합은 이어서 실행할 state 를 찾습니다.
+    load_start 는 필요한 데이터의 시작 시점이며, 모든 조합이 캐시에 있으면 None 입니다.
+    """
+    scope = f"{MARKET}|{scenario['start']}|{scenario['end']}"
+    fingerprint = None
+    if (cache is not None or checkpoints is not None) and os.path.exists(DB_PATH):
+        fingerprint = db_fingerprint(DB_PATH, MARKET, scenario['start'], scenario['end'])
+    cached = {}
+    if cache is not None and fingerprint is not None:
+        for c, settings in enumerate(settings_list):
+            if not settings.get("SAVE_FULL_LOG", False):
+                hit = cache.get(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint, cache_key_settings(settings))
+                if hit is not None:
+                    cached[c] = hit
+    if cached:
+        print(f"\n⚡ Scenario {scenario['name']}: 캐시된 결과 {len(cached)}/{len(settings_list)}개 재사용")
+
+    pending = [c for c, settings in enumerate(settings_list)
+               if not settings.get("SAVE_FULL_LOG", False) and c not in cached]
+    resumed = {}
+    if checkpoints is not None and fingerprint is not None:
+        resumed = load_checkpoints(checkpoints, scenario, settings_list, pending)
+    if resumed:
+        print(f"  ♻️ Scenario {scenario['name']}: 체크포인트에서 이어서 실행 {len(resumed)}/{len(pending)}개 조합")
+
+    # 처음부터 돌려야 하는 조합(또는 상세 로그 조합)이 없으면 가장 이른 체크포인트 이후만 필요
+    if len(cached) == len(settings_list):
+        load_start = None
+    elif len(resumed) < len(pending) or len(pending) + len(cached) < len(settings_list):
+        load_start = scenario['start']
+    else:
+        load_start = min(last_ts for last_ts, _ in resumed.values())
+    return {"scenario": scenario, "scope": scope, "fingerprint": fingerprint, "cached": cached,
+            "pending": pending, "resumed": resumed, "load_start": load_start}
+
 
+def grid_settings_list():
     keys = list(GRID_PARAMS.keys())
-    values = list(GRID_PARAMS.values())
-    combinations = list(itertools.product(*values))
+    return [dict(zip(keys, combo)) for combo in itertools.product(*GRID_PARAMS.values())]
+
+
+def save_full_log(scenario, settings, res):
+    p_target_str = "None" if settings["PROFIT_RESET_TARGET"] is None else f"{settings['PROFIT_RESET_TARGET']*100:.0f}%"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"StressTest_{scenario['name'].split()[0]}_{MARKET}_Lev{settings['LEVERAGE']}_LF{settings['LARGE_FLOW_UNITS']}_Reset{p_target_str}_Buffer{settings['MARGIN_BUFFER']}_{timestamp}.csv"
+    filename = filename.replace("(", "").replace(")", "").replace("%", "")
+    res['log_df'].to_csv(filename, index=False)
+    print(f"  💾 상세 로그 저장 완료: {filename}")
+    print(format_metrics(performance_metrics(res['log_df']["시간"], res['log_df']["총 자산"])))
+
+
+def build_result_row(scenario_name, settings, res):
+    p_target_str = "None" if settings["PROFIT_RESET_TARGET"] is None else f"{settings['PROFIT_RESET_TARGET']*100:.0f}%"
+    net_profit = (res['secured_profit'] + res['final_equity']) - (INITIAL_CASH + res['total_injected'])
+    total_invested = INITIAL_CASH + res['total_injected']
+    roi = (net_profit / total_invested) * 100 if total_invested > 0 else 0
+    return {
+        "Scenario": scenario_name, "Unit": settings["UNIT_SIZE"], "TP": settings["TAKE_PROFIT_PCT"],
+        "SF%": settings["SMALL_FLOW_PCT"], "LF%": settings["LARGE_FLOW_PCT"], "Init U": settings["INITIAL_UNITS"],
+        "SF U": settings["SMALL_FLOW_UNITS"], "LF U": settings["LARGE_FLOW_UNITS"], "Lev": settings["LEVERAGE"],
+        "Reset Target": p_target_str, "Buffer": settings["MARGIN_BUFFER"], "SL": res['sl_count'],
+        "Reset": res['reset_count'], "Injected": round(res['total_injected'], 2),
+        "Secured": round(res['secured_profit'], 2), "Final Eq": round(res['final_equity'], 2),
+        "Net Profit": round(net_profit, 2), "ROI %": round(roi, 2), "Aborted": res['aborted']
+    }
+
+
+def print_result_table(results, result_filename=None):
+    if not results:
+        return
+    df_res = pd.DataFrame(results)
+    if "Aborted" in df_res:
+        # 조기 중단된 조합의 Final Eq 는 중단 시점의 재충전 자본이라 완주한 조합과 비교할 수 없으므로 맨 뒤로
+        df_res = df_res.sort_values("Aborted", kind="stable")
+    print("\n" + "=" * 120)
+    print("📊 최종 테스트 결과 요약")
+    print("=" * 120)
+    pd.set_option('display.max_rows', None)
+    pd.set_option('display.width', 1000)
+    print(df_res.to_string(index=False))
     
+    result_filename = result_filename or f"stress_test_{MARKET.lower()}_final_result.csv"
+    df_res.to_csv(result_filename, index=False)
+    print(f"\n✅ 결과가 '{result_filename}' 파일로 저장되었습니다.")
+
+
+def main():
+    settings_list = grid_settings_list()
     results = []
 
     print(f"🚀 {MARKET} 순환형 자산 관리 전략 그리드 테스트 시작")
     print(f"💰 초기자본: ${INITIAL_CASH}, 손절선: -35%, 리필: Enabled")
-    print(f"🔍 총 {len(combinations)}개의 파라미터 조합 테스트 예정")
+    print(f"🔍 총 {len(settings_list)}개의 파라미터 조합 테스트 예정")
     print("=" * 100)
 
+    cache = SimCache() if USE_RESULT_CACHE else None
+    checkpoints = CheckpointStore() if USE_CHECKPOINTS else None
+
+    # 1) 시나리오별 계획: 캐시 적중 / 체크포인트 재개 여부와 필요한 데이터 구간 (캔들은 아직 읽지 않음)
+    plans = [plan_scenario(scenario, settings_list, cache, checkpoints) for scenario in scenario_list()]
+
+    # 2) 데이터가 필요한 시나리오 구간의 합집합을 한 번만 로드 (시나리오별로는 복사 없는 뷰만 사용)
+    ranges = [(plan['load_start'], plan['scenario']['end']) for plan in plans if plan['load_start'] is not None]
+    candles = None
+    if ranges:
+        print(f"\n▶ 데이터 로딩 중... (시나리오 {len(ranges)}개 구간 합집합)")
+        candles = ScenarioCandles.load(load_candles, MARKET, ranges)
+        print(f"  데이터 로드 완료: {len(candles.df)} candles.")
+
+    for plan in plans:
+        scenario, scope, fingerprint = plan['scenario'], plan['scope'], plan['fingerprint']
+        cached, pending, resumed = plan['cached'], plan['pending'], plan['resumed']
+        if plan['load_start'] is None:
+            results.extend(build_result_row(scenario['name'], settings, cached[c]) for c, settings in enumerate(settings_list))
+            continue
+
+        df, arrays = candles.view(plan['load_start'], scenario['end'])
+        if df.empty: continue
+        print(f"\n▶ Scenario {scenario['name']}: {len(df)} candles. 시뮬레이션 시작...")
+
+        # 상세 로그가 필요 없는 조합은 프로세스 풀로 나눠 평가 (캔들은 공유 메모리로 한 번만 게시)
+        fast_items = [(c, settings_list[c]) for c in pending if c not in resumed]
+        resume_tasks = [(c, settings_list[c], state,
+                         int(np.searchsorted(arrays.timestamp, pd.Timestamp(last_ts).value, side="right")), None)
+                        for c, (last_ts, state) in resumed.items()]
+        workers = PARALLEL_WORKERS or default_workers()
+        batch_results = {}
+        processed = len(arrays) * len(fast_items) + sum(len(arrays) - task[3] for task in resume_tasks)
+        started = time.perf_counter()
+        runs = [(make_batches(fast_items, workers), simulate_batch),
+                ([[task] for task in resume_tasks], simulate_resume_batch)]
+        for tasks, func in runs:
+            for batch in run_parallel(arrays, tasks, func, workers):
+                batch_results.update(batch)
+                if cache is not None:
+                    cache.put_many(ENGINE_NAME, ENGINE_VERSION, scope, fingerprint,
+                                   [(cache_key_settings(settings_list[c]), {k: res[k] for k in RESULT_FIELDS}) for c, res in batch])
+                if checkpoints is not None and fingerprint is not None:
+                    checkpoints.save_many(ENGINE_NAME, ENGINE_VERSION, f"{MARKET}|{scenario['start']}",
+                                          [(cache_key_settings(settings_list[c]), fingerprint_last_ts(fingerprint),
+                                            fingerprint, res['state'].to_dict()) for c, res in batch])
+                print(f"  ⏳ 진행: {len(batch_results)}/{len(pending)} 조합 완료")
+        elapsed = time.perf_counter() - started
+        if pending and elapsed > 0:
+            print(f"  ⚡ 처리량: {processed / elapsed:,.0f} candles/sec "
+                  f"({len(pending)}개 조합, {elapsed:.1f}초, 워커 {workers}개)")
+        if INSTRUMENT and batch_results:
+            print(format_report(merge_reports(res.get("profile") for res in batch_results.values()),
+                                title="배열 커널 계측 (조합 합계)"))
+
+        batch_results.update(cached)
+        for c, settings in enumerate(settings_list):
+            if c in batch_results:
+                res = batch_results[c]
+            else:
+                res = run_simulation(df, settings, profiler=EngineProfiler() if INSTRUMENT else None)
+                if INSTRUMENT:
+                    print(format_report(res["profile"], title="상세 로그 엔진 계측"))
+                if res['log_df'] is not None:
+                    save_full_log(scenario, settings, res)
+            results.append(build_result_row(scenario['name'], settings, res))
+
+    print_result_table(results)
+
+
+# --- 6. 분산 실행 (SQLite 작업 큐) ---
+def run_coordinator(queue_path=JOB_QUEUE_PATH, wait=True):
+    """GRID_PARAMS × SCENARIOS 작업을 큐에 넣고, wait 이면 모든 작업이 끝날 때까지 기다렸다가 결과를 취합합니다."""
+    queue = JobQueue(queue_path)
+    jobs = []
+    for scenario in scenario_list():
+        for settings in grid_settings_list():
+            key = f"{MARKET}|{scenario['name']}|{json.dumps(settings, sort_keys=True)}"
+            jobs.append((key, {"market": MARKET, "scenario": scenario, "settings": settings}))
+    added = queue.enqueue(jobs)
+    print(f"🗂️ 작업 큐: {queue_path} (신규 {added}개 / 전체 {len(jobs)}개)")
+
+    while wait and not queue.is_finished():
+        counts = queue.counts()
+        print(f"  ⏳ 대기 {counts.get('pending', 0)} | 실행 중 {counts.get('running', 0)} | 완료 {counts.get('done', 0)}")
+        time.sleep(JOB_POLL_SECONDS)
+
+    counts = queue.counts()
+    if counts.get("failed", 0):
+        logger.warning(f"⚠️ 실패한 작업 {counts['failed']}개 (jobs 테이블의 error 컬럼 확인)")
+    results = [build_result_row(payload["scenario"]["name"], payload["settings"], res)
+               for _, payload, res in queue.results()]
+    print_result_table(results)
+    return results
+
+
+def run_worker(queue_path=JOB_QUEUE_PATH, worker_id=None):
+    """큐가 빌 때까지 작업을 하나씩 가져와 실행하고 결과를 기록합니다. 처리한 작업 수를 반환합니다."""
+    worker_id = worker_id or os.getenv("STRESS_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(queue_path)
+    loaded = {}  # 시나리오별 캔들은 워커 안에서 한 번만 로드
+    done = 0
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            break
+        job_id, payload = job
+        scenario, settings = payload["scenario"], payload["settings"]
+        try:
+            if scenario["name"] not in loaded:
+                df = load_candles(payload["market"], scenario["start"], scenario["end"])
+                loaded[scenario["name"]] = (df, CandleArrays.from_df(df))
+            df, arrays = loaded[scenario["name"]]
+            if df.empty:
+                raise ValueError(f"캔들 데이터 없음: {scenario['name']}")
+            if settings.get("SAVE_FULL_LOG", False):
+                res = run_simulation(df, settings)
+                if res['log_df'] is not None:
+                    save_full_log(scenario, settings, res)
+            else:
+                res = run_simulation_fast(arrays, settings)
+            queue.complete(job_id, {k: res[k] for k in RESULT_FIELDS})
+            done += 1
+        except Exception as e:
+            queue.fail(job_id, worker_id, e)
+    logger.info(f"✅ 워커 {worker_id}: {done}개 작업 처리 후 종료")
+    return done
+
+
+# --- 7. Successive Halving 탐색 ---
+HALVING_FRACTIONS = [0.125, 0.25, 0.5, 1.0]  # 단계별로 평가하는 데이터 앞부분 비율 (마지막은 전체)
+HALVING_KEEP = 0.5                           # 단계마다 살아남는 후보 비율
+HALVING_MIN_SURVIVORS = 3
+
+
+def simulate_segment(candles, task):
+    """(조합 번호, settings, 이전 state, start, stop) 구간을 이어서 실행합니다. 병렬 워커에서 호출됩니다."""
+    c, settings, state, start, stop = task
+    return c, run_simulation_fast(candles, settings, state=state, start=start, stop=stop)
+
+
+def simulate_resume_batch(candles, batch):
+    """(조합 번호, settings, 체크포인트 state, start, stop) 묶음을 이어서 실행합니다."""
+    return [simulate_segment(candles, task) for task in batch]
+
+
+def _roi(res):
+    net_profit = (res['secured_profit'] + res['final_equity']) - (INITIAL_CASH + res['total_injected'])
+    return net_profit / (INITIAL_CASH + res['total_injected'])
+
+
+def rank_candidates(results):
+    """
+    ROI(높을수록), 손절 횟수, 누적 투입금(낮을수록) 각각의 순위를 더한 점수로 정렬한 조합 번호 목록.
+    조기 중단된 조합은 제외합니다.
+    """
+    alive = [c for c, res in results.items() if not res.get("aborted")]
+    score = dict.fromkeys(alive, 0)
+    for key, reverse in ((_roi, True), (lambda r: r['sl_count'], False), (lambda r: r['total_injected'], False)):
+        for rank, c in enumerate(sorted(alive, key=lambda c: key(results[c]), reverse=reverse)):
+            score[c] += rank
+    return sorted(alive, key=lambda c: (score[c], c))
+
+
+def run_successive_halving(candles, settings_list, fractions=None, keep=HALVING_KEEP, workers=None):
+    """
+    모든 후보를 데이터 앞부분에서 돌린 뒤 하위 후보를 버리고, 살아남은 후보만 더 긴 구간으로 승격합니다.
+    각 단계는 이전 단계의 state 에서 이어서 실행하므로 승격된 후보는 캔들을 다시 처리하지 않고,
+    마지막 단계 결과는 전체 구간을 한 번에 돌린 결과와 같습니다.
+    (최종 생존 조합 번호 순위, 조합별 마지막 결과, 처리한 캔들 수) 를 반환합니다.
+    """
+    fractions = fractions or HALVING_FRACTIONS
+    n = len(candles)
+    workers = workers or PARALLEL_WORKERS or default_workers()
+    results = {c: {"state": None} for c in range(len(settings_list))}
+    survivors = list(results)
+    start = 0
+    processed = 0
+    for rung, fraction in enumerate(fractions):
+        stop = n if rung == len(fractions) - 1 else max(int(n * fraction), start)
+        tasks = [(c, settings_list[c], results[c]["state"], start, stop) for c in survivors]
+        for c, res in run_parallel(candles, tasks, simulate_segment, workers):
+            results[c] = res
+        processed += (stop - start) * len(survivors)
+        ranked = rank_candidates({c: results[c] for c in survivors})
+        if stop >= n:
+            survivors = ranked
+            break
+        survivors = ranked[:max(HALVING_MIN_SURVIVORS, int(np.ceil(len(ranked) * keep)))]
+        print(f"  🔻 {rung + 1}단계 ({stop:,}/{n:,} candles): {len(ranked)}개 중 {len(survivors)}개 승격")
+        start = stop
+    return survivors, results, processed
+
+
+def run_optimizer():
+    settings_list = [s for s in grid_settings_list() if not s.get("SAVE_FULL_LOG", False)]
+    print(f"🎯 {MARKET} Successive Halving 탐색: 후보 {len(settings_list)}개, 단계 {HALVING_FRACTIONS}")
+    results = []
+    print("\n▶ 데이터 로딩 중...")
+    scenarios = scenario_list()
+    candles = ScenarioCandles.load(load_candles, MARKET, [(sc['start'], sc['end']) for sc in scenarios])
     for scenario in scenarios:
-        print(f"\n▶ Scenario {scenario['name']} 데이터 로딩 중...")
-        df = load_candles(MARKET, scenario['start'], scenario['end'])
+        df, arrays = candles.view(scenario['start'], scenario['end'])
         if df.empty: continue
-        print(f"  데이터 로드 완료: {len(df)} candles. 시뮬레이션 시작...")
-        
-        for combo in combinations:
-            settings = dict(zip(keys, combo))
-            p_target_str = "None" if settings["PROFIT_RESET_TARGET"] is None else f"{settings['PROFIT_RESET_TARGET']*100:.0f}%"
-            
-            res = run_simulation(df, settings)
-            
-            net_profit = (res['secured_profit'] + res['final_equity']) - (INITIAL_CASH + res['total_injected'])
-            total_invested = INITIAL_CASH + res['total_injected']
-            roi = (net_profit / total_invested) * 100 if total_invested > 0 else 0
-            
-            if settings.get("SAVE_FULL_LOG", False) and res['log_df'] is not None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"StressTest_{scenario['name'].split()[0]}_{MARKET}_Lev{settings['LEVERAGE']}_LF{settings['LARGE_FLOW_UNITS']}_Reset{p_target_str}_Buffer{settings['MARGIN_BUFFER']}_{timestamp}.csv"
-                filename = filename.replace("(", "").replace(")", "").replace("%", "")
-                res['log_df'].to_csv(filename, index=False)
-                print(f"  💾 상세 로그 저장 완료: {filename}")
-
-            result_row = {
-                "Scenario": scenario['name'], "Unit": settings["UNIT_SIZE"], "TP": settings["TAKE_PROFIT_PCT"],
-                "SF%": settings["SMALL_FLOW_PCT"], "LF%": settings["LARGE_FLOW_PCT"], "Init U": settings["INITIAL_UNITS"],
-                "SF U": settings["SMALL_FLOW_UNITS"], "LF U": settings["LARGE_FLOW_UNITS"], "Lev": settings["LEVERAGE"],
-                "Reset Target": p_target_str, "Buffer": settings["MARGIN_BUFFER"], "SL": res['sl_count'],
-                "Reset": res['reset_count'], "Injected": round(res['total_injected'], 2),
-                "Secured": round(res['secured_profit'], 2), "Final Eq": round(res['final_equity'], 2),
-                "Net Profit": round(net_profit, 2), "ROI %": round(roi, 2)
-            }
-            results.append(result_row)
-
-    if results:
-        df_res = pd.DataFrame(results)
-        print("\n" + "=" * 120)
-        print("📊 최종 테스트 결과 요약")
-        print("=" * 120)
-        pd.set_option('display.max_rows', None)
-        pd.set_option('display.width', 1000)
-        print(df_res.to_string(index=False))
-        
-        result_filename = f"stress_test_{MARKET.lower()}_final_result.csv"
-        df_res.to_csv(result_filename, index=False)
-        print(f"\n✅ 결과가 '{result_filename}' 파일로 저장되었습니다.")
+        print(f"\n▶ Scenario {scenario['name']}: {len(df)} candles")
+        started = time.perf_counter()
+        ranked, scenario_results, processed = run_successive_halving(arrays, settings_list)
+        elapsed = time.perf_counter() - started
+        full_cost = len(arrays) * len(settings_list)
+        print(f"  ⚡ 처리 캔들 {processed:,} (전체 그리드 대비 {processed / max(full_cost, 1) * 100:.1f}%), {elapsed:.1f}초")
+        results.extend(build_result_row(scenario['name'], settings_list[c], scenario_results[c]) for c in ranked)
+    print_result_table(results, f"stress_test_{MARKET.lower()}_halving_result.csv")
+    return results
+
+
+
+# --- 8. Monte Carlo 블록 부트스트랩 ---
+MC_PATHS = int(os.getenv("STRESS_MC_PATHS", "1000"))  # 시나리오별 합성 경로 수
+MC_BLOCK_MINUTES = 1440   # 부트스트랩 블록 길이 (1440=일 단위, 60=시간 단위)
+MC_MDD_MINUTES = 1440     # MDD 평가 간격 (이 간격마다 계좌 평가액을 찍어 낙폭 계산)
+MC_SEED = 42              # 경로 p 의 난수 = default_rng([MC_SEED, p]) → 워커 수/배분과 무관하게 재현
+MC_PATHS_PER_TASK = 16
+MC_PERCENTILES = (5, 50, 95)
+
+
+def run_simulation_mdd(candles, settings, step=MC_MDD_MINUTES):
+    """
+    run_simulation_fast 를 step 캔들씩 이어서 실행하며 구간 끝마다 투입 원금 1달러당 자산
+    ((평가 자산 + 확보 수익) / (초기 자본 + 추가 투입금)) 을 찍어 MDD(%) 를 함께 계산합니다.
+    손절 후 재충전된 금액은 원금에 더해지므로 낙폭으로 잡히고, 결과 값은 한 번에 돌린 것과 같습니다.
+    """
+    state, values, res = None, [1.0], None
+    for start in range(0, len(candles), step):
+        res = run_simulation_fast(candles, settings, state=state, start=start, stop=start + step)
+        state = res['state']
+        values.append((res['final_equity'] + res['secured_profit']) / (INITIAL_CASH + res['total_injected']))
+        if res['aborted']:
+            break
+    if res is None:
+        res = run_simulation_fast(candles, settings)
+    return dict(res, mdd=max_drawdown(values)[0] * 100)
+
+
+def simulate_mc_paths(candles, task):
+    """(경로 번호 목록, settings 목록, 경로 길이) 작업: 원본 캔들에서 경로를 만들어 조합별로 실행합니다."""
+    path_ids, settings_list, length = task
+    bootstrap = BlockBootstrap(candles, MC_BLOCK_MINUTES)
+    rows = []
+    for p in path_ids:
+        path = bootstrap.path(np.random.default_rng([MC_SEED, p]), length)
+        for c, settings in enumerate(settings_list):
+            res = run_simulation_mdd(path, settings)
+            rows.append({"path": p, "combo": c, "sl_count": res['sl_count'], "total_injected": res['total_injected'],
+                         "final_equity": res['final_equity'], "secured_profit": res['secured_profit'],
+                         "mdd": res['mdd']})
+    return rows
+
+
+def summarize_mc(scenario_name, settings, paths_df):
+    """경로별 결과의 분포 요약 (평균 + MC_PERCENTILES 분위수, 손절 발생 확률)."""
+    p_target_str = "None" if settings["PROFIT_RESET_TARGET"] is None else f"{settings['PROFIT_RESET_TARGET']*100:.0f}%"
+    row = {"Scenario": scenario_name, "Unit": settings["UNIT_SIZE"], "TP": settings["TAKE_PROFIT_PCT"],
+           "SF%": settings["SMALL_FLOW_PCT"], "LF%": settings["LARGE_FLOW_PCT"], "Lev": settings["LEVERAGE"],
+           "Reset Target": p_target_str, "Buffer": settings["MARGIN_BUFFER"], "Paths": len(paths_df)}
+    row["SL≥1 %"] = round((paths_df["sl_count"] > 0).mean() * 100, 2)
+    for col, label in (("sl_count", "SL"), ("total_injected", "Injected"), ("final_equity", "Final Eq"), ("mdd", "MDD %")):
+        row[f"{label} mean"] = round(paths_df[col].mean(), 2)
+        for q in MC_PERCENTILES:
+            row[f"{label} p{q}"] = round(float(np.percentile(paths_df[col], q)), 2)
+    return row
+
+
+def run_monte_carlo(num_paths=None, workers=None):
+    """시나리오별로 같은 길이의 합성 경로 num_paths 개를 만들어 프로세스 풀에서 실행하고 분포를 출력합니다."""
+    num_paths = num_paths or MC_PATHS
+    settings_list = [s for s in grid_settings_list() if not s.get("SAVE_FULL_LOG", False)]
+    workers = workers or PARALLEL_WORKERS or default_workers()
+    print(f"🎲 {MARKET} Monte Carlo 블록 부트스트랩: 경로 {num_paths}개 × 조합 {len(settings_list)}개, "
+          f"블록 {MC_BLOCK_MINUTES}분, seed {MC_SEED}")
+
+    scenarios = scenario_list()
+    candles = ScenarioCandles.load(load_candles, MARKET, [(sc['start'], sc['end']) for sc in scenarios])
+    results, path_frames = [], []
+    for scenario in scenarios:
+        _, arrays = candles.view(scenario['start'], scenario['end'])
+        if len(arrays) < MC_BLOCK_MINUTES: continue
+        tasks = [(list(range(p, min(p + MC_PATHS_PER_TASK, num_paths))), settings_list, len(arrays))
+                 for p in range(0, num_paths, MC_PATHS_PER_TASK)]
+        rows = []
+        started = time.perf_counter()
+        for batch in run_parallel(arrays, tasks, simulate_mc_paths, workers):
+            rows.extend(batch)
+            print(f"  ⏳ {scenario['name']}: {len(rows) // max(len(settings_list), 1)}/{num_paths} 경로 완료")
+        print(f"  ⚡ {len(arrays) * len(rows) / max(time.perf_counter() - started, 1e-9):,.0f} candles/sec")
+
+        paths_df = pd.DataFrame(rows).sort_values(["combo", "path"])
+        paths_df.insert(0, "Scenario", scenario['name'])
+        path_frames.append(paths_df)
+        results.extend(summarize_mc(scenario['name'], settings_list[c], group)
+                       for c, group in paths_df.groupby("combo"))
+
+    if path_frames:
+        paths_file = f"stress_test_{MARKET.lower()}_montecarlo_paths.csv"
+        pd.concat(path_frames).to_csv(paths_file, index=False)
+        print(f"💾 경로별 결과 저장: {paths_file}")
+    print_result_table(results, f"stress_test_{MARKET.lower()}_montecarlo_result.csv")
+    return results
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    {"coordinator": run_coordinator, "worker": run_worker, "halving": run_optimizer,
+     "montecarlo": run_monte_carlo}.get(RUN_MODE, main)()
@@ -5,6 +5,10 @@ import os
 import logging
 import itertools
 from datetime import datetime, timedelta
+from utils.candle_arrays import CandleArrays
+from utils.log_buffer import ColumnarLog
+from manager.backtest_engine import BacktestEngine
+from manager.risk_policies import StepUpHardDeck, TakeProfit, InitialEntry, EquityRatioUnit, FlowLadder
 
 # --- 1. 시스템 설정 (Configuration) ---
 MARKET = "BTCUSDT"
@@ -67,6 +71,10 @@ def load_candles(market, start, end):
         return pd.DataFrame()
 
 # --- 3. 시뮬레이션 엔진 (동적 유닛 + Step-up) ---
+# 상세 로그(SAVE_FULL_LOG) 열 구성 (ColumnarLog 종류)
+FULL_LOG_COLUMNS = {"Time": "time", "Price": "float64", "Action": "signal", "Cash": "float64",
+                    "Equity": "float64", "HardDeck": "float64", "Level": "int8", "UnitSize": "float64"}
+
 def run_simulation(df, settings):
     # 설정값 언패킹
     unit_ratio = settings["UNIT_RATIO"] # [NEW] 비율 사용
@@ -99,7 +107,7 @@ def run_simulation(df, settings):
     # [NEW] 현재 적용 중인 유닛 사이즈 (매 진입 시 갱신)
     current_unit_size = 0.0
 
-    log_data = []
+    log_data = ColumnarLog(FULL_LOG_COLUMNS) if save_full_log else None
 
     for row in df.itertuples():
         now = row.timestamp
@@ -268,7 +276,7 @@ def run_simulation(df, settings):
     if position['qty'] > 0:
         final_equity += (df.iloc[-1].close - position['avg_price']) * position['qty']
 
-    log_df = pd.DataFrame(log_data) if save_full_log else None
+    log_df = log_data.to_frame() if save_full_log else None
 
     return {
         "sl_count": sl_count,
@@ -277,6 +285,198 @@ def run_simulation(df, settings):
         "log_df": log_df
     }
 
+# --- 3-0. 공통 엔진 경로 ---
+def engine_policies(settings):
+    """run_simulation 의 매매 규칙을 BacktestEngine 정책 목록으로 (계단식 하드 데크 → 익절 → 비율 사이징 진입 → 물타기)."""
+    stop_loss = StepUpHardDeck(STOP_LOSS_THRESHOLD, PANIC_SELL_PENALTY, COOLDOWN_MINUTES,
+                               [(STEP_1_TRIGGER, STEP_1_LOCK), (STEP_2_TRIGGER, STEP_2_LOCK)] if ENABLE_STEP_UP else [])
+    return [
+        stop_loss,
+        TakeProfit(settings["TAKE_PROFIT_PCT"]),
+        InitialEntry(settings["INITIAL_UNITS"], EquityRatioUnit(settings["UNIT_RATIO"])),
+        FlowLadder([(settings["SMALL_FLOW_PCT"], settings["SMALL_FLOW_UNITS"]),
+                    (settings["LARGE_FLOW_PCT"], settings["LARGE_FLOW_UNITS"])]),
+    ]
+
+
+def build_engine(settings):
+    return BacktestEngine(engine_policies(settings), INITIAL_CASH, FEE_RATE, SLIPPAGE_RATE,
+                          settings["LEVERAGE"], settings["MARGIN_BUFFER"])
+
+
+def run_simulation_fast(candles, settings, state=None, start=0, stop=None, profiler=None):
+    """run_simulation 과 같은 결과 (sl_count / total_injected / final_equity) 를 공통 BacktestEngine 으로 계산합니다. 상세 로그는 없음."""
+    return build_engine(settings).run(candles, state, start, stop, profiler)
+
+# --- 3-1. 설정 축 벡터화 (Lockstep) 그리드 커널 ---
+COOLDOWN_NS = COOLDOWN_MINUTES * 60 * 1_000_000_000
+GUARD_EPS = 1e-9  # 건너뛰기 임계값 여유 (실제 판정은 원본 수식으로 다시 계산)
+
+def run_simulation_grid(candles, settings_list):
+    """
+    K 개의 파라미터 조합을 캔들 한 번 순회로 동시에 평가합니다.
+    상태를 길이 K 벡터로 두고 Step-up·손절·익절·매수 분기를 마스크로 적용하므로 결과는 조합별 run_simulation 과 같습니다.
+    어떤 조합도 임계값(레벨업/손절/익절/물타기)을 건드리지 않는 캔들은 PriceIndex 로 건너뜁니다.
+    상세 로그(SAVE_FULL_LOG)는 지원하지 않습니다.
+    """
+    if not isinstance(candles, CandleArrays):
+        candles = CandleArrays.from_df(candles)
+    k = len(settings_list)
+    index = candles.price_index()
+    highs, lows, closes, timestamps = candles.high, candles.low, candles.close, candles.timestamp
+    n = len(timestamps)
+
+    def _param(key):
+        return np.array([s[key] for s in settings_list], dtype=np.float64)
+
+    unit_ratio = _param("UNIT_RATIO")
+    sf_pct, lf_pct = _param("SMALL_FLOW_PCT"), _param("LARGE_FLOW_PCT")
+    init_units, sf_units, lf_units = _param("INITIAL_UNITS"), _param("SMALL_FLOW_UNITS"), _param("LARGE_FLOW_UNITS")
+    leverage, margin_buffer = _param("LEVERAGE"), _param("MARGIN_BUFFER")
+    tp_rate = 1 + _param("TAKE_PROFIT_PCT")
+    base_deck = INITIAL_CASH * STOP_LOSS_THRESHOLD
+    step_1_equity, step_2_equity = INITIAL_CASH * STEP_1_TRIGGER, INITIAL_CASH * STEP_2_TRIGGER
+    buy_rate = 1 + SLIPPAGE_RATE
+
+    cash = np.full(k, INITIAL_CASH)
+    qty, avg_price = np.zeros(k), np.zeros(k)
+    hard_deck = np.full(k, base_deck)
+    step_level = np.zeros(k, dtype=np.int64)
+    buy_step = np.zeros(k, dtype=np.int64)
+    last_buy_price, hwm, unit_size = np.zeros(k), np.zeros(k), np.zeros(k)
+    cooldown_until = np.zeros(k, dtype=np.int64)
+    total_injected = np.zeros(k)
+    sl_count = np.zeros(k, dtype=np.int64)
+
+    def _close_position(mask):
+        qty[mask] = 0.0
+        avg_price[mask] = 0.0
+        buy_step[mask] = 0
+        last_buy_price[mask] = 0.0
+        hwm[mask] = 0.0
+        unit_size[mask] = 0.0
+
+    def _next_level_equity():
+        # 다음 레벨업이 일어나는 자산 (둘 중 작은 값 기준으로 보수적으로 잡음)
+        if not ENABLE_STEP_UP:
+            return np.full(k, np.inf)
+        return np.where(step_level < 1, min(step_1_equity, step_2_equity),
+                        np.where(step_level < 2, step_2_equity, np.inf))
+
+    i = 0
+    while i < n:
+        # 1) 모든 조합의 다음 트리거 캔들 찾기 (가드는 후보만 거르고 판정은 아래 마스크 로직이 담당)
+        holding = (qty > 0) & (cooldown_until == 0)
+        level_equity = _next_level_equity()
+        # 무포지션 조합은 다음 캔들에서 바로 진입/레벨업/손절이 일어날 수 있으면 즉시 처리
+        flat_margin = ((cash * unit_ratio * init_units) / leverage) * margin_buffer
+        idle = (qty == 0) & (cooldown_until == 0) & (
+            (cash >= flat_margin) | (cash >= level_equity) | (cash <= hard_deck))
+        if idle.any():
+            j = i
+        else:
+            j = n
+            cooling = cooldown_until > 0
+            if cooling.any():
+                j = index.index_at_or_after(int(cooldown_until[cooling].min()), i)
+            if holding.any():
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    sl_guard = avg_price + (hard_deck - cash) / qty
+                    sl_guard += np.abs(sl_guard) * GUARD_EPS
+                    # 레벨업은 low 기준 자산으로 판정하므로 high 가 넘는 캔들만 후보로 삼음
+                    level_guard = avg_price + (level_equity - cash) / qty
+                    level_guard = np.where(level_equity < np.inf, level_guard - np.abs(level_guard) * GUARD_EPS, np.inf)
+                step_pct = np.where(buy_step == 1, sf_pct, lf_pct)
+                step_units = np.where(buy_step == 1, sf_units, lf_units)
+                flow_thr = last_buy_price * (1 + (step_pct * 0.5))
+                flow_target = np.where(hwm > flow_thr, hwm, last_buy_price) * (1 - step_pct)
+                laddering = (buy_step <= 2) & (cash >= ((unit_size * step_units) / leverage) * margin_buffer)
+                low_trigger = np.where(laddering, np.maximum(sl_guard, flow_target), sl_guard)
+                high_trigger = np.minimum(avg_price * tp_rate, level_guard)
+                high_trigger = np.minimum(high_trigger, np.where(laddering, np.maximum(hwm, flow_thr), np.inf))
+                j = min(j, index.next_trigger(i, low_trigger[holding].max(), high_trigger[holding].min()))
+                if j > i:
+                    np.maximum(hwm, index.max_high(i, j), out=hwm, where=holding)
+        if j >= n:
+            break
+
+        # 2) 캔들 j 를 모든 조합에 대해 원본 루프와 같은 순서로 처리
+        now, high, low, close = timestamps.item(j), highs.item(j), lows.item(j), closes.item(j)
+        i = j + 1
+
+        active = cooldown_until <= now
+        cooldown_until[active] = 0
+        holding = active & (qty > 0)
+        np.maximum(hwm, high, out=hwm, where=holding)
+        hwm[active & ~holding] = 0.0
+
+        equity = cash + (low - avg_price) * qty
+        if ENABLE_STEP_UP:
+            level_1 = active & (step_level < 1) & (equity >= step_1_equity)
+            level_2 = active & ~level_1 & (step_level < 2) & (equity >= step_2_equity)
+            step_level[level_1], hard_deck[level_1] = 1, INITIAL_CASH * STEP_1_LOCK
+            step_level[level_2], hard_deck[level_2] = 2, INITIAL_CASH * STEP_2_LOCK
+
+        done = active & (equity <= hard_deck)
+        if done.any():
+            sl_count += done
+            needed = INITIAL_CASH - equity * (1 - PANIC_SELL_PENALTY)
+            total_injected += np.where(done & (needed > 0), needed, 0.0)
+            cash[done] = INITIAL_CASH
+            _close_position(done)
+            hard_deck[done] = base_deck
+            step_level[done] = 0
+            cooldown_until[done] = now + COOLDOWN_NS
+
+        live = active & ~done
+        flat = live & (qty == 0)
+        holding = live & (qty > 0)
+        tp_target = avg_price * tp_rate
+        take = holding & (high >= tp_target)
+        if take.any():
+            revenue = qty * (tp_target * (1 - SLIPPAGE_RATE))
+            cost = qty * avg_price
+            cash += np.where(take, (revenue - cost) - revenue * FEE_RATE, 0.0)
+            _close_position(take)
+            holding &= ~take
+
+        if flat.any():
+            unit_size[flat] = (equity * unit_ratio)[flat]
+            buy_amt = unit_size * init_units
+            entry = flat & (cash >= (buy_amt / leverage) * margin_buffer)
+            if entry.any():
+                exec_price = close * buy_rate
+                cash -= np.where(entry, buy_amt * FEE_RATE, 0.0)
+                qty[entry] = (buy_amt / exec_price)[entry]
+                avg_price[entry] = exec_price
+                last_buy_price[entry] = exec_price
+                buy_step[entry] = 1
+                hwm[entry] = exec_price
+
+        ladder = holding & (buy_step <= 2)
+        if ladder.any():
+            step_pct = np.where(buy_step == 1, sf_pct, lf_pct)
+            step_units = np.where(buy_step == 1, sf_units, lf_units)
+            target_base = np.where(hwm > last_buy_price * (1 + (step_pct * 0.5)), hwm, last_buy_price)
+            target_price = target_base * (1 - step_pct)
+            buy_amt = unit_size * step_units
+            flow = ladder & (low <= target_price) & (cash >= (buy_amt / leverage) * margin_buffer)
+            if flow.any():
+                exec_price = target_price * buy_rate
+                cash -= np.where(flow, buy_amt * FEE_RATE, 0.0)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    add_qty = buy_amt / exec_price
+                    new_qty = qty + add_qty
+                    new_avg = ((qty * avg_price) + (add_qty * exec_price)) / new_qty
+                qty[flow], avg_price[flow] = new_qty[flow], new_avg[flow]
+                last_buy_price[flow] = exec_price[flow]
+                buy_step[flow] += 1
+                hwm[flow] = exec_price[flow]
+
+    final_equity = cash + np.where(qty > 0, (closes.item(n - 1) - avg_price) * qty, 0.0) if n else cash
+    return [{"sl_count": int(sl_count[c]), "total_injected": total_injected.item(c),
+             "final_equity": final_equity.item(c), "log_df": None} for c in range(k)]
+
 # --- 4. 메인 실행 ---
 def main():
     scenarios = [
@@ -301,9 +501,16 @@ def main():
         df = load_candles(MARKET, scenario['start'], scenario['end'])
         if df.empty: continue
 
-        for combo in combinations:
-            settings = dict(zip(keys, combo))
-            res = run_simulation(df, settings)
+        # 상세 로그가 필요 없는 조합은 lockstep 커널로 한 번에 평가
+        settings_list = [dict(zip(keys, combo)) for combo in combinations]
+        lockstep_idx = [c for c, settings in enumerate(settings_list) if not settings.get("SAVE_FULL_LOG", False)]
+        lockstep_results = {}
+        if lockstep_idx:
+            batch = run_simulation_grid(df, [settings_list[c] for c in lockstep_idx])
+            lockstep_results = dict(zip(lockstep_idx, batch))
+
+        for c, settings in enumerate(settings_list):
+            res = lockstep_results[c] if c in lockstep_results else run_simulation(df, settings)
             
             net_profit = res['final_equity'] - (INITIAL_CASH + res['total_injected'])
             
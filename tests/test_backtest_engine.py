@@ -0,0 +1,62 @@
+# tests/test_backtest_engine.py
+
+import math
+
+import stress_test_btc_final as stress
+import stress_test_step_up as step_up
+from manager.backtest_engine import BacktestEngine, EngineState
+from manager.risk_policies import StopLossRefill, TakeProfit, InitialEntry, FixedUnit, FlowLadder
+from utils.parity import EventRecorder
+from tests.test_stress_kernel import RESULT_KEYS, _base_settings, _make_candles
+
+STEP_UP_KEYS = ["sl_count", "total_injected", "final_equity"]
+
+
+def test_stress_engine_matches_reference_loop():
+    for seed in (1, 2):
+        df = _make_candles(30000, seed=seed, vol=0.003, crash_every=1500)
+        for settings in (_base_settings(), _base_settings(TAKE_PROFIT_PCT=0.002, SMALL_FLOW_PCT=0.005)):
+            ref_recorder, recorder = EventRecorder(), EventRecorder()
+            expected = stress.run_simulation(df, settings, profiler=ref_recorder)
+            result = stress.build_engine(settings).run(df, profiler=recorder)
+            assert [result[k] for k in RESULT_KEYS] == [expected[k] for k in RESULT_KEYS]
+            assert recorder.trail == ref_recorder.trail
+
+
+def test_step_up_engine_matches_reference_loop_with_level_ups():
+    level_ups = 0
+    for seed in (1, 2, 3):
+        # 강한 상승 추세 + 큰 유닛 비율이라 하드 데크 상향이 실제로 일어남
+        df = _make_candles(60000, seed=seed, vol=0.003, crash_every=5000, drift=0.0002)
+        settings = {k: v[0] for k, v in step_up.GRID_PARAMS.items()}
+        settings["UNIT_RATIO"] = 0.5
+        recorder = EventRecorder()
+        result = step_up.build_engine(settings).run(df, profiler=recorder)
+        expected = step_up.run_simulation(df, settings)
+        assert [result[k] for k in STEP_UP_KEYS] == [expected[k] for k in STEP_UP_KEYS]
+        assert step_up.run_simulation_fast(df, settings)["final_equity"] == expected["final_equity"]
+        level_ups += sum(1 for _, event in recorder.trail if event == "level_up")
+    assert level_ups > 0
+
+
+def test_custom_policy_composition_and_resume():
+    df = _make_candles(20000, seed=5, vol=0.003, crash_every=1500)
+    engine = BacktestEngine([StopLossRefill(0.65, 0.02, 1440, max_sl_count=2), TakeProfit(0.004),
+                             InitialEntry(2.0, FixedUnit(200.0)),
+                             FlowLadder([(0.01, 2.0), (0.02, 4.0)], rebalance=False)],
+                            3000.0, 0.0004, 0.0005, 10, 1.5)
+    full = engine.run(df)
+    assert full["final_equity"] > 0 and not math.isnan(full["final_equity"])
+
+    # 절반까지 돌린 state (dict 왕복 포함) 로 이어서 실행해도 한 번에 돌린 결과와 같음
+    half = len(df) // 2
+    first = engine.run(df, stop=half)
+    state = EngineState.from_dict(first["state"].to_dict())
+    resumed = engine.run(df, state=state, start=half)
+    assert [resumed[k] for k in RESULT_KEYS] == [full[k] for k in RESULT_KEYS]
+
+    # 손절 횟수 상한을 넘으면 조기 중단
+    crash = _make_candles(20000, seed=6, vol=0.004, crash_every=800)
+    aborted = BacktestEngine([StopLossRefill(0.95, 0.02, 10, max_sl_count=1), InitialEntry(2.0, FixedUnit(2000.0))],
+                             3000.0, 0.0004, 0.0005, 10, 1.5).run(crash)
+    assert aborted["aborted"] and aborted["sl_count"] == 2
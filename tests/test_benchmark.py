@@ -0,0 +1,61 @@
+# tests/test_benchmark.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+import benchmark
+from utils.synthetic_candles import synthetic_candles, write_candle_db
+
+
+def test_synthetic_candles_are_deterministic_and_valid():
+    df = synthetic_candles(200_000, seed=3)
+    assert df.equals(synthetic_candles(200_000, seed=3))
+    assert not df["close"].equals(synthetic_candles(200_000, seed=4)["close"])
+    assert list(df.columns) == ["timestamp", "open", "high", "low", "close"]
+    assert (df["timestamp"].diff().dropna() == pd.Timedelta(minutes=1)).all()
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert np.array_equal(df["open"].to_numpy()[1:], df["close"].to_numpy()[:-1])
+    # 폭락 구간이 실제로 섞여 있고, 길게 돌려도 평균 추세가 0 근처에 머묾
+    worst_day = df["close"].pct_change(1440).min()
+    assert worst_day < -0.1
+    assert abs(np.log(df["close"].iloc[-1] / df["close"].iloc[0])) < 2
+
+
+def test_write_candle_db_roundtrip(tmp_path, monkeypatch):
+    import manager.simulator_db as simulator_db
+
+    df = synthetic_candles(300, seed=1)
+    monkeypatch.setattr(simulator_db, "DB_PATH", write_candle_db(df, str(tmp_path / "c.sqlite")))
+    loaded = simulator_db.load_candles_from_db("BTCUSDT", "2020-01-01 00:00:00", "2020-01-01 04:59:00")
+    assert len(loaded) == 300 and loaded["종가"].tolist() == df["close"].tolist()
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"a": {"sec_per_item": 1.0}, "b": {"sec_per_item": 1.0}, "c": {"sec_per_item": 1.0},
+                "d": {"skipped": "x"}}
+    current = {"a": {"sec_per_item": 1.4}, "b": {"sec_per_item": 1.1}, "c": {"sec_per_item": 0.5},
+               "d": {"sec_per_item": 1.0}, "e": {"sec_per_item": 1.0}}
+    comparison = benchmark.compare_to_baseline(current, baseline, tolerance=0.25)
+    assert {k: v["status"] for k, v in comparison.items()} == {
+        "a": "regression", "b": "ok", "c": "improved", "d": "skipped", "e": "new"}
+    assert comparison["a"]["ratio"] == 1.4
+
+
+def test_run_and_save_results(tmp_path):
+    names = ["run_simulation", "run_simulation_fast", "phoenix_run_tick", "simulate_with_db",
+             "generate_buy_orders", "generate_sell_orders", "adjust_price_to_tick"]
+    results = benchmark.run_benchmarks(names, scale=0.005, repeat=1)
+    assert set(results) == set(names)
+    for name in names:
+        res = results[name]
+        assert "skipped" in res or (res["items"] > 0 and res["best_sec"] > 0)
+    path = benchmark.save_results(results, str(tmp_path / "bench.json"), scale=0.005, repeat=1)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["environment"]["numpy"] == np.__version__
+    saved = benchmark.load_results(path)
+    assert all(v["status"] in ("ok", "improved", "regression", "skipped")
+               for v in benchmark.compare_to_baseline(results, saved).values())
+    assert benchmark.compare_to_baseline(results, saved)["run_simulation"]["ratio"] == 1.0
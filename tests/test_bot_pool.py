@@ -0,0 +1,74 @@
+# tests/test_bot_pool.py
+
+import pandas as pd
+
+import compound_test as compound
+from tests.test_stress_kernel import _make_candles
+
+
+def _compound_settings(**overrides):
+    settings = {"UNIT_SIZE": compound.UNIT_SIZE, "TAKE_PROFIT_PCT": compound.TAKE_PROFIT_PCT,
+                "SMALL_FLOW_PCT": compound.SMALL_FLOW_PCT, "LARGE_FLOW_PCT": compound.LARGE_FLOW_PCT,
+                "INITIAL_UNITS": compound.INITIAL_UNITS, "SMALL_FLOW_UNITS": compound.SMALL_FLOW_UNITS,
+                "LARGE_FLOW_UNITS": compound.LARGE_FLOW_UNITS, "LEVERAGE": compound.LEVERAGE,
+                "PROFIT_RESET_TARGET": 0.02, "MARGIN_BUFFER": compound.MARGIN_BUFFER}
+    settings.update(overrides)
+    return settings
+
+
+def test_bot_pool_matches_bot_list():
+    cases = [
+        _compound_settings(),
+        _compound_settings(PROFIT_RESET_TARGET=None),
+        # 리셋이 잦아 봇이 여러 개 생기고, 같은 캔들에 여러 봇이 동시에 움직이는 경우
+        _compound_settings(PROFIT_RESET_TARGET=0.01, SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01),
+        _compound_settings(LEVERAGE=20, PROFIT_RESET_TARGET=0.05),
+    ]
+    bot_counts = []
+    for seed, settings in enumerate(cases, 1):
+        df = _make_candles(20000, seed=seed, vol=0.003, crash_every=1500, drift=0.00002)
+        df["timestamp"] = pd.date_range("2023-12-25", periods=len(df), freq="1min")
+        reference = compound.CompoundSimulator(df, settings, pool_cls=compound.BotList)
+        reference.run()
+        pooled = compound.CompoundSimulator(df, settings)
+        pooled.run()
+        assert pooled.summarize() == reference.summarize(), settings
+        bot_counts.append(len(pooled.pool))
+    assert max(bot_counts) > 1
+
+
+def test_bot_pool_wakes_cooldown_bots_after_restore():
+    df = _make_candles(12000, seed=7, vol=0.004, crash_every=700)
+    settings = _compound_settings(LEVERAGE=20, PROFIT_RESET_TARGET=0.01)
+    full = compound.CompoundSimulator(df, settings)
+    full.run()
+
+    parked = 0
+    for cut in range(500, 12000, 500):
+        head = compound.CompoundSimulator(df.iloc[:cut], settings)
+        head.run()
+        # 쿨다운 중인 봇은 모두 wake_heap 에 cooldown_until 과 함께 들어 있어야 함
+        pool = head.pool
+        assert sorted(pool.wake_heap) == sorted((int(t), i) for i, t in enumerate(pool.cooldown_until.tolist()) if t)
+        parked += len(pool.wake_heap)
+
+        resumed = compound.CompoundSimulator(df.iloc[cut:].reset_index(drop=True), settings)
+        resumed.restore(head.end_state)
+        resumed.run()
+        assert resumed.summarize() == full.summarize(), cut
+    assert parked > 0
+
+
+def test_bot_pool_collapses_same_tick_spawns_into_cohorts():
+    df = _make_candles(6000, seed=3, vol=0.003, crash_every=1500)
+    settings = _compound_settings(PROFIT_RESET_TARGET=0.01, SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01, LEVERAGE=20)
+    sims = []
+    for pool_cls in (compound.BotList, compound.BotPool):
+        sim = compound.CompoundSimulator(df, settings, pool_cls=pool_cls)
+        sim.wallet = 30 * compound.INITIAL_CASH  # 첫 캔들에 봇 30개가 한꺼번에 생성됨
+        sim.run()
+        sims.append(sim)
+    reference, pooled = sims
+    assert pooled.summarize() == reference.summarize()
+    assert pooled.pool.n < len(pooled.pool)
+    assert pooled.pool.weight.max() >= 30
@@ -0,0 +1,100 @@
+# tests/test_checkpoint.py
+
+import pickle
+import sqlite3
+
+import pandas as pd
+
+import compound_test as compound
+import stress_test_btc_final as stress
+from manager.sim_cache import SimCache, CheckpointStore
+from utils.candle_arrays import CandleArrays
+from tests.test_job_queue import _write_candle_db
+from tests.test_stress_kernel import RESULT_KEYS, _base_settings, _make_candles
+
+
+def test_grid_state_resumes_like_full_run():
+    arrays = CandleArrays.from_df(_make_candles(20000, seed=4, vol=0.003, crash_every=900))
+    cases = [_base_settings(), _base_settings(PROFIT_RESET_TARGET=None, LEVERAGE=20),
+             _base_settings(SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01), _base_settings(MAX_SL_COUNT=1)]
+    for cut in (3000, 11111, 19999):
+        prefix = CandleArrays(*(getattr(arrays, col)[:cut] for col in ("timestamp", "open", "high", "low", "close")))
+        for settings, res in zip(cases, stress.run_simulation_grid(prefix, cases)):
+            state = stress.SimState.from_dict(res["state"].to_dict())
+            resumed = stress.run_simulation_fast(arrays, settings, state=state, start=cut)
+            expected = stress.run_simulation_fast(arrays, settings)
+            for key in RESULT_KEYS + ["aborted"]:
+                assert resumed[key] == expected[key], (cut, settings, key)
+
+
+def test_stress_main_resumes_from_checkpoint(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    with sqlite3.connect(db_path) as conn:
+        tail = pd.read_sql_query("SELECT * FROM minute_candles WHERE timestamp > '2023-01-03 12:00:00'", conn)
+        conn.execute("DELETE FROM minute_candles WHERE timestamp > '2023-01-03 12:00:00'")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "PARALLEL_WORKERS", 1)
+    monkeypatch.setattr(stress, "LOCKSTEP_MIN_COMBOS", 2)
+    monkeypatch.setattr(stress, "GRID_PARAMS", dict(stress.GRID_PARAMS, LEVERAGE=[5, 10, 20], PROFIT_RESET_TARGET=[None, 0.05]))
+    monkeypatch.setattr(stress, "SimCache", lambda: SimCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "CheckpointStore", lambda: CheckpointStore(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "SCENARIOS", [{"name": "T (Test)", "start": "2023-01-01 00:00:00", "end": "2023-01-31 23:59:59"}])
+    stress.main()
+
+    # 데이터가 뒤로 늘어나면 마지막 체크포인트 이후 캔들만 로드해 이어서 실행
+    with sqlite3.connect(db_path) as conn:
+        tail.to_sql("minute_candles", conn, index=False, if_exists="append")
+    loaded = []
+    load_candles = stress.load_candles
+    monkeypatch.setattr(stress, "load_candles", lambda market, start, end: loaded.append(start) or load_candles(market, start, end))
+    stress.main()
+    assert loaded == ["2023-01-03 12:00:00"]
+    resumed = (tmp_path / "stress_test_btcusdt_final_result.csv").read_text()
+
+    monkeypatch.setattr(stress, "USE_RESULT_CACHE", False)
+    monkeypatch.setattr(stress, "USE_CHECKPOINTS", False)
+    stress.main()
+    assert (tmp_path / "stress_test_btcusdt_final_result.csv").read_text() == resumed
+
+
+def test_stress_main_marks_aborted_rows(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "PARALLEL_WORKERS", 1)
+    monkeypatch.setattr(stress, "MAX_SL_COUNT", 0)
+    monkeypatch.setattr(stress, "GRID_PARAMS", dict(stress.GRID_PARAMS, UNIT_SIZE=[1, 2000], LEVERAGE=[1, 20]))
+    monkeypatch.setattr(stress, "SimCache", lambda: SimCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "CheckpointStore", lambda: CheckpointStore(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "SCENARIOS", [{"name": "T (Test)", "start": "2023-01-01 00:00:00", "end": "2023-01-31 23:59:59"}])
+    stress.main()
+
+    # 손절 한 번에 중단된 조합은 Aborted 로 표시되고 완주한 조합 뒤에 옴
+    df = pd.read_csv(tmp_path / "stress_test_btcusdt_final_result.csv")
+    assert df["Aborted"].any() and not df["Aborted"].all()
+    assert df["Aborted"].is_monotonic_increasing
+    assert (df.loc[df["Aborted"], "SL"] == 1).all() and (df.loc[~df["Aborted"], "SL"] == 0).all()
+
+
+def test_compound_simulator_resumes_across_year_end():
+    df = _make_candles(6000, seed=6, vol=0.003, crash_every=1000)
+    df["timestamp"] = pd.date_range("2023-12-30", periods=len(df), freq="1min")
+    settings = {"UNIT_SIZE": compound.UNIT_SIZE, "TAKE_PROFIT_PCT": compound.TAKE_PROFIT_PCT,
+                "SMALL_FLOW_PCT": compound.SMALL_FLOW_PCT, "LARGE_FLOW_PCT": compound.LARGE_FLOW_PCT,
+                "INITIAL_UNITS": compound.INITIAL_UNITS, "SMALL_FLOW_UNITS": compound.SMALL_FLOW_UNITS,
+                "LARGE_FLOW_UNITS": compound.LARGE_FLOW_UNITS, "LEVERAGE": compound.LEVERAGE,
+                "PROFIT_RESET_TARGET": 0.02, "MARGIN_BUFFER": compound.MARGIN_BUFFER}
+
+    full = compound.CompoundSimulator(df, settings)
+    full.run()
+
+    head = compound.CompoundSimulator(df.iloc[:2000], settings)
+    head.run()
+    resumed = compound.CompoundSimulator(df.iloc[2000:].reset_index(drop=True), settings)
+    resumed.restore(pickle.loads(pickle.dumps(head.end_state)))
+    resumed.run()
+    assert resumed.summarize() == full.summarize()
+    assert len(full.summarize()["yearly_log"]) == 2
@@ -0,0 +1,69 @@
+# tests/test_instrumentation.py
+
+import pytest
+
+import stress_test_btc_final as stress
+from utils.instrumentation import EngineProfiler, merge_reports
+from tests.test_stress_kernel import _base_settings, _make_candles
+
+
+def _results(res):
+    return {k: res[k] for k in stress.RESULT_FIELDS}
+
+
+def test_reference_engine_profile_counts_branches_and_logging():
+    df = _make_candles(4000, seed=2, vol=0.003, crash_every=500)
+    settings = _base_settings(SAVE_FULL_LOG=True)
+    profiler = EngineProfiler(sample_every=1)
+    res = stress.run_simulation(df, settings, profiler=profiler)
+    profile = res["profile"]
+
+    assert _results(res) == _results(stress.run_simulation(df, settings))
+    assert profile["candles"] == len(df) or res["aborted"]
+    assert profile["branches"].get("stop_loss", 0) == res["sl_count"]
+    assert profile["branches"].get("profit_reset", 0) == res["reset_count"]
+    assert profile["events"] == sum(profile["branches"].get(k, 0) for k in
+                                    ("stop_loss", "profit_reset", "take_profit", "initial_buy", "flow_buy"))
+    assert profile["branches"]["cooldown_skip"] > 0
+    assert 0 < profile["logging_share"] < 1
+    assert sum(profile["phase_share"].values()) <= 1.0 + 1e-6
+
+
+def test_fast_kernel_profile_matches_results():
+    df = _make_candles(6000, seed=4, vol=0.004, crash_every=900)
+    settings = _base_settings()
+    res = stress.run_simulation_fast(df, settings, profiler=EngineProfiler(sample_every=8))
+    profile = res["profile"]
+
+    assert _results(res) == _results(stress.run_simulation_fast(df, settings))
+    assert profile["branches"].get("stop_loss", 0) == res["sl_count"]
+    assert profile["branches"].get("profit_reset", 0) == res["reset_count"]
+    assert profile["candles"] == len(df) and profile["candles_per_sec"] > 0
+    assert profile["branches"]["jumped_candles"] > 0 and set(profile["phase_share"]) <= {"jump", "evaluate"}
+
+
+def test_merge_reports_weights_phases_by_elapsed():
+    a = {"candles": 100, "events": 4, "elapsed_sec": 1.0, "branches": {"take_profit": 4},
+         "phase_share": {"logging": 0.5}}
+    b = {"candles": 300, "events": 2, "elapsed_sec": 3.0, "branches": {"take_profit": 1, "stop_loss": 1},
+         "phase_share": {"logging": 0.1}}
+    merged = merge_reports([a, None, b])
+    assert merged["candles_per_sec"] == 100 and merged["events_per_sec"] == 1.5
+    assert merged["branches"] == {"take_profit": 5, "stop_loss": 1}
+    assert merged["logging_share"] == pytest.approx(0.2)
+
+
+def test_simulate_with_db_profile(tmp_path, monkeypatch):
+    import manager.simulator_db as simulator_db
+    from tests.test_order_ledger import _candle_db
+
+    _candle_db(tmp_path, monkeypatch, n=600)
+    summary = simulator_db.simulate_with_db(
+        market="BTCUSDT", start="2023-01-01 00:00:00", end="2023-01-02 00:00:00", unit_size=100,
+        small_flow_pct=0.004, small_flow_units=2, large_flow_pct=0.013, large_flow_units=4,
+        take_profit_pct=0.003, leverage=10, initial_cash=3000.0, use_cache=False, outputs=["csv"],
+        profiler=EngineProfiler(sample_every=1))
+    profile = summary["profile"]
+    assert profile["candles"] == 600
+    assert profile["branches"]["take_profit"] == summary["total_sell_trades"]
+    assert set(profile["phase_share"]) == {"strategy", "fill", "sell", "logging"}
@@ -0,0 +1,90 @@
+# tests/test_job_queue.py
+
+import sqlite3
+import multiprocessing as mp
+
+import stress_test_btc_final as stress
+from manager.job_queue import JobQueue, MAX_ATTEMPTS
+from tests.test_stress_kernel import _make_candles
+
+
+def _write_candle_db(path, n=6000):
+    df = _make_candles(n, seed=5, vol=0.003, crash_every=1000)
+    df["market"] = stress.MARKET
+    df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    with sqlite3.connect(path) as conn:
+        df.to_sql("minute_candles", conn, index=False)
+
+
+def _worker_entry(db_path, queue_path, worker_id, out):
+    stress.DB_PATH = db_path
+    out.put(stress.run_worker(queue_path, worker_id))
+
+
+def test_claim_is_exclusive_and_resumes_after_crash(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=3600)
+    assert queue.enqueue([(f"job{i}", {"i": i}) for i in range(3)]) == 3
+    assert queue.enqueue([("job0", {"i": 0})]) == 0  # 재등록은 무시
+
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert first[0] != second[0]
+
+    # w1 이 결과 기록 없이 죽었다가 같은 ID 로 재시작하면 자기 작업을 다시 가져감
+    queue.complete(second[0], {"ok": True})
+    assert queue.claim("w1")[0] != first[0]  # 대기 작업이 먼저
+    assert queue.claim("w1")[0] == first[0]
+    assert queue.claim("w3") is None
+
+    # 임대가 만료되면 다른 워커도 가져갈 수 있음
+    short = JobQueue(queue.path, lease_seconds=-1)
+    short.enqueue([("job3", {"i": 3})])
+    taken = short.claim("w4")
+    assert queue.claim("w5")[0] == taken[0]
+
+
+def test_stale_worker_cannot_fail_reclaimed_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=-1)
+    queue.enqueue([("slow", {})])
+    job_id, _ = queue.claim("w1")
+    assert queue.claim("w2")[0] == job_id  # w1 의 임대 만료 후 w2 가 가져감
+    queue.fail(job_id, "w1", "늦게 끝난 실패")
+    assert queue.counts() == {"running": 1}
+    queue.fail(job_id, "w2", "실패")
+    assert queue.counts() == {"pending": 1}
+
+
+def test_job_that_kills_its_worker_fails_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=-1)
+    queue.enqueue([("crash", {})])
+    # 매번 워커가 결과 기록 없이 죽고 임대가 만료됨
+    for attempt in range(MAX_ATTEMPTS):
+        assert queue.claim(f"w{attempt}") is not None
+    assert queue.claim("w_last") is None
+    assert queue.counts() == {"failed": 1} and queue.is_finished()
+
+
+def test_two_workers_drain_queue(tmp_path, monkeypatch):
+    db_path, queue_path = str(tmp_path / "candles.sqlite"), str(tmp_path / "jobs.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "GRID_PARAMS", dict(stress.GRID_PARAMS, TAKE_PROFIT_PCT=[0.004, 0.006, 0.01], LEVERAGE=[5, 10]))
+    monkeypatch.setattr(stress, "SCENARIOS", [{"name": "T (Test)", "start": "2023-01-01 00:00:00", "end": "2023-01-31 23:59:59"}])
+    monkeypatch.chdir(tmp_path)
+    stress.run_coordinator(queue_path, wait=False)
+
+    out = mp.Queue()
+    workers = [mp.Process(target=_worker_entry, args=(db_path, queue_path, f"w{i}", out)) for i in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+    assert sum(out.get() for _ in workers) == 6
+
+    queue = JobQueue(queue_path)
+    assert queue.counts() == {"done": 6}
+    df = stress.load_candles(stress.MARKET, "2023-01-01 00:00:00", "2023-01-31 23:59:59")
+    for _, payload, res in queue.results():
+        expected = stress.run_simulation_fast(df, payload["settings"])
+        assert res["final_equity"] == expected["final_equity"]
+        assert res["sl_count"] == expected["sl_count"]
@@ -0,0 +1,54 @@
+# tests/test_log_buffer.py
+
+import numpy as np
+import pandas as pd
+
+import stress_test_btc_final as stress
+from utils.log_buffer import ColumnarLog
+from tests.test_stress_kernel import _base_settings, _make_candles
+
+
+def test_columnar_log_matches_list_of_dicts():
+    columns = {"시간": "time", "종가": "float64", "신호": "signal", "총 자산": "float64", "단계": "int8"}
+    rows = []
+    log = ColumnarLog(columns, capacity=4)  # 여러 번 늘어나도록 작게 시작
+    times = pd.date_range("2023-01-01", periods=50, freq="1min")
+    for k, t in enumerate(times):
+        if k % 7 == 0:
+            row = {"시간": t, "종가": 100.0 + k, "신호": "Cooldown"}
+        else:
+            row = {"시간": t, "종가": 100.0 + k, "신호": ["", "Initial Buy", "Take Profit"][k % 3],
+                   "총 자산": 3000.0 - k, "단계": k % 4}
+        rows.append(row)
+        log.append(row)
+
+    df = log.to_frame()
+    expected = pd.DataFrame(rows)
+    assert list(df.columns) == list(columns)
+    assert len(df) == len(rows)
+    assert (df["시간"] == expected["시간"]).all()
+    assert df["신호"].astype(str).tolist() == expected["신호"].tolist()
+    np.testing.assert_array_equal(df["종가"], expected["종가"])
+    np.testing.assert_array_equal(df["총 자산"], expected["총 자산"])  # 빠진 값은 NaN
+    assert df["단계"].tolist() == expected["단계"].fillna(0).astype(int).tolist()
+    assert log.data["신호"].dtype == np.int16
+
+
+def test_columnar_log_round_trips_through_csv(tmp_path):
+    log = ColumnarLog({"Time": "time", "Action": "signal", "Cash": "float64"})
+    log.append({"Time": pd.Timestamp("2023-01-01"), "Action": "Stop Loss & Refill", "Cash": 3000.0})
+    log.append({"Time": pd.Timestamp("2023-01-01 00:01"), "Cash": 2999.5})
+    saved = pd.read_csv(log.save(str(tmp_path / "log.csv")), keep_default_na=False)
+    assert saved["Action"].tolist() == ["Stop Loss & Refill", ""]
+    assert saved["Cash"].tolist() == [3000.0, 2999.5]
+
+
+def test_run_simulation_full_log_uses_columnar_buffer():
+    df = _make_candles(3000, seed=2, vol=0.003, crash_every=500)
+    res = stress.run_simulation(df, _base_settings(SAVE_FULL_LOG=True))
+    log_df = res["log_df"]
+    assert list(log_df.columns) == list(stress.FULL_LOG_COLUMNS)
+    assert len(log_df) == len(df) or res["aborted"]
+    assert log_df["시간"].is_monotonic_increasing
+    assert "Initial Buy" in set(log_df["신호"].astype(str))
+    assert res["final_equity"] == stress.run_simulation(df, _base_settings())["final_equity"]
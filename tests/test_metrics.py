@@ -0,0 +1,69 @@
+# tests/test_metrics.py
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import calendar_rollup, max_drawdown, performance_metrics, period_bounds
+from utils.online_stats import EquityStats
+
+
+def _curve(n, seed=0, freq="7min", start="2022-12-30 22:00"):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, periods=n, freq=freq)
+    return times, np.round(3000 * np.exp(np.cumsum(rng.normal(0, 0.003, n))), 2)
+
+
+def test_drawdown_and_underwater_match_streaming_stats():
+    times, equity = _curve(50_000, seed=1)
+    stats = EquityStats()
+    for t, v in zip(times, equity):
+        stats.update(t, v)
+    m = performance_metrics(times, equity)
+    assert m["mdd_pct"] == stats.mdd_pct()
+    assert (m["mdd_peak_time"], m["mdd_trough_time"]) == (stats.mdd_peak_time, stats.mdd_trough_time)
+    assert (m["mdd_peak_value"], m["mdd_trough_value"]) == (stats.mdd_peak_value, stats.mdd_trough_value)
+    assert m["max_underwater_ticks"] == stats.max_underwater_ticks
+    assert (m["max_underwater_start"], m["max_underwater_end"]) == (stats.max_underwater_start, stats.max_underwater_end)
+    assert m["underwater_pct"] == stats.underwater_ticks / len(equity) * 100
+
+
+def test_calendar_rollup_matches_resample():
+    times, equity = _curve(120_000, seed=2)
+    series = pd.Series(equity, index=times)
+    for freq, rule in (("D", "D"), ("M", "ME"), ("Y", "YE")):
+        rollup = calendar_rollup(times, equity, freq)
+        grouped = series.resample(rule)
+        assert rollup["end_equity"].tolist() == grouped.last().dropna().tolist()
+        assert rollup["high"].tolist() == grouped.max().dropna().tolist()
+        assert rollup["low"].tolist() == grouped.min().dropna().tolist()
+        closes = grouped.last().dropna()
+        expected = (closes / closes.shift(1).fillna(equity[0]) - 1) * 100
+        np.testing.assert_allclose(rollup["return_pct"], expected, rtol=0, atol=1e-12)
+        intra = [max_drawdown(chunk)[0] * 100 for _, chunk in grouped if len(chunk)]
+        assert rollup["mdd_pct"].tolist() == intra
+
+
+def test_period_bounds_skip_empty_periods():
+    times = pd.to_datetime(["2023-01-31 23:59", "2023-03-01 00:00", "2023-03-15 12:00", "2024-01-01 00:00"])
+    starts, begin, end = period_bounds(times, "M")
+    assert [str(s)[:7] for s in starts] == ["2023-01", "2023-03", "2024-01"]
+    assert begin.tolist() == [0, 1, 3] and end.tolist() == [1, 3, 4]
+
+
+def test_ratios_from_daily_returns():
+    times, equity = _curve(3 * 1440 * 30, seed=3, freq="1min", start="2023-01-01")
+    m = performance_metrics(times, equity)
+    daily = pd.Series(equity, index=times).resample("D").last()
+    returns = daily / daily.shift(1).fillna(equity[0]) - 1
+    assert np.isclose(m["sharpe"], returns.mean() / returns.std() * np.sqrt(365))
+    assert np.isclose(m["sortino"], returns.mean() / np.sqrt((returns.clip(upper=0) ** 2).mean()) * np.sqrt(365))
+    years = (times[-1] - times[0]).days / 365.25 + (times[-1] - times[0]).seconds / 86400 / 365.25
+    assert np.isclose(m["cagr_pct"], ((equity[-1] / equity[0]) ** (1 / years) - 1) * 100)
+    assert np.isclose(m["calmar"], m["cagr_pct"] / abs(m["mdd_pct"]))
+    assert len(m["monthly"]) == 3 and len(m["yearly"]) == 1
+
+
+def test_no_drawdown():
+    assert max_drawdown([1.0, 1.0, 2.0, 3.0]) == (0.0, None, None)
+    m = performance_metrics(pd.date_range("2023-01-01", periods=4, freq="D"), [1.0, 1.0, 2.0, 3.0])
+    assert m["mdd_pct"] == 0.0 and m["max_underwater_ticks"] == 0 and np.isnan(m["calmar"])
@@ -0,0 +1,48 @@
+# tests/test_monte_carlo.py
+
+import numpy as np
+
+import stress_test_btc_final as stress
+from utils.block_bootstrap import BlockBootstrap
+from utils.candle_arrays import CandleArrays
+from tests.test_job_queue import _write_candle_db
+from tests.test_stress_kernel import RESULT_KEYS, _base_settings, _make_candles
+
+
+def test_bootstrap_path_is_reproducible_and_keeps_candle_shape():
+    source = CandleArrays.from_df(_make_candles(5000, seed=2, vol=0.003))
+    bootstrap = BlockBootstrap(source, block=60)
+    path = bootstrap.path(np.random.default_rng([7, 0]), 4000)
+    again = bootstrap.path(np.random.default_rng([7, 0]), 4000)
+    assert len(path) == 4000 and np.array_equal(path.close, again.close)
+    assert np.all(path.high >= np.maximum(path.open, path.close) * (1 - 1e-12))
+    assert np.all(path.low <= np.minimum(path.open, path.close) * (1 + 1e-12))
+    assert np.all(np.diff(path.timestamp) == 60 * 1_000_000_000)
+    # 블록 안의 수익률은 원본 연속 구간과 같음
+    returns = np.log(path.close[1:60] / path.close[:59])
+    src_returns = np.log(source.close[1:] / source.close[:-1])
+    assert any(np.allclose(returns, src_returns[s:s + 59]) for s in range(len(src_returns) - 58))
+
+
+def test_mdd_run_matches_fast_kernel():
+    arrays = CandleArrays.from_df(_make_candles(30000, seed=3, vol=0.003, crash_every=1500))
+    for settings in (_base_settings(), _base_settings(PROFIT_RESET_TARGET=0.05, LEVERAGE=20)):
+        res, expected = stress.run_simulation_mdd(arrays, settings, step=997), stress.run_simulation_fast(arrays, settings)
+        for key in RESULT_KEYS:
+            assert res[key] == expected[key], (settings, key)
+        assert -100 <= res["mdd"] <= 0
+
+
+def test_monte_carlo_is_deterministic_across_workers(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "MC_BLOCK_MINUTES", 60)
+    monkeypatch.setattr(stress, "MC_PATHS_PER_TASK", 3)
+    monkeypatch.setattr(stress, "SCENARIOS", [{"name": "T (Test)", "start": "2023-01-01 00:00:00", "end": "2023-01-31 23:59:59"}])
+    serial = stress.run_monte_carlo(num_paths=8, workers=1)
+    serial_paths = (tmp_path / "stress_test_btcusdt_montecarlo_paths.csv").read_text()
+    assert stress.run_monte_carlo(num_paths=8, workers=2) == serial
+    assert (tmp_path / "stress_test_btcusdt_montecarlo_paths.csv").read_text() == serial_paths
+    assert serial[0]["Paths"] == 8
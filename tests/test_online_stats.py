@@ -0,0 +1,56 @@
+# tests/test_online_stats.py
+
+import numpy as np
+import pandas as pd
+
+from utils.online_stats import EquityStats, HoldingStats, format_period
+
+
+def test_equity_stats_matches_series_drawdown():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        values = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+        times = pd.date_range("2023-01-01", periods=len(values), freq="1min")
+        stats = EquityStats()
+        for t, v in zip(times, values.tolist()):
+            stats.update(t, v)
+
+        series = pd.Series(values)
+        peak = series.cummax()
+        drawdown = (series - peak) / peak
+        assert stats.mdd_pct() == drawdown.min() * 100
+        assert stats.peak == peak.iloc[-1]
+        assert stats.underwater_ticks == int((series < peak).sum())
+
+        trough = int(drawdown.idxmin())
+        peak_at = int(np.flatnonzero(values[:trough + 1] >= peak.iloc[trough])[-1])
+        assert (stats.mdd_peak_time, stats.mdd_trough_time) == (times[peak_at], times[trough])
+
+        # 최장 수중 구간: 고점 아래 연속 캔들 수
+        below = (series < peak).to_numpy()
+        runs = np.diff(np.flatnonzero(np.diff(np.concatenate([[0], below.astype(int), [0]]))))[::2]
+        assert stats.max_underwater_ticks == (runs.max() if len(runs) else 0)
+
+
+def test_equity_stats_initial_value_and_flat_series():
+    stats = EquityStats(100.0)
+    for t in pd.date_range("2023-01-01", periods=5, freq="1min"):
+        stats.update(t, 100.0)
+    assert stats.count == 6
+    assert stats.mdd_pct() == 0
+    assert stats.underwater_ticks == 0
+    assert format_period(stats.mdd_peak_time, stats.mdd_trough_time) == "N/A"
+
+
+def test_holding_stats_matches_list_formulas():
+    start = pd.Timestamp("2023-01-01")
+    durations = [30.0, 90.0, 15.0, 90.0, 0.0]
+    holding = HoldingStats()
+    for k, duration in enumerate(durations):
+        holding.add(duration, start + pd.Timedelta(days=k), start + pd.Timedelta(days=k, minutes=duration))
+    assert holding.count == len(durations)
+    assert holding.average() == sum(durations) / len(durations)
+    max_idx = int(np.argmax(durations))
+    assert holding.max_duration == durations[max_idx]
+    assert holding.max_start == start + pd.Timedelta(days=max_idx)
+    assert HoldingStats().average() is None
@@ -0,0 +1,81 @@
+# tests/test_order_ledger.py
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import manager.simulator_db as simulator_db
+from manager.order_ledger import OrderLedger
+from manager.trading_context import simulation_context
+from strategy.casino_strategy import generate_buy_orders
+from tests.test_stress_kernel import _make_candles
+
+
+def _candle_db(tmp_path, monkeypatch, n=1500):
+    df = _make_candles(n, seed=11, vol=0.004, crash_every=300)
+    df["market"], df["volume"] = "BTCUSDT", 1.0
+    df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    db_path = str(tmp_path / "candles.sqlite")
+    with sqlite3.connect(db_path) as conn:
+        df.to_sql("minute_candles", conn, index=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simulator_db, "DB_PATH", db_path)
+
+
+def test_ledger_tracks_last_fill_and_open_orders():
+    ledger = OrderLedger()
+    initial = {"market": "BTCUSDT", "target_price": 100.0, "buy_type": "initial", "filled": "update",
+               "base_unit_size": 50.0}
+    ledger.add(initial)
+    assert ledger.last_fill_price("BTCUSDT", "small") is None and ledger.has_open("BTCUSDT", "initial")
+    ledger.fill(initial)
+    small = {"market": "BTCUSDT", "target_price": 99.0, "buy_type": "small_flow", "filled": "update"}
+    ledger.add(small)
+    ledger.fill(small)
+    assert ledger.last_fill_price("BTCUSDT", "small") == 99.0
+    assert ledger.last_fill_price("BTCUSDT", "large") == 100.0
+    assert ledger.base_unit["BTCUSDT"] == 50.0 and ledger.open_orders("BTCUSDT") == []
+    ledger.clear("BTCUSDT")
+    assert ledger.is_empty("BTCUSDT") and ledger.last_fill_price("BTCUSDT", "small") is None
+
+
+def test_fast_buy_orders_follow_generate_buy_orders():
+    setting = {"market": "BTCUSDT", "unit_size": 100, "small_flow_pct": 0.01, "small_flow_units": 2,
+               "large_flow_pct": 0.05, "large_flow_units": 4, "take_profit_pct": 0.003, "leverage": 10}
+    initial = {"market": "BTCUSDT", "target_price": 100.0, "buy_amount": 100.0, "buy_units": 0, "buy_type": "initial",
+               "filled": "done", "base_unit_size": 50.0}
+    pending_small = {"market": "BTCUSDT", "target_price": 99.0, "buy_amount": 100.0, "buy_units": 1,
+                     "buy_type": "small_flow", "filled": "wait", "base_unit_size": float("nan")}
+    holdings = {"BTCUSDT": {"balance": 1.0, "avg_price": 100.0}}
+    # (주문 기록, 보유, 현재가, 잔고): 최초 매수 / 잔고 부족 / 두 단계 동시 물타기 / 대기 중인 small_flow 건너뜀
+    cases = [([], {}, 100.0, 1000.0), ([], {}, 100.0, 10.0), ([initial], holdings, 94.0, 1000.0),
+             ([initial, pending_small], holdings, 94.0, 1000.0), ([initial], holdings, 94.0, 20.0)]
+    context = simulation_context(start=pd.Timestamp("2023-01-01"))
+    for log, held, price, balance in cases:
+        ledger = OrderLedger()
+        for order in log:
+            ledger.add(dict(order))
+        expected = generate_buy_orders(pd.DataFrame([setting]), pd.DataFrame(log), {"BTCUSDT": price}, held, balance,
+                                       context=context)
+        orders = simulator_db._fast_buy_orders(ledger, setting, price, held, balance)
+        assert pd.DataFrame(orders).equals(expected.drop(columns="time", errors="ignore")), (log, price, balance)
+
+
+@pytest.mark.parametrize("initial_cash", [3000.0, 700.0])  # 700: 증거금은 되지만 현금이 모자라 대기하는 주문 발생
+def test_fast_mode_matches_dataframe_ledger(tmp_path, monkeypatch, initial_cash):
+    _candle_db(tmp_path, monkeypatch)
+    results = []
+    for fast in (False, True):
+        summary = simulator_db.simulate_with_db(
+            market="BTCUSDT", start="2023-01-01 00:00:00", end="2023-01-02 06:00:00", unit_size=100,
+            small_flow_pct=0.004, small_flow_units=2, large_flow_pct=0.013, large_flow_units=4,
+            take_profit_pct=0.003, leverage=10, initial_cash=initial_cash, use_cache=False,
+            outputs=[simulator_db.make_writers(["csv"], str(tmp_path / f"fast_{fast}"), "총 포트폴리오 값")[0]],
+            fast=fast)
+        results.append((summary, pd.read_csv(summary.pop("log_file"), float_precision="round_trip")))
+
+    (slow_summary, slow_log), (fast_summary, fast_log) = results
+    assert fast_summary == slow_summary
+    pd.testing.assert_frame_equal(fast_log, slow_log)
+    assert slow_summary["total_sell_trades"] > 0
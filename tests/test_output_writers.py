@@ -0,0 +1,118 @@
+# tests/test_output_writers.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from manager.output_writers import CsvWriter, DownsampleWriter, make_writers
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 3000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    times = pd.date_range("2023-01-01", periods=n, freq="1min")
+    return [{"시간": t, "신호": "보유 중", "총 포트폴리오 값": float(v)} for t, v in zip(times, values)]
+
+
+def _lttb_reference(points, bucket):
+    """전체 점을 메모리에 둔 표준 LTTB (첫 점, 크기 bucket 인 버킷들, 마지막 점)."""
+    middle = points[1:-1]
+    buckets = [middle[k:k + bucket] for k in range(0, len(middle), bucket)]
+    selected = [points[0]]
+    for k, current in enumerate(buckets):
+        nxt = buckets[k + 1] if k + 1 < len(buckets) else [points[-1]]
+        tx, ty = sum(p[0] for p in nxt) / len(nxt), sum(p[1] for p in nxt) / len(nxt)
+        ax, ay = selected[-1]
+        areas = [abs((ax - tx) * (y - ay) - (ax - x) * (ty - ay)) for x, y in current]
+        selected.append(current[int(np.argmax(areas))])
+    return selected + [points[-1]]
+
+
+def test_csv_writer_streams_in_chunks(tmp_path):
+    rows = _rows(1234)
+    writer = CsvWriter(str(tmp_path / "log.csv"), chunk_rows=100)
+    for row in rows:
+        writer.write(row)
+        assert len(writer.chunk) < 100
+    (path,) = writer.close()
+    saved = pd.read_csv(path, parse_dates=["시간"], float_precision="round_trip")
+    pd.testing.assert_frame_equal(saved, pd.DataFrame(rows))
+
+
+def test_minmax_keeps_bucket_extremes_in_time_order(tmp_path):
+    rows = _rows(1000, seed=1)
+    writer = DownsampleWriter(str(tmp_path / "mm.csv"), "총 포트폴리오 값", method="minmax", bucket_rows=64)
+    for row in rows:
+        writer.write(row)
+    saved = pd.read_csv(writer.close()[0], parse_dates=["시간"], float_precision="round_trip")
+
+    values = np.array([r["총 포트폴리오 값"] for r in rows])
+    expected = []
+    for k in range(0, len(values), 64):
+        chunk = values[k:k + 64]
+        expected += [k + j for j in sorted({int(chunk.argmin()), int(chunk.argmax())})]
+    assert saved["총 포트폴리오 값"].tolist() == values[expected].tolist()
+    assert saved["시간"].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("n", [2, 50, 1 + 64 * 5, 2 + 64 * 5, 1000])
+def test_streaming_lttb_matches_reference(tmp_path, n):
+    rows = _rows(n, seed=n)
+    writer = DownsampleWriter(str(tmp_path / "lttb.csv"), "총 포트폴리오 값", method="lttb", bucket_rows=64)
+    for row in rows:
+        writer.write(row)
+    saved = pd.read_csv(writer.close()[0], float_precision="round_trip")
+
+    points = [(x, r["총 포트폴리오 값"]) for x, r in enumerate(rows)]
+    expected = _lttb_reference(points, 64)
+    assert saved["총 포트폴리오 값"].tolist() == [y for _, y in expected]
+
+
+def test_make_writers_falls_back_to_csv_without_optional_libraries(tmp_path, monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def no_optional(name, *args, **kwargs):
+        if name.split(".")[0] in ("pyarrow", "openpyxl"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_optional)
+    writers = make_writers(["parquet", "excel", "lttb"], str(tmp_path / "run"), "총 포트폴리오 값")
+    assert [type(w).__name__ for w in writers] == ["CsvWriter", "DownsampleWriter"]
+    with pytest.raises(ValueError):
+        make_writers(["xml"], str(tmp_path / "run"), "총 포트폴리오 값")
+
+
+def test_simulate_with_db_streams_log_and_summary(tmp_path, monkeypatch):
+    import sqlite3
+    import manager.simulator_db as simulator_db
+    from tests.test_stress_kernel import _make_candles
+
+    df = _make_candles(600, seed=5, vol=0.004, crash_every=200)
+    df["market"], df["volume"] = "BTCUSDT", 1.0
+    df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    db_path = str(tmp_path / "candles.sqlite")
+    with sqlite3.connect(db_path) as conn:
+        df.to_sql("minute_candles", conn, index=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simulator_db, "DB_PATH", db_path)
+
+    summary = simulator_db.simulate_with_db(
+        market="BTCUSDT", start="2023-01-01 00:00:00", end="2023-01-02 00:00:00", unit_size=100,
+        small_flow_pct=0.004, small_flow_units=2, large_flow_pct=0.013, large_flow_units=4,
+        take_profit_pct=0.003, leverage=10, initial_cash=3000.0, use_cache=False, outputs=["csv", "minmax"])
+    log_path, minmax_path = summary["log_file"].split(", ")
+    log = pd.read_csv(log_path, float_precision="round_trip")
+    assert len(log) == 600 and len(pd.read_csv(minmax_path)) <= 2
+
+    # 예전처럼 로그 전체 DataFrame 으로 계산한 요약과 같아야 함
+    peak = log["총 포트폴리오 값"].cummax()
+    drawdown = (log["총 포트폴리오 값"] - peak) / peak
+    trough = drawdown.idxmin()
+    assert summary["max_drawdown_pct"] == drawdown.min() * 100
+    assert summary["mdd_detail_str"] == (f" (Peak {peak[trough]:,.2f} USDT -> "
+                                         f"Trough {log.loc[trough, '총 포트폴리오 값']:,.2f} USDT)")
+    assert summary["final_portfolio_value"] == log["총 포트폴리오 값"].iloc[-1]
+    assert summary["max_units"] == log["현재 유닛"].max()
+    assert summary["total_sell_trades"] > 0
@@ -0,0 +1,34 @@
+# tests/test_parallel_runner.py
+
+import numpy as np
+
+import stress_test_btc_final as stress
+from manager.parallel_runner import SharedCandles, run_parallel
+from utils.candle_arrays import CandleArrays
+from tests.test_stress_kernel import RESULT_KEYS, _base_settings, _make_candles
+
+
+def test_shared_candles_roundtrip():
+    arrays = CandleArrays.from_df(_make_candles(1000, seed=1))
+    with SharedCandles(arrays) as shared:
+        view, shm = SharedCandles.attach(shared.spec)
+        for col in ("timestamp", "open", "high", "low", "close"):
+            assert np.array_equal(getattr(view, col), getattr(arrays, col))
+        del view
+        shm.close()
+
+
+def test_parallel_grid_matches_serial():
+    arrays = CandleArrays.from_df(_make_candles(10000, seed=2, vol=0.003, crash_every=1000))
+    items = [(c, _base_settings(TAKE_PROFIT_PCT=tp, LEVERAGE=lev))
+             for c, (tp, lev) in enumerate((tp, lev) for tp in (0.004, 0.006, 0.01) for lev in (5, 10, 20))]
+
+    parallel = {}
+    for batch in run_parallel(arrays, stress.make_batches(items, 2), stress.simulate_batch, workers=2):
+        parallel.update(batch)
+
+    assert sorted(parallel) == [c for c, _ in items]
+    for c, settings in items:
+        expected = stress.run_simulation_fast(arrays, settings)
+        for key in RESULT_KEYS:
+            assert parallel[c][key] == expected[key], (settings, key)
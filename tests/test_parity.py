@@ -0,0 +1,62 @@
+# tests/test_parity.py
+
+import pandas as pd
+
+import parity_check
+import stress_test_btc_final as stress
+import stress_test_step_up as step_up
+from utils.parity import bisect_divergence, compare_stats, first_divergence
+from tests.test_stress_kernel import _base_settings, _make_candles
+from tests.test_bot_pool import _compound_settings
+
+DB_KWARGS = {"market": "BTCUSDT", "start": "2023-01-01 00:00:00", "end": "2023-01-02 00:00:00", "unit_size": 100,
+             "small_flow_pct": 0.004, "small_flow_units": 2, "large_flow_pct": 0.013, "large_flow_units": 4,
+             "take_profit_pct": 0.003, "leverage": 10, "initial_cash": 3000.0}
+
+
+def _assert_ok(reports):
+    for report in reports:
+        assert report["ok"], parity_check.format_parity_report(report)
+
+
+def test_all_engines_agree_on_synthetic_candles(tmp_path, monkeypatch):
+    from tests.test_order_ledger import _candle_db
+
+    df = _make_candles(6000, seed=2, vol=0.003, crash_every=500)
+    compound_df = _make_candles(6000, seed=3, vol=0.003, crash_every=1500, drift=0.00002)
+    _assert_ok(parity_check.check_stress(df, _base_settings()))
+    _assert_ok(parity_check.check_step_up(df, {k: v[0] for k, v in step_up.GRID_PARAMS.items()}))
+    _assert_ok(parity_check.check_compound(compound_df, _compound_settings(PROFIT_RESET_TARGET=0.01)))
+
+    _candle_db(tmp_path, monkeypatch, n=800)
+    _assert_ok(parity_check.check_simulate_with_db(**DB_KWARGS))
+
+
+def test_reports_first_diverging_candle(monkeypatch):
+    df = _make_candles(6000, seed=2, vol=0.003, crash_every=500)
+    settings = _base_settings()
+
+    # 최적화 경로만 익절 폭을 넓혀 두면, 기준 엔진이 처음 익절하는 캔들에서 잡혀야 함
+    fast = stress.run_simulation_fast
+
+    def wider(s):
+        return dict(s, TAKE_PROFIT_PCT=s["TAKE_PROFIT_PCT"] * 1.5)
+    monkeypatch.setattr(stress, "run_simulation_fast", lambda candles, s, **kw: fast(candles, wider(s), **kw))
+    monkeypatch.setattr(stress, "run_simulation_grid", lambda candles, ss: [fast(candles, wider(s)) for s in ss])
+    reports = {r["engine"]: r for r in parity_check.check_stress(df, settings)}
+    trail = reports["stress.run_simulation_fast"]
+    grid = reports["stress.run_simulation_grid"]
+    assert not trail["ok"] and not grid["ok"] and "final_equity" in trail["stat_diffs"]
+    assert trail["first_divergence"]["reference"][1] == "take_profit"
+    # 이벤트 열과 이분 탐색이 같은 캔들을 가리킴
+    assert grid["first_divergence_time"] == trail["first_divergence_time"]
+
+
+def test_divergence_helpers():
+    t = pd.Timestamp("2023-01-01")
+    a = [(t, "initial_buy"), (t, "take_profit")]
+    assert first_divergence(a, list(a)) is None
+    assert first_divergence(a, a[:1]) == {"position": 1, "reference": a[1], "candidate": None}
+    assert compare_stats({"x": 1.0, "y": "a"}, {"x": 1.0 + 1e-12, "y": "b"}, ("x", "y")) == {"y": ("a", "b")}
+    assert bisect_divergence(100, lambda k: k <= 37) == 37
+    assert bisect_divergence(100, lambda k: True) is None
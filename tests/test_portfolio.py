@@ -0,0 +1,93 @@
+# tests/test_portfolio.py
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import parity_check
+import portfolio_test as portfolio
+from manager.portfolio_engine import PortfolioState
+from utils.candle_arrays import align_candles
+from utils.synthetic_candles import synthetic_candles, write_candle_db
+
+
+def _market_settings(market, **overrides):
+    settings = {"MARKET": market, "UNIT_SIZE": 350.0, "TAKE_PROFIT_PCT": 0.006, "SMALL_FLOW_PCT": 0.04,
+                "LARGE_FLOW_PCT": 0.17, "INITIAL_UNITS": 2.0, "SMALL_FLOW_UNITS": 2.0, "LARGE_FLOW_UNITS": 10.0,
+                "LEVERAGE": 10.0, "MARGIN_BUFFER": portfolio.MARGIN_BUFFER}
+    settings.update(overrides)
+    return settings
+
+
+def test_align_candles_fills_gaps_and_trims_to_common_range():
+    a = synthetic_candles(100, seed=1)
+    b = synthetic_candles(100, seed=2).iloc[10:].drop(index=[20, 21])
+    first, second = align_candles([a, b])
+    assert len(first) == len(second) == 90
+    assert np.array_equal(first.timestamp, second.timestamp)
+    assert first.close.tolist() == a["close"].iloc[10:].tolist()
+    # 빠진 분은 직전 종가의 평탄한 캔들
+    for k in (10, 11):
+        assert second.open[k] == second.high[k] == second.low[k] == second.close[k] == b.loc[19, "close"]
+    assert second.high[12] == b.loc[22, "high"]
+    assert len(align_candles([a, synthetic_candles(10, start="2021-01-01")])[0]) == 0
+
+
+def test_portfolio_engine_matches_reference_loop():
+    candles = align_candles([synthetic_candles(60_000, seed=s, vol=0.0015, crash_every=8000) for s in (11, 12, 13)])
+    cases = [
+        [_market_settings(f"M{k}") for k in range(3)],
+        # 레버리지 1 + 큰 유닛: 공유 잔고가 모자라 물타기를 못 하다가 다른 종목의 익절로 가능해지는 경우
+        [_market_settings("M0", UNIT_SIZE=1200.0, LEVERAGE=1.0, INITIAL_UNITS=1.0),
+         _market_settings("M1", UNIT_SIZE=300.0, LEVERAGE=1.0, SMALL_FLOW_PCT=0.01),
+         _market_settings("M2", UNIT_SIZE=900.0, LEVERAGE=2.0)],
+    ]
+    for settings_list in cases:
+        reports = parity_check.check_portfolio(candles, settings_list)
+        assert reports[0]["ok"], parity_check.format_parity_report(reports[0])
+
+        engine = portfolio.build_portfolio(settings_list)
+        full = engine.run(candles)
+        assert sum(stat["sell_count"] for stat in full["markets"].values()) > 0
+
+        # 중간 상태(dict 왕복 포함)에서 이어서 실행해도 한 번에 돌린 결과와 같음
+        first = engine.run(candles, stop=25_000)
+        state = PortfolioState.from_dict(first["state"].to_dict())
+        resumed = engine.run(candles, state=state, start=25_000)
+        assert (resumed["final_equity"], resumed["markets"]) == (full["final_equity"], full["markets"])
+
+
+def test_account_stop_loss_flattens_every_market():
+    candles = align_candles([synthetic_candles(30_000, seed=s, vol=0.004, crash_every=3000) for s in (21, 22)])
+    res = portfolio.build_portfolio([_market_settings(f"M{k}", UNIT_SIZE=1500.0) for k in range(2)]).run(candles)
+    assert res["sl_count"] > 0 and res["total_injected"] > 0
+    assert res["state"].account.cash > 0
+
+
+def test_load_portfolio_candles_and_settings(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "c.sqlite")
+    write_candle_db(synthetic_candles(500, seed=1), db_path, market="AAAUSDT")
+    with sqlite3.connect(db_path) as conn:
+        df = synthetic_candles(400, seed=2, start="2020-01-01 01:00:00").assign(market="BBBUSDT", volume=1.0)
+        df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        df[["market", "timestamp", "open", "high", "low", "close", "volume"]].to_sql(
+            "minute_candles", conn, index=False, if_exists="append")
+    monkeypatch.setattr(portfolio, "DB_PATH", db_path)
+
+    candles = portfolio.load_portfolio_candles(["AAAUSDT", "BBBUSDT"], "2020-01-01 00:00:00", "2020-01-02 00:00:00",
+                                               workers=2)
+    assert [len(c) for c in candles] == [400, 400]
+    assert candles[0].timestamp_at(0) == pd.Timestamp("2020-01-01 01:00:00")
+    assert portfolio.load_portfolio_candles(["AAAUSDT", "CCCUSDT"], "2020-01-01", "2020-01-02", workers=1) == []
+
+    setting_path = tmp_path / "setting.csv"
+    setting_path.write_text("market,initial_entry_units,unit_size,small_flow_pct,small_flow_units,large_flow_pct,"
+                            "large_flow_units,take_profit_pct,leverage,margin_type\n"
+                            "AAAUSDT,2,350,0.04,2,0.17,10,0.006,10,CROSSED\n"
+                            "BBBUSDT,1,200,0.03,2,0.1,5,0.005,5,CROSSED\n")
+    settings_list = portfolio.load_market_settings(str(setting_path))
+    assert [s["MARKET"] for s in settings_list] == ["AAAUSDT", "BBBUSDT"]
+    assert settings_list[1]["UNIT_SIZE"] == 200.0 and settings_list[1]["LEVERAGE"] == 5.0
+    res = portfolio.build_portfolio(settings_list).run(candles)
+    assert set(res["markets"]) == {"AAAUSDT", "BBBUSDT"}
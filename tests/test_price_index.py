@@ -0,0 +1,45 @@
+# tests/test_price_index.py
+
+import numpy as np
+
+from utils.candle_arrays import CandleArrays
+from utils.price_index import BlockExtrema, MINUTE_NS
+
+
+def _brute_first(values, start, x, stop):
+    for j in range(start, min(stop, len(values))):
+        if values[j] >= x:
+            return j
+    return min(stop, len(values))
+
+
+def test_block_extrema_matches_linear_scan():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        n = int(rng.integers(1, 400))
+        values = rng.normal(size=n)
+        extrema = BlockExtrema(values, block_size=int(rng.choice([1, 4, 32])))
+        start = int(rng.integers(0, n + 1))
+        stop = int(rng.integers(0, n + 2))
+        x = float(rng.normal() * 2)
+        assert extrema.first_at_or_above(start, x, stop) == _brute_first(values, start, x, stop)
+
+
+def test_next_trigger_and_timestamp_lookup():
+    rng = np.random.default_rng(1)
+    n = 5000
+    # 중간에 누락 캔들이 있는 1분봉 타임스탬프
+    minutes = np.sort(rng.choice(np.arange(n * 2), size=n, replace=False))
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    candles = CandleArrays(minutes * MINUTE_NS, close, close + 0.3, close - 0.3, close)
+    index = candles.price_index()
+
+    for _ in range(300):
+        start = int(rng.integers(0, n))
+        low_x, high_x, close_x = close[start] - rng.uniform(0, 20), close[start] + rng.uniform(0, 20), np.inf
+        expected = next((j for j in range(start, n)
+                         if candles.low[j] <= low_x or candles.high[j] >= high_x or candles.close[j] >= close_x), n)
+        assert index.next_trigger(start, low_x, high_x, close_x) == expected
+
+        t = int(rng.integers(0, n * 2 + 10)) * MINUTE_NS
+        assert index.index_at_or_after(t, start) == int(np.searchsorted(candles.timestamp, t))
@@ -0,0 +1,29 @@
+# tests/test_scenario_candles.py
+
+import numpy as np
+
+import stress_test_btc_final as stress
+from utils.scenario_candles import ScenarioCandles
+from utils.candle_arrays import CandleArrays
+from tests.test_job_queue import _write_candle_db
+
+
+def test_scenario_views_match_separate_loads(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    scenarios = [("2023-01-01 10:00:00", "2023-01-02 03:00:00"), ("2023-01-02 00:00:00", "2023-01-04 00:00:00"),
+                 ("2023-01-03 23:59:30", "2023-01-03 23:59:59")]
+
+    calls = []
+    loader = lambda market, start, end: calls.append((start, end)) or stress.load_candles(market, start, end)
+    candles = ScenarioCandles.load(loader, stress.MARKET, scenarios)
+    assert calls == [("2023-01-01 10:00:00", "2023-01-04 00:00:00")]
+
+    for start, end in scenarios:
+        df, arrays = candles.view(start, end)
+        expected = CandleArrays.from_df(stress.load_candles(stress.MARKET, start, end))
+        assert len(df) == len(arrays) == len(expected)
+        for col in ("timestamp", "open", "high", "low", "close"):
+            assert np.array_equal(getattr(arrays, col), getattr(expected, col))
+            assert len(arrays) == 0 or np.shares_memory(getattr(arrays, col), getattr(candles.arrays, col))
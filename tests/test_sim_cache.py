@@ -0,0 +1,54 @@
+# tests/test_sim_cache.py
+
+import sqlite3
+
+import stress_test_btc_final as stress
+from manager.sim_cache import SimCache, CheckpointStore, db_fingerprint, arrays_fingerprint
+from utils.candle_arrays import CandleArrays
+from tests.test_job_queue import _write_candle_db
+from tests.test_stress_kernel import _make_candles
+
+
+def test_cache_roundtrip_and_eviction(tmp_path):
+    cache = SimCache(str(tmp_path / "cache.sqlite"))
+    settings = {"UNIT_SIZE": 350.0, "PROFIT_RESET_TARGET": None}
+    cache.put("engine", "1", "BTCUSDT|a|b", "fp1", settings, {"final_equity": 1.5})
+
+    assert cache.get("engine", "1", "BTCUSDT|a|b", "fp1", dict(reversed(list(settings.items())))) == {"final_equity": 1.5}
+    assert cache.get("engine", "1", "BTCUSDT|a|b", "fp1", {"UNIT_SIZE": 200.0, "PROFIT_RESET_TARGET": None}) is None
+    # 데이터 지문이 바뀌면 같은 구간의 이전 항목은 지워짐
+    assert SimCache(cache.path).get("engine", "1", "BTCUSDT|a|b", "fp2", settings) is None
+    assert SimCache(cache.path).get("engine", "1", "BTCUSDT|a|b", "fp1", settings) is None
+
+
+def test_fingerprint_changes_when_range_grows(tmp_path):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path, n=2000)
+    before = db_fingerprint(db_path, stress.MARKET, "2023-01-01 00:00:00", "2023-12-31 23:59:59")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO minute_candles VALUES ('2023-01-03 00:00:00', 1, 2, 0.5, 1.5, ?)", (stress.MARKET,))
+    after = db_fingerprint(db_path, stress.MARKET, "2023-01-01 00:00:00", "2023-12-31 23:59:59")
+    assert before != after and before.startswith("2000|") and after.startswith("2001|")
+
+    arrays = CandleArrays.from_df(_make_candles(100, seed=0))
+    assert arrays_fingerprint(arrays) == arrays_fingerprint(CandleArrays.from_df(_make_candles(100, seed=0)))
+    assert arrays_fingerprint(arrays) != arrays_fingerprint(CandleArrays.from_df(_make_candles(100, seed=1)))
+
+
+def test_stress_main_serves_cached_rows_without_loading(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "PARALLEL_WORKERS", 1)
+    monkeypatch.setattr(stress, "SimCache", lambda: SimCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "CheckpointStore", lambda: CheckpointStore(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(stress, "SCENARIOS", [{"name": "T (Test)", "start": "2023-01-01 00:00:00", "end": "2023-01-31 23:59:59"}])
+    stress.main()
+    first = (tmp_path / "stress_test_btcusdt_final_result.csv").read_text()
+
+    def _no_load(*args):
+        raise AssertionError("캐시 적중 시 캔들을 읽으면 안 됨")
+    monkeypatch.setattr(stress, "load_candles", _no_load)
+    stress.main()
+    assert (tmp_path / "stress_test_btcusdt_final_result.csv").read_text() == first
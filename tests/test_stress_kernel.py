@@ -0,0 +1,79 @@
+# tests/test_stress_kernel.py
+
+import numpy as np
+import pandas as pd
+
+import stress_test_btc_final as stress
+import stress_test_step_up as step_up
+from utils.candle_arrays import CandleArrays
+
+RESULT_KEYS = ["sl_count", "reset_count", "total_injected", "secured_profit", "final_equity"]
+
+
+def _make_candles(n, seed, vol=0.002, crash_every=3000, drift=0.0):
+    rng = np.random.default_rng(seed)
+    k = np.arange(n)
+    returns = rng.normal(drift, vol, n) + np.where((k // crash_every) % 3 == 1, -0.0005, 0.0)
+    close = 20000.0 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[20000.0], close[:-1]])
+    spread = np.abs(rng.normal(0, vol, n)) * close
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2023-01-01", periods=n, freq="1min"),
+        "open": open_, "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread, "close": close,
+    })
+
+
+def _base_settings(**overrides):
+    settings = {k: v[0] for k, v in stress.GRID_PARAMS.items()}
+    settings.update(overrides)
+    return settings
+
+
+def test_fast_kernel_matches_reference_loop():
+    cases = [
+        _base_settings(),
+        _base_settings(PROFIT_RESET_TARGET=None),
+        _base_settings(PROFIT_RESET_TARGET=0.05, LEVERAGE=20, UNIT_SIZE=600.0),
+        # buy_step >= 3 구간 (직전 target_base 재사용) 까지 내려가는 촘촘한 사다리
+        _base_settings(SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01),
+    ]
+    for seed in range(3):
+        df = _make_candles(20000, seed, vol=0.003 if seed == 2 else 0.002, crash_every=800 + seed * 1000)
+        arrays = CandleArrays.from_df(df)
+        for settings in cases:
+            expected = stress.run_simulation(df, settings)
+            actual = stress.run_simulation_fast(arrays, settings)
+            for key in RESULT_KEYS:
+                assert actual[key] == expected[key], (seed, settings, key)
+
+
+def test_fast_kernel_accepts_dataframe():
+    df = _make_candles(5000, seed=7)
+    settings = _base_settings()
+    assert stress.run_simulation_fast(df, settings)["final_equity"] == stress.run_simulation(df, settings)["final_equity"]
+
+
+def test_grid_kernel_matches_reference_loop():
+    df = _make_candles(20000, seed=3, vol=0.003, crash_every=1500)
+    cases = [
+        _base_settings(),
+        _base_settings(PROFIT_RESET_TARGET=None, TAKE_PROFIT_PCT=0.004),
+        _base_settings(PROFIT_RESET_TARGET=0.05, LEVERAGE=20, UNIT_SIZE=600.0),
+        _base_settings(SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01),
+    ]
+    for settings, actual in zip(cases, stress.run_simulation_grid(df, cases)):
+        expected = stress.run_simulation(df, settings)
+        for key in RESULT_KEYS:
+            assert actual[key] == expected[key], (settings, key)
+
+
+def test_step_up_grid_kernel_matches_reference_loop():
+    # 상승 추세에서 Step-up 레벨업 후 높아진 하드 데크 손절까지 나오도록 구성
+    df = _make_candles(20000, seed=4, vol=0.001, crash_every=6000, drift=0.0003)
+    base = {k: v[0] for k, v in step_up.GRID_PARAMS.items()}
+    cases = [dict(base, UNIT_RATIO=ratio, LEVERAGE=lev) for ratio in (0.1, 0.3, 0.6) for lev in (10, 20)]
+    for settings, actual in zip(cases, step_up.run_simulation_grid(df, cases)):
+        expected = step_up.run_simulation(df, settings)
+        for key in ["sl_count", "total_injected", "final_equity"]:
+            assert actual[key] == expected[key], (settings, key)
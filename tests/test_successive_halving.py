@@ -0,0 +1,45 @@
+# tests/test_successive_halving.py
+
+import stress_test_btc_final as stress
+from utils.candle_arrays import CandleArrays
+from tests.test_stress_kernel import RESULT_KEYS, _base_settings, _make_candles
+
+
+def test_segmented_run_matches_full_run():
+    arrays = CandleArrays.from_df(_make_candles(20000, seed=6, vol=0.003, crash_every=1200))
+    for settings in (_base_settings(), _base_settings(PROFIT_RESET_TARGET=0.05, LEVERAGE=20),
+                     _base_settings(SMALL_FLOW_PCT=0.005, LARGE_FLOW_PCT=0.01)):
+        expected = stress.run_simulation_fast(arrays, settings)
+        state = None
+        for start, stop in ((0, 3000), (3000, 3001), (3001, 12000), (12000, 20000)):
+            res = stress.run_simulation_fast(arrays, settings, state=state, start=start, stop=stop)
+            state = res["state"]
+        for key in RESULT_KEYS:
+            assert res[key] == expected[key], (settings, key)
+
+
+def test_abort_ceiling_is_identical_across_engines():
+    df = _make_candles(20000, seed=3, vol=0.003, crash_every=1500)
+    cases = [_base_settings(MAX_SL_COUNT=2), _base_settings(MAX_INJECTED=1500.0), _base_settings()]
+    grid = stress.run_simulation_grid(df, cases)
+    for settings, from_grid in zip(cases, grid):
+        expected = stress.run_simulation(df, settings)
+        fast = stress.run_simulation_fast(df, settings)
+        for key in RESULT_KEYS + ["aborted"]:
+            assert fast[key] == expected[key] and from_grid[key] == expected[key], (settings, key)
+    assert grid[0]["aborted"] and grid[0]["sl_count"] == 3
+    assert grid[1]["aborted"] and not grid[2]["aborted"]
+
+
+def test_successive_halving_promotes_with_exact_results():
+    arrays = CandleArrays.from_df(_make_candles(16000, seed=8, vol=0.003, crash_every=1000))
+    settings_list = [_base_settings(TAKE_PROFIT_PCT=tp, LEVERAGE=lev, MAX_SL_COUNT=6)
+                     for tp in (0.004, 0.006, 0.01) for lev in (5, 10, 20)]
+    ranked, results, processed = stress.run_successive_halving(arrays, settings_list, workers=1)
+
+    assert 0 < len(ranked) <= stress.HALVING_MIN_SURVIVORS
+    assert processed < len(arrays) * len(settings_list)
+    for c in ranked:
+        expected = stress.run_simulation_fast(arrays, settings_list[c])
+        for key in RESULT_KEYS:
+            assert results[c][key] == expected[key]
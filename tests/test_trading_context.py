@@ -0,0 +1,64 @@
+# tests/test_trading_context.py
+
+import pandas as pd
+import pytest
+
+import strategy.casino_strategy as casino_strategy
+from manager.trading_context import simulation_context
+
+
+def _setting_df():
+    return pd.DataFrame([{"market": "BTCUSDT", "unit_size": 100, "small_flow_pct": 0.01, "small_flow_units": 2,
+                          "large_flow_pct": 0.05, "large_flow_units": 4, "take_profit_pct": 0.003, "leverage": 10}])
+
+
+def _done_initial(price):
+    return pd.DataFrame([{"market": "BTCUSDT", "target_price": price, "buy_amount": 100.0, "buy_units": 0,
+                          "buy_type": "initial", "filled": "done", "base_unit_size": 100.0}])
+
+
+@pytest.fixture
+def no_live_state(monkeypatch, tmp_path):
+    """실거래 컨텍스트를 부르면 실패하도록 막고, 상태 파일이 생기는지 보기 위해 빈 디렉터리에서 실행."""
+    def forbidden():
+        raise AssertionError("시뮬레이션이 실거래 컨텍스트를 사용함")
+    monkeypatch.setattr(casino_strategy, "live_context", forbidden)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_buy_orders_use_injected_hwm_and_clock(no_live_state):
+    context = simulation_context(start=pd.Timestamp("2023-03-01 12:34"), hwm={"BTCUSDT": 110.0})
+    orders = casino_strategy.generate_buy_orders(_setting_df(), _done_initial(100.0), {"BTCUSDT": 108.0}, {}, 10_000.0,
+                                                 enable_rebalance=True, context=context)
+    # HWM 110 기반 small_flow 목표가 108.9 → 현재가 108 에서 주문 (기존 기준이면 99 이하여야 함)
+    assert orders["buy_type"].tolist() == ["small_flow"]
+    assert orders["target_price"].iloc[0] == round(110.0 * 0.99, 8)
+    assert orders["time"].iloc[0] == "2023-03-01 12:34:00"
+    assert list(no_live_state.iterdir()) == []
+
+
+def test_simulation_contexts_are_independent():
+    first, second = simulation_context(), simulation_context()
+    first.hwm.update_hwm("BTCUSDT", 120.0)
+    first.hwm.reset_hwm("BTCUSDT", 100.0)
+    assert first.hwm.get_hwm("BTCUSDT") == 100.0 and second.hwm.get_hwm("BTCUSDT") == 0.0
+    assert [e[0] for e in first.notifier.events] == ["notify_hwm_event"] and second.notifier.events == []
+
+    first.clock.set(pd.Timestamp("2023-01-01 00:00"))
+    first.cooldown.start_cooldown()
+    assert first.cooldown.is_cooldown_active() and not second.cooldown.is_cooldown_active()
+    assert first.cooldown.get_end_time() > first.now()
+
+
+def test_simulate_with_db_does_not_touch_live_context(no_live_state, monkeypatch):
+    from tests.test_order_ledger import _candle_db
+    import manager.simulator_db as simulator_db
+
+    _candle_db(no_live_state, monkeypatch, n=300)
+    summary = simulator_db.simulate_with_db(
+        market="BTCUSDT", start="2023-01-01 00:00:00", end="2023-01-02 00:00:00", unit_size=100,
+        small_flow_pct=0.004, small_flow_units=2, large_flow_pct=0.013, large_flow_units=4,
+        take_profit_pct=0.003, leverage=10, initial_cash=3000.0, use_cache=False, outputs=["csv"], fast=False)
+    assert summary["total_sell_trades"] > 0
+    assert not (no_live_state / "hwm_data.json").exists()
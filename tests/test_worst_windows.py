@@ -0,0 +1,54 @@
+# tests/test_worst_windows.py
+
+import numpy as np
+
+import stress_test_btc_final as stress
+from utils.candle_arrays import CandleArrays
+from utils.worst_windows import find_worst_windows, rolling_max, rolling_min
+from tests.test_job_queue import _write_candle_db
+from tests.test_stress_kernel import _make_candles
+
+
+def test_rolling_extrema_match_brute_force():
+    values = np.random.default_rng(0).normal(size=500)
+    peak, peak_at = rolling_max(values, 37)
+    trough = rolling_min(values, 37)
+    for j in range(len(values)):
+        window = values[max(0, j - 36):j + 1]
+        assert peak[j] == window.max() and values[peak_at[j]] == peak[j] and trough[j] == window.min()
+
+
+def test_worst_windows_match_brute_force():
+    candles = CandleArrays.from_df(_make_candles(4000, seed=1, vol=0.003, crash_every=700))
+    high, low, window = candles.high, candles.low, 240
+
+    deepest = max((1 - low[s:s + window] / np.maximum.accumulate(high[s:s + window])).max()
+                   for s in range(len(candles) - window + 1))
+    top = find_worst_windows(candles, window, "drawdown", top_n=3)
+    assert top[0][2] == deepest
+    assert all(e - s + 1 == window for s, e, _ in top)
+    assert all(a[1] < b[0] or b[1] < a[0] for i, a in enumerate(top) for b in top[i + 1:])
+
+    hwm = np.maximum.accumulate(high)
+    sharpest = max(1 - low[i:i + window].min() / high[i] for i in range(len(candles)) if high[i] >= hwm[i])
+    assert find_worst_windows(candles, window, "crash", top_n=1)[0][2] == sharpest
+
+    hwm_at = np.flatnonzero(high >= hwm)
+    gaps = np.diff(np.append(hwm_at, len(candles))) - 1
+    start, _, score = find_worst_windows(candles, window, "underwater", top_n=1)[0]
+    assert score == gaps.max() and start == min(hwm_at[gaps.argmax()], len(candles) - window)
+
+
+def test_worst_windows_plug_into_scenarios(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "candles.sqlite")
+    _write_candle_db(db_path)
+    monkeypatch.setattr(stress, "DB_PATH", db_path)
+    monkeypatch.setattr(stress, "WORST_WINDOWS", [{"metric": "drawdown", "days": 0.25, "top_n": 2},
+                                                  {"metric": "underwater", "days": 0.25, "top_n": 1}])
+    scenarios = stress.scenario_list()
+    assert scenarios[:len(stress.SCENARIOS)] == stress.SCENARIOS
+    auto = scenarios[len(stress.SCENARIOS):]
+    assert [sc["name"][:3] for sc in auto] == ["DD1", "DD2", "UW1"]
+    for sc in auto:
+        df = stress.load_candles(stress.MARKET, sc["start"], sc["end"])
+        assert len(df) == 360
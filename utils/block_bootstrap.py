@@ -0,0 +1,40 @@
+# utils/block_bootstrap.py
+
+import numpy as np
+
+from utils.candle_arrays import CandleArrays
+from utils.price_index import MINUTE_NS
+
+
+class BlockBootstrap:
+    """
+    원본 1분봉을 길이 block 인 연속 구간(일봉=1440, 시간봉=60)으로 잘라 무작위로 이어 붙인 합성 경로 생성기.
+    캔들마다 직전 종가 대비 open/high/low/close 비율을 저장해 두고, 경로에서는 그 비율을 이어지는 가격에 곱하므로
+    블록 내부의 캔들 모양과 변동성은 그대로 유지되고 블록 경계에서 가격이 끊기지 않습니다.
+    """
+
+    def __init__(self, candles: CandleArrays, block=1440):
+        n = len(candles)
+        if n < block:
+            raise ValueError(f"캔들 수({n})가 블록 길이({block})보다 짧습니다.")
+        prev_close = np.concatenate([candles.open[:1], candles.close[:-1]])
+        self.open_ratio = candles.open / prev_close
+        self.high_ratio = candles.high / prev_close
+        self.low_ratio = candles.low / prev_close
+        self.close_ratio = candles.close / prev_close
+        self.block = block
+        self.num_starts = n - block + 1
+        self.start_price = candles.open.item(0)
+        self.start_timestamp = candles.timestamp.item(0)
+
+    def path(self, rng: np.random.Generator, length) -> CandleArrays:
+        """rng 로 블록 시작점을 뽑아 length 개 캔들의 합성 경로를 만듭니다 (timestamp 는 1분 간격)."""
+        num_blocks = -(-length // self.block)
+        starts = rng.integers(0, self.num_starts, num_blocks)
+        idx = (starts[:, None] + np.arange(self.block)).ravel()[:length]
+
+        close = self.start_price * np.cumprod(self.close_ratio[idx])
+        prev_close = np.concatenate([[self.start_price], close[:-1]])
+        timestamp = self.start_timestamp + np.arange(length, dtype=np.int64) * MINUTE_NS
+        return CandleArrays(timestamp, prev_close * self.open_ratio[idx], prev_close * self.high_ratio[idx],
+                            prev_close * self.low_ratio[idx], close)
@@ -0,0 +1,94 @@
+# utils/candle_arrays.py
+
+import numpy as np
+import pandas as pd
+from utils.price_index import PriceIndex, MINUTE_NS
+
+
+class CandleArrays:
+    """
+    백테스트 커널용 캔들 배열 묶음.
+    모든 가격 컬럼은 연속(contiguous) float64 배열, timestamp 는 int64 나노초(epoch) 배열로 보관합니다.
+    """
+    __slots__ = ("timestamp", "open", "high", "low", "close", "_price_index")
+
+    def __init__(self, timestamp, open_, high, low, close):
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.int64)
+        self.open = np.ascontiguousarray(open_, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self._price_index = None
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, time_col="timestamp", open_col="open", high_col="high",
+                low_col="low", close_col="close") -> "CandleArrays":
+        """load_candles 가 반환한 DataFrame 을 배열 묶음으로 변환합니다."""
+        if df.empty:
+            empty = np.empty(0)
+            return cls(empty, empty, empty, empty, empty)
+        timestamp = pd.to_datetime(df[time_col]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+        return cls(timestamp, df[open_col].to_numpy(), df[high_col].to_numpy(),
+                   df[low_col].to_numpy(), df[close_col].to_numpy())
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def view(self, lo, hi) -> "CandleArrays":
+        """[lo, hi) 구간을 복사 없이 가리키는 CandleArrays (연속 배열의 슬라이스는 그대로 연속)."""
+        return CandleArrays(self.timestamp[lo:hi], self.open[lo:hi], self.high[lo:hi],
+                            self.low[lo:hi], self.close[lo:hi])
+
+    def bounds(self, start, end):
+        """timestamp 가 [start, end] 안에 드는 인덱스 구간 (lo, hi). 정렬된 timestamp 위 이분 탐색."""
+        lo = int(np.searchsorted(self.timestamp, pd.Timestamp(start).value, side="left"))
+        hi = int(np.searchsorted(self.timestamp, pd.Timestamp(end).value, side="right"))
+        return lo, hi
+
+    def timestamp_at(self, i) -> pd.Timestamp:
+        return pd.Timestamp(int(self.timestamp[i]))
+
+    def price_index(self) -> PriceIndex:
+        """트리거 교차 인덱스 (최초 호출 시 한 번만 생성해 재사용)."""
+        if self._price_index is None:
+            self._price_index = PriceIndex(self)
+        return self._price_index
+
+
+def align_candles(frames, step_ns=MINUTE_NS):
+    """
+    여러 종목의 캔들을 공통 분 단위 인덱스에 맞춘 CandleArrays 목록으로 만듭니다 (포트폴리오 백테스트용).
+    구간은 모든 종목에 캔들이 있는 [가장 늦은 첫 캔들, 가장 이른 마지막 캔들] 이고,
+    빠진 분은 직전 종가의 평탄한 캔들(open = high = low = close)로 채웁니다.
+    """
+    arrays = [f if isinstance(f, CandleArrays) else CandleArrays.from_df(f) for f in frames]
+    empty = np.empty(0)
+    if not arrays or any(len(a) == 0 for a in arrays):
+        return [CandleArrays(empty, empty, empty, empty, empty) for _ in arrays]
+    first = max(a.timestamp.item(0) for a in arrays)
+    last = min(a.timestamp.item(-1) for a in arrays)
+    if first > last:
+        return [CandleArrays(empty, empty, empty, empty, empty) for _ in arrays]
+    n = (last - first) // step_ns + 1
+    timestamp = first + np.arange(n, dtype=np.int64) * step_ns
+
+    aligned = []
+    for a in arrays:
+        # 구간 시작 직전 캔들부터 잘라, 첫 분이 비어 있어도 그 종가로 채울 수 있게 함
+        lo = max(int(np.searchsorted(a.timestamp, first, side="right")) - 1, 0)
+        hi = int(np.searchsorted(a.timestamp, last, side="right"))
+        pos = (a.timestamp[lo:hi] - first) // step_ns
+        own = np.full(n, -1, dtype=np.int64)
+        keep = pos >= 0
+        own[pos[keep]] = np.flatnonzero(keep)
+        src = own.copy()
+        src[0] = max(src[0], 0)
+        np.maximum.accumulate(src, out=src)
+        gap = own != src
+        close = a.close[lo:hi][src]
+        aligned.append(CandleArrays(timestamp,
+                                    np.where(gap, close, a.open[lo:hi][src]),
+                                    np.where(gap, close, a.high[lo:hi][src]),
+                                    np.where(gap, close, a.low[lo:hi][src]),
+                                    close))
+    return aligned
@@ -0,0 +1,102 @@
+# utils/instrumentation.py
+
+import time
+from collections import Counter
+
+SAMPLE_EVERY = 64  # 단계별 시간은 N 캔들에 한 번만 측정 (perf_counter 호출 비용을 줄이기 위함)
+
+
+class EngineProfiler:
+    """
+    백테스트 엔진 계측기 (opt-in). 엔진은 profiler 가 None 이 아닐 때만 부르므로 끄면 비용은 None 비교 한 번입니다.
+      - count(branch, n)   : 분기 실행 횟수 (모든 캔들)
+      - event(name, at)    : 매매 이벤트 (분기 횟수에도 더해짐, at 은 캔들 시각)
+      - sample()           : 표본 캔들이면 현재 시각, 아니면 None 을 반환
+      - lap(phase, t)      : t 이후 경과 시간을 phase 에 더하고 새 기준 시각을 반환
+    엔진 루프에서는 `t = profiler.sample()` 후 단계 경계마다 `if t is not None: t = profiler.lap("phase", t)` 로 씁니다.
+    단계별 시간은 표본 비율로 전체 캔들에 대해 추정합니다.
+    """
+
+    def __init__(self, sample_every=SAMPLE_EVERY):
+        self.sample_every = sample_every
+        self.counts = Counter()
+        self.phase_seconds = Counter()
+        self.candles = 0
+        self.sampled = 0
+        self.events = 0
+        self.elapsed = 0.0
+        self.ticks = 0          # sample() 호출 수 (= 엔진이 직접 평가한 캔들 수)
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+
+    def stop(self, candles):
+        self.elapsed += time.perf_counter() - self._started
+        self.candles += candles
+
+    def count(self, branch, n=1):
+        self.counts[branch] += n
+
+    def event(self, name, at=None):
+        """at: 이벤트가 난 캔들 시각 (기본 계측기는 쓰지 않고, utils.parity.EventRecorder 가 이벤트 순서 비교에 사용)."""
+        self.counts[name] += 1
+        self.events += 1
+
+    def sample(self):
+        self.ticks += 1
+        if self.ticks % self.sample_every:
+            return None
+        self.sampled += 1
+        return time.perf_counter()
+
+    def lap(self, phase, t):
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - t
+        return now
+
+    def report(self) -> dict:
+        """candles/sec, events/sec, 분기 횟수, 단계별 추정 시간 비중 (logging_share 는 "logging" 단계 비중)."""
+        elapsed = self.elapsed or float("nan")
+        scale = self.ticks / self.sampled if self.sampled else 0.0
+        phase_share = {phase: seconds * scale / elapsed for phase, seconds in self.phase_seconds.items()}
+        return {
+            "candles": self.candles, "events": self.events, "elapsed_sec": self.elapsed,
+            "candles_per_sec": self.candles / elapsed, "events_per_sec": self.events / elapsed,
+            "logging_share": phase_share.get("logging", 0.0),
+            "branches": dict(self.counts), "phase_share": phase_share,
+        }
+
+
+def merge_reports(reports) -> dict:
+    """여러 실행(조합)의 report() 를 합칩니다. 단계 비중은 실행 시간 가중 평균."""
+    reports = [r for r in reports if r]
+    candles = sum(r["candles"] for r in reports)
+    events = sum(r["events"] for r in reports)
+    elapsed = sum(r["elapsed_sec"] for r in reports)
+    branches, phase_seconds = Counter(), Counter()
+    for r in reports:
+        branches.update(r["branches"])
+        for phase, share in r["phase_share"].items():
+            phase_seconds[phase] += share * r["elapsed_sec"]
+    phase_share = {phase: seconds / elapsed for phase, seconds in phase_seconds.items()} if elapsed else {}
+    return {
+        "candles": candles, "events": events, "elapsed_sec": elapsed,
+        "candles_per_sec": candles / elapsed if elapsed else float("nan"),
+        "events_per_sec": events / elapsed if elapsed else float("nan"),
+        "logging_share": phase_share.get("logging", 0.0),
+        "branches": dict(branches), "phase_share": phase_share,
+    }
+
+
+def format_report(report, title="계측 결과") -> str:
+    lines = [f"  🔬 {title}: {report['candles']:,} candles / {report['elapsed_sec']:.2f}초 → "
+             f"{report['candles_per_sec']:,.0f} candles/sec, {report['events_per_sec']:,.1f} events/sec, "
+             f"로깅 비중 {report['logging_share'] * 100:.1f}%"]
+    if report["phase_share"]:
+        phases = sorted(report["phase_share"].items(), key=lambda kv: -kv[1])
+        lines.append("     - 단계별 시간: " + ", ".join(f"{p} {s * 100:.1f}%" for p, s in phases))
+    if report["branches"]:
+        branches = sorted(report["branches"].items(), key=lambda kv: -kv[1])
+        lines.append("     - 분기 횟수: " + ", ".join(f"{b} {n:,}" for b, n in branches))
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+# utils/log_buffer.py
+
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min  # datetime64[ns] 의 NaT
+
+
+class ColumnarLog:
+    """
+    SAVE_FULL_LOG 용 열 단위 기록 버퍼. 열마다 타입이 정해진 NumPy 배열을 미리 잡아 두고, 꽉 차면 두 배로 늘립니다.
+    행마다 dict 를 쌓아 두는 대신 값만 배열에 써 넣으므로 행당 메모리가 열 수 × 1~8 바이트입니다.
+    columns 는 {열 이름: 종류} 이고 종류는 아래 중 하나:
+      - "time"   : 시각 (epoch 나노초 int64 로 저장)
+      - "signal" : 매매 신호 문자열 (처음 나온 순서대로 번호를 매긴 int16 코드로 저장, 0 = "")
+      - NumPy dtype 문자열 ("float64", "int64", "int8" ...)
+    append 에 일부 열만 넘기면 나머지 열은 빈 값 (float = NaN, 시각 = NaT, 정수 = 0, 신호 = "") 입니다.
+    """
+
+    def __init__(self, columns, capacity=4096):
+        self.columns = dict(columns)
+        self.n = 0
+        self.capacity = capacity
+        self.labels = [""]
+        self.codes = {"": 0}
+        self.data = {name: self._empty(kind, capacity) for name, kind in self.columns.items()}
+
+    @staticmethod
+    def _empty(kind, size):
+        if kind == "time":
+            return np.full(size, NAT, dtype=np.int64)
+        if kind == "signal":
+            return np.zeros(size, dtype=np.int16)
+        dtype = np.dtype(kind)
+        return np.full(size, np.nan if dtype.kind == "f" else 0, dtype=dtype)
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self):
+        for name, kind in self.columns.items():
+            arr = self.data[name]
+            self.data[name] = np.concatenate([arr, self._empty(kind, len(arr)).astype(arr.dtype)])
+        self.capacity *= 2
+
+    def encode(self, signal):
+        """신호 문자열 → 정수 코드 (새 문자열이면 라벨 표에 추가)."""
+        code = self.codes.get(signal)
+        if code is None:
+            code = self.codes[signal] = len(self.labels)
+            self.labels.append(signal)
+            if code > np.iinfo(np.int16).max:
+                for name, kind in self.columns.items():
+                    if kind == "signal" and self.data[name].dtype == np.int16:
+                        self.data[name] = self.data[name].astype(np.int32)
+        return code
+
+    def append(self, row):
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        for name, value in row.items():
+            kind = self.columns[name]
+            if kind == "time":
+                value = pd.Timestamp(value).value
+            elif kind == "signal":
+                value = self.encode(value)
+            self.data[name][i] = value
+        self.n += 1
+
+    def to_frame(self):
+        """기록된 행을 DataFrame 으로 변환합니다 (신호 열은 Categorical)."""
+        frame = {}
+        for name, kind in self.columns.items():
+            values = self.data[name][:self.n]
+            if kind == "time":
+                frame[name] = values.view("datetime64[ns]")
+            elif kind == "signal":
+                frame[name] = pd.Categorical.from_codes(values, categories=self.labels)
+            else:
+                frame[name] = values
+        return pd.DataFrame(frame)
+
+    def save(self, path):
+        """확장자(.csv / .xlsx / .parquet)에 맞춰 파일로 저장합니다."""
+        df = self.to_frame()
+        if path.endswith(".xlsx"):
+            df.to_excel(path, index=False)
+        elif path.endswith(".parquet"):
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        return path
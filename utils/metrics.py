@@ -0,0 +1,148 @@
+# utils/metrics.py
+
+import numpy as np
+import pandas as pd
+
+PERIOD_UNITS = {"D": "datetime64[D]", "M": "datetime64[M]", "Y": "datetime64[Y]"}
+PERIODS_PER_YEAR = 365      # 일 수익률 연율화 기준 (코인 시장은 휴일 없이 거래)
+DAYS_PER_YEAR = 365.25      # CAGR 기간 계산용
+
+
+def _arrays(timestamps, equity):
+    ts = np.asarray(pd.to_datetime(timestamps), dtype="datetime64[ns]")
+    eq = np.asarray(equity, dtype=np.float64)
+    if len(ts) != len(eq):
+        raise ValueError(f"timestamps({len(ts)}) 와 equity({len(eq)}) 길이가 다릅니다.")
+    return ts, eq
+
+
+def max_drawdown(equity):
+    """
+    (MDD 비율, 고점 위치, 저점 위치). MDD 는 (값 - 누적 고점) / 누적 고점 의 최솟값으로 EquityStats 와 같은 값입니다.
+    고점 위치는 저점 이전에 마지막으로 고점을 찍은(같은 값 포함) 캔들, 저점이 여러 개면 처음 것. 낙폭이 없으면 (0.0, None, None).
+    """
+    eq = np.asarray(equity, dtype=np.float64)
+    if not len(eq):
+        return 0.0, None, None
+    peak = np.maximum.accumulate(eq)
+    drawdown = (eq - peak) / peak
+    trough = int(np.argmin(drawdown))
+    if not drawdown[trough] < 0:
+        return 0.0, None, None
+    peak_pos = np.maximum.accumulate(np.where(eq >= peak, np.arange(len(eq)), 0))
+    return float(drawdown[trough]), int(peak_pos[trough]), trough
+
+
+def period_bounds(timestamps, freq):
+    """
+    달력 구간(freq = "D" / "M" / "Y") 별 (구간 시작 시각, 시작 위치, 끝 위치(미포함)).
+    구간 경계는 searchsorted 로 한 번에 찾고, 캔들이 없는 구간은 뺍니다. timestamps 는 오름차순이어야 합니다.
+    """
+    ts = np.asarray(pd.to_datetime(timestamps), dtype="datetime64[ns]")
+    if not len(ts):
+        empty = np.array([], dtype=np.int64)
+        return np.array([], dtype="datetime64[ns]"), empty, empty
+    units = ts[[0, -1]].astype(PERIOD_UNITS[freq])
+    starts = np.arange(units[0], units[1] + 1).astype("datetime64[ns]")
+    begin = np.searchsorted(ts, starts, side="left")
+    end = np.append(begin[1:], len(ts))
+    keep = end > begin
+    return starts[keep], begin[keep], end[keep]
+
+
+def calendar_rollup(timestamps, equity, freq="M") -> pd.DataFrame:
+    """
+    달력 구간별 요약: 시작 / 종료 자산, 고가 / 저가, 수익률(%, 직전 구간 종료 자산 대비), 구간 내 MDD(%), 캔들 수.
+    첫 구간의 시작 자산은 첫 캔들의 값입니다.
+    """
+    ts, eq = _arrays(timestamps, equity)
+    starts, begin, end = period_bounds(ts, freq)
+    columns = ["period", "start_equity", "end_equity", "high", "low", "return_pct", "mdd_pct", "candles"]
+    if not len(begin):
+        return pd.DataFrame(columns=columns)
+    open_equity = np.where(begin > 0, eq[np.maximum(begin - 1, 0)], eq[0])
+    close_equity = eq[end - 1]
+    # 구간마다 누적 고점을 새로 시작 (groupby cummax 로 한 번에)
+    segment = np.repeat(np.arange(len(begin)), end - begin)
+    peak = pd.Series(eq).groupby(segment).cummax().to_numpy()
+    drawdown = (eq - peak) / peak
+    return pd.DataFrame({
+        "period": pd.PeriodIndex(starts, freq=freq),
+        "start_equity": open_equity,
+        "end_equity": close_equity,
+        "high": np.maximum.reduceat(eq, begin),
+        "low": np.minimum.reduceat(eq, begin),
+        "return_pct": (close_equity / open_equity - 1) * 100,
+        "mdd_pct": np.minimum.reduceat(drawdown, begin) * 100,
+        "candles": end - begin,
+    }, columns=columns)
+
+
+def performance_metrics(timestamps, equity, risk_free_rate=0.0, periods_per_year=PERIODS_PER_YEAR) -> dict:
+    """
+    자산 곡선 하나의 성과 지표를 배열 연산으로 계산합니다.
+      - mdd_pct / mdd_peak_* / mdd_trough_*  : 최대 낙폭과 그 고점 / 저점 (시각, 값)
+      - underwater_pct / max_underwater_*    : 고점 아래 캔들 비율, 가장 긴 수중 구간 (고점 ~ 회복 또는 마지막 캔들)
+      - cagr_pct / sharpe / sortino / calmar : 일별 종가 수익률 기준 연율화 (risk_free_rate 는 연율)
+      - daily / monthly / yearly             : calendar_rollup 결과
+    """
+    ts, eq = _arrays(timestamps, equity)
+    if not len(eq):
+        raise ValueError("빈 자산 곡선입니다.")
+    n = len(eq)
+    positions = np.arange(n)
+
+    mdd, peak_i, trough_i = max_drawdown(eq)
+
+    peak = np.maximum.accumulate(eq)
+    underwater = eq < peak
+    last_high = np.maximum.accumulate(np.where(underwater, 0, positions))
+    run = np.where(underwater, positions - last_high, 0)
+    longest_end = int(np.argmax(run))
+    max_underwater = int(run[longest_end])
+
+    daily = calendar_rollup(ts, eq, "D")
+    returns = daily["return_pct"].to_numpy() / 100
+    excess = returns - risk_free_rate / periods_per_year
+    sharpe = sortino = float("nan")
+    if len(returns) > 1:
+        std = excess.std(ddof=1)
+        if std > 0:
+            sharpe = float(excess.mean() / std * np.sqrt(periods_per_year))
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+        if downside > 0:
+            sortino = float(excess.mean() / downside * np.sqrt(periods_per_year))
+
+    years = (ts[-1] - ts[0]) / np.timedelta64(1, "D") / DAYS_PER_YEAR
+    cagr = float("nan")
+    if years > 0 and eq[0] > 0 and eq[-1] > 0:
+        cagr = (eq[-1] / eq[0]) ** (1 / years) - 1
+    calmar = cagr / abs(mdd) if mdd < 0 else float("nan")
+
+    def at(i):
+        return None if i is None else pd.Timestamp(ts[i])
+
+    return {
+        "start": at(0), "end": at(n - 1), "initial_equity": float(eq[0]), "final_equity": float(eq[-1]),
+        "total_return_pct": float((eq[-1] / eq[0] - 1) * 100) if eq[0] else float("nan"),
+        "cagr_pct": float(cagr * 100), "mdd_pct": mdd * 100,
+        "mdd_peak_time": at(peak_i), "mdd_trough_time": at(trough_i),
+        "mdd_peak_value": None if peak_i is None else float(eq[peak_i]),
+        "mdd_trough_value": None if trough_i is None else float(eq[trough_i]),
+        "sharpe": sharpe, "sortino": sortino, "calmar": float(calmar),
+        "underwater_pct": float(underwater.mean() * 100), "max_underwater_ticks": max_underwater,
+        "max_underwater_start": at(int(last_high[longest_end])) if max_underwater else None,
+        "max_underwater_end": at(longest_end) if max_underwater else None,
+        "daily": daily, "monthly": calendar_rollup(ts, eq, "M"), "yearly": calendar_rollup(ts, eq, "Y"),
+    }
+
+
+def format_metrics(metrics) -> str:
+    """performance_metrics 결과의 한 줄 요약 + 연도별 수익률."""
+    lines = [f"  📐 CAGR {metrics['cagr_pct']:,.2f}% | MDD {metrics['mdd_pct']:,.2f}% | "
+             f"Sharpe {metrics['sharpe']:.2f} | Sortino {metrics['sortino']:.2f} | Calmar {metrics['calmar']:.2f} | "
+             f"수중 비율 {metrics['underwater_pct']:.1f}%"]
+    for row in metrics["yearly"].itertuples():
+        lines.append(f"     - {row.period}: 수익률 {row.return_pct:,.2f}%, 연중 MDD {row.mdd_pct:,.2f}%, "
+                     f"연말 자산 {row.end_equity:,.2f}")
+    return "\n".join(lines)
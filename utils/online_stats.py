@@ -0,0 +1,84 @@
+# utils/online_stats.py
+
+import pandas as pd
+
+
+class EquityStats:
+    """
+    평가액 이력을 저장하지 않고 한 값씩 받아 누적 고점 / 최대 낙폭(MDD) / 수중 기간을 갱신하는 O(1) 메모리 누적기.
+    MDD 는 pd.Series(이력) 의 (값 - cummax) / cummax 최솟값과 같은 값입니다.
+      - mdd_peak_time / mdd_trough_time : MDD 를 만든 고점 / 저점 시각 (mdd_peak_value / mdd_trough_value 는 그 값)
+      - underwater_ticks                : 고점 아래에 있던 캔들 수
+      - max_underwater_*                : 가장 길었던 수중 구간 (고점 시각 ~ 그 고점을 회복한 시각, 미회복이면 마지막 캔들)
+    """
+
+    def __init__(self, initial=None, timestamp=None):
+        self.count = 0
+        self.peak = None
+        self.peak_time = None
+        self.mdd = 0.0
+        self.mdd_peak_time = None
+        self.mdd_trough_time = None
+        self.mdd_peak_value = None
+        self.mdd_trough_value = None
+        self.underwater_ticks = 0
+        self.underwater_run = 0  # 현재 수중 구간 길이 (캔들 수)
+        self.max_underwater_ticks = 0
+        self.max_underwater_start = None
+        self.max_underwater_end = None
+        self.last_time = None
+        if initial is not None:
+            self.update(timestamp, initial)
+
+    def update(self, timestamp, value):
+        self.count += 1
+        self.last_time = timestamp
+        if self.peak is None or value >= self.peak:
+            self.peak = value
+            self.peak_time = timestamp
+            self.underwater_run = 0
+            return
+        drawdown = (value - self.peak) / self.peak
+        if drawdown < self.mdd:
+            self.mdd = drawdown
+            self.mdd_peak_time = self.peak_time
+            self.mdd_trough_time = timestamp
+            self.mdd_peak_value = self.peak
+            self.mdd_trough_value = value
+        self.underwater_ticks += 1
+        self.underwater_run += 1
+        if self.underwater_run > self.max_underwater_ticks:
+            self.max_underwater_ticks = self.underwater_run
+            self.max_underwater_start = self.peak_time
+            self.max_underwater_end = timestamp
+
+    def mdd_pct(self):
+        return self.mdd * 100
+
+
+class HoldingStats:
+    """보유 기간 (분) 누적기: 매도 횟수 / 합계 / 최장 보유 구간만 유지합니다 (최장이 여러 개면 처음 것)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max_duration = 0.0
+        self.max_start = None
+        self.max_end = None
+
+    def add(self, duration, start, end):
+        if self.count == 0 or duration > self.max_duration:
+            self.max_duration = duration
+            self.max_start, self.max_end = start, end
+        self.count += 1
+        self.total += duration
+
+    def average(self):
+        return self.total / self.count if self.count else None
+
+
+def format_period(start, end):
+    """'YYYY-MM-DD HH:MM ~ YYYY-MM-DD HH:MM' (시각이 없으면 'N/A')."""
+    if start is None or end is None:
+        return "N/A"
+    return f"{pd.Timestamp(start).strftime('%Y-%m-%d %H:%M')} ~ {pd.Timestamp(end).strftime('%Y-%m-%d %H:%M')}"
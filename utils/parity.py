@@ -0,0 +1,86 @@
+# utils/parity.py
+
+import math
+
+import pandas as pd
+
+from utils.instrumentation import EngineProfiler
+
+PARITY_RTOL = 1e-9   # 최종 통계 비교 상대 허용 오차
+PARITY_ATOL = 1e-9   # 최종 통계 비교 절대 허용 오차
+
+
+class EventRecorder(EngineProfiler):
+    """엔진이 profiler.event(name, at) 로 알리는 매매 이벤트를 (캔들 시각, 이름) 순서대로 기록합니다."""
+
+    def __init__(self):
+        super().__init__(sample_every=1 << 62)  # 단계 시간은 재지 않음
+        self.trail = []
+
+    def event(self, name, at=None):
+        super().event(name, at)
+        self.trail.append((pd.Timestamp(at), name))
+
+
+def first_divergence(reference, candidate):
+    """
+    두 이벤트 열에서 처음 어긋나는 위치. 같으면 None.
+    반환: {"position", "reference", "candidate"} (한쪽이 먼저 끝나면 그쪽 값은 None)
+    """
+    for position, (ref, cand) in enumerate(zip(reference, candidate)):
+        if ref != cand:
+            return {"position": position, "reference": ref, "candidate": cand}
+    if len(reference) != len(candidate):
+        position = min(len(reference), len(candidate))
+        return {"position": position,
+                "reference": reference[position] if position < len(reference) else None,
+                "candidate": candidate[position] if position < len(candidate) else None}
+    return None
+
+
+def compare_stats(reference, candidate, fields, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+    """fields 별로 허용 오차를 넘는 값만 {field: (reference, candidate)} 로 반환합니다."""
+    diffs = {}
+    for field in fields:
+        ref, cand = reference[field], candidate[field]
+        if isinstance(ref, (int, float)) and isinstance(cand, (int, float)) and not isinstance(ref, bool):
+            if not math.isclose(ref, cand, rel_tol=rtol, abs_tol=atol):
+                diffs[field] = (ref, cand)
+        elif ref != cand:
+            diffs[field] = (ref, cand)
+    return diffs
+
+
+def bisect_divergence(n, same_prefix):
+    """
+    이벤트 열이 없는 엔진용: same_prefix(k) 가 앞 k 캔들만 돌린 결과의 일치 여부일 때,
+    결과가 처음 달라지는 캔들 위치(0 기준)를 이분 탐색으로 찾습니다. n 캔들 전체가 같으면 None.
+    """
+    if same_prefix(n):
+        return None
+    lo, hi = 0, n  # same_prefix(lo) 참, same_prefix(hi) 거짓
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if same_prefix(mid):
+            lo = mid
+        else:
+            hi = mid
+    return hi - 1
+
+
+def parity_report(engine, stat_diffs, divergence=None, divergence_time=None):
+    return {"engine": engine, "ok": not stat_diffs and divergence is None, "stat_diffs": stat_diffs,
+            "first_divergence": divergence, "first_divergence_time": divergence_time}
+
+
+def format_parity_report(report) -> str:
+    if report["ok"]:
+        return f"  ✅ {report['engine']}: 일치"
+    lines = [f"  ❌ {report['engine']}: 불일치"]
+    if report["first_divergence_time"] is not None:
+        lines.append(f"     - 처음 어긋난 캔들: {report['first_divergence_time']}")
+    if report["first_divergence"] is not None:
+        lines.append(f"     - 상세: {report['first_divergence']}")
+    for field, (ref, cand) in report["stat_diffs"].items():
+        lines.append(f"     - {field}: 기준 {ref} / 비교 {cand}")
+    return "\n".join(lines)
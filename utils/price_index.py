@@ -0,0 +1,144 @@
+# utils/price_index.py
+
+import numpy as np
+
+MINUTE_NS = 60 * 1_000_000_000
+PROBE_SIZE = 64  # next_trigger 가 인덱스를 쓰기 전에 직접 비교하는 구간 길이
+
+
+class BlockExtrema:
+    """
+    블록 최댓값 + 블록 희소 테이블(sparse table).
+    start 이후 처음으로 값이 x 이상이 되는 위치를 O(B + log(n/B)) 에 찾습니다.
+    최솟값 방향 탐색은 부호를 뒤집은 배열로 같은 구조를 사용합니다.
+    """
+    __slots__ = ("values", "block_size", "levels", "n", "max_value")
+
+    def __init__(self, values, block_size=32):
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.block_size = block_size
+        self.n = n = len(self.values)
+        num_blocks = max((n + block_size - 1) // block_size, 1)
+
+        padded = np.full(num_blocks * block_size, -np.inf)
+        padded[:n] = self.values
+        level = padded.reshape(num_blocks, block_size).max(axis=1)
+
+        # levels[k][p] = max(block[p : p + 2^k])
+        levels = [level]
+        half = 1
+        while half * 2 <= num_blocks:
+            level = np.maximum(level[:-half], level[half:])
+            levels.append(level)
+            half *= 2
+        self.levels = [lv.tolist() for lv in levels]
+        self.max_value = float(levels[0].max())
+
+    def first_at_or_above(self, start, x, stop=None):
+        """[start, stop) 구간에서 values[j] >= x 인 첫 j 를 반환합니다. 없으면 stop."""
+        stop = self.n if stop is None else min(stop, self.n)
+        if start >= stop or x > self.max_value:
+            return stop
+        values, block_size = self.values, self.block_size
+
+        # 1) 시작 블록의 나머지 구간
+        end = min((start // block_size + 1) * block_size, stop)
+        k = int((values[start:end] >= x).argmax())
+        if values.item(start + k) >= x:
+            return start + k
+        if end >= stop:
+            return stop
+
+        # 2) 희소 테이블로 최댓값이 x 미만인 블록들을 2의 거듭제곱 단위로 건너뜀
+        p = end // block_size
+        stop_block = (stop + block_size - 1) // block_size
+        levels = self.levels
+        for lv in range(min((stop_block - p).bit_length(), len(levels)) - 1, -1, -1):
+            step = 1 << lv
+            if p + step <= stop_block and levels[lv][p] < x:
+                p += step
+        if p >= stop_block:
+            return stop
+
+        # 3) 교차가 일어나는 블록 내부 탐색
+        begin = p * block_size
+        end = min(begin + block_size, stop)
+        k = int((values[begin:end] >= x).argmax())
+        if values.item(begin + k) >= x:
+            return begin + k
+        return stop
+
+    def range_max(self, start, stop):
+        if start >= stop:
+            return -np.inf
+        return self.values[start:stop].max().item()
+
+
+class PriceIndex:
+    """
+    캔들 배열 위의 트리거 교차 인덱스.
+    보유 중에는 high 가 익절가에, low 가 손절/물타기 가격에, close 가 리셋 평가액에
+    처음 닿는 캔들만 의미가 있으므로, 그 캔들로 바로 건너뛸 수 있게 해줍니다.
+    """
+    __slots__ = ("timestamp", "high", "low_neg", "close", "n", "step_ns")
+
+    def __init__(self, candles, block_size=32):
+        self.timestamp = candles.timestamp
+        self.high = BlockExtrema(candles.high, block_size)
+        self.low_neg = BlockExtrema(-candles.low, block_size)
+        self.close = BlockExtrema(candles.close, block_size)
+        self.n = len(candles.timestamp)
+        self.step_ns = MINUTE_NS
+
+    def first_high_at_or_above(self, start, price, stop=None):
+        return self.high.first_at_or_above(start, price, stop)
+
+    def first_low_at_or_below(self, start, price, stop=None):
+        return self.low_neg.first_at_or_above(start, -price, stop)
+
+    def first_close_at_or_above(self, start, price, stop=None):
+        return self.close.first_at_or_above(start, price, stop)
+
+    def next_trigger(self, start, low_at_or_below, high_at_or_above, close_at_or_above=np.inf):
+        """
+        세 조건 중 하나라도 만족하는 첫 캔들 인덱스 (없으면 n).
+        대부분의 트리거는 가까이에 있으므로 짧은 구간을 한 번에 벡터 비교한 뒤, 못 찾으면 블록 인덱스로 넘어갑니다.
+        """
+        probe_end = min(start + PROBE_SIZE, self.n)
+        if start < probe_end:
+            hit = self.high.values[start:probe_end] >= high_at_or_above
+            hit |= self.low_neg.values[start:probe_end] >= -low_at_or_below
+            if close_at_or_above != np.inf:
+                hit |= self.close.values[start:probe_end] >= close_at_or_above
+            k = hit.argmax()
+            if hit[k]:
+                return start + int(k)
+        j = self.high.first_at_or_above(probe_end, high_at_or_above)
+        j = self.low_neg.first_at_or_above(probe_end, -low_at_or_below, j)
+        if close_at_or_above != np.inf:
+            j = self.close.first_at_or_above(probe_end, close_at_or_above, j)
+        return j
+
+    def max_high(self, start, stop):
+        return self.high.range_max(start, stop)
+
+    def index_at_or_after(self, timestamp_ns, hint=0):
+        """
+        timestamp >= timestamp_ns 인 첫 인덱스.
+        1분봉 간격이 일정하면 hint 기준 오프셋 계산으로 O(1), 누락 캔들이 있으면 이분 탐색으로 대체합니다.
+        """
+        ts, n = self.timestamp, self.n
+        if n == 0:
+            return 0
+        hint = min(max(hint, 0), n - 1)
+        guess = hint + (timestamp_ns - ts.item(hint) + self.step_ns - 1) // self.step_ns
+        if guess <= 0:
+            guess = 0
+            if ts.item(0) >= timestamp_ns:
+                return 0
+        elif guess >= n:
+            if ts.item(n - 1) < timestamp_ns:
+                return n
+        elif ts.item(guess) >= timestamp_ns and ts.item(guess - 1) < timestamp_ns:
+            return guess
+        return int(np.searchsorted(ts, timestamp_ns))
@@ -0,0 +1,34 @@
+# utils/scenario_candles.py
+
+import pandas as pd
+
+from utils.candle_arrays import CandleArrays
+
+
+class ScenarioCandles:
+    """
+    여러 시나리오 구간을 덮는 캔들을 한 번만 로드해 두고, 시나리오마다 복사 없는 뷰를 돌려줍니다.
+    SQLite 조회와 timestamp 파싱은 합집합 구간(가장 이른 시작 ~ 가장 늦은 끝)에 대해 한 번만 일어나고,
+    시나리오별 구간은 정렬된 timestamp 배열 위 이분 탐색으로 잘라냅니다.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.arrays = CandleArrays.from_df(df)
+
+    @classmethod
+    def load(cls, loader, market, ranges):
+        """ranges 의 (start, end) 합집합 구간을 loader(market, start, end) 로 한 번 읽습니다."""
+        ranges = list(ranges)
+        if not ranges:
+            return cls(pd.DataFrame())
+        start = min((s for s, _ in ranges), key=pd.Timestamp)
+        end = max((e for _, e in ranges), key=pd.Timestamp)
+        return cls(loader(market, start, end))
+
+    def view(self, start, end):
+        """[start, end] 구간의 (DataFrame, CandleArrays). 둘 다 원본 버퍼를 그대로 가리킵니다."""
+        if self.df.empty:
+            return self.df, self.arrays
+        lo, hi = self.arrays.bounds(start, end)
+        return self.df.iloc[lo:hi], self.arrays.view(lo, hi)
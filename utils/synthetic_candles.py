@@ -0,0 +1,73 @@
+# utils/synthetic_candles.py
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+SYNTH_SEED = 20240101
+SYNTH_START = "2020-01-01 00:00:00"
+SYNTH_PRICE = 20000.0
+SYNTH_VOL = 0.0008          # 1분 로그 수익률 표준편차
+SYNTH_DRIFT = 0.0           # 1분 로그 수익률 평균 (폭락 구간 포함 전체 평균)
+SYNTH_JUMP_PROB = 0.0005    # 캔들당 점프 확률
+SYNTH_JUMP_SCALE = 0.01     # 점프 크기 표준편차
+SYNTH_CRASH_EVERY = 43_200  # 폭락 구간 평균 간격 (분, 약 30일)
+SYNTH_CRASH_MINUTES = 2_880  # 폭락 구간 길이 (분)
+SYNTH_CRASH_DRIFT = -0.0001  # 폭락 구간 동안 더해지는 분당 하락 추세
+SYNTH_CRASH_VOL = 2.5       # 폭락 구간 변동성 배수
+SYNTH_WICK = 0.5            # 꼬리 길이 (변동성 대비 배수)
+
+
+def synthetic_candles(n, seed=SYNTH_SEED, start=SYNTH_START, price=SYNTH_PRICE, vol=SYNTH_VOL, drift=SYNTH_DRIFT,
+                      jump_prob=SYNTH_JUMP_PROB, jump_scale=SYNTH_JUMP_SCALE, crash_every=SYNTH_CRASH_EVERY,
+                      crash_minutes=SYNTH_CRASH_MINUTES, crash_drift=SYNTH_CRASH_DRIFT, crash_vol=SYNTH_CRASH_VOL,
+                      wick=SYNTH_WICK) -> pd.DataFrame:
+    """
+    DB 없이 쓰는 결정적(seed 고정) 1분봉: 점프가 섞인 GBM 위에 폭락 구간(하락 추세 + 변동성 확대)을 겹칩니다.
+    폭락 구간의 하락 추세는 평상시 구간에 나눠 되돌려, 길이와 상관없이 로그 수익률 평균이 drift 로 유지됩니다.
+    전부 배열 연산이라 수천만 분도 한 번에 만들 수 있고, 컬럼은 load_candles 와 같은 timestamp / open / high / low / close.
+    """
+    rng = np.random.default_rng(seed)
+
+    # 폭락 구간: 평균 crash_every 분마다 시작해 crash_minutes 분 동안 유지 (겹치면 하나로 이어짐)
+    edges = np.zeros(n + 1)
+    starts = np.flatnonzero(rng.random(n) < 1.0 / crash_every) if crash_every else np.array([], dtype=np.int64)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, np.minimum(starts + crash_minutes, n), -1)
+    crashing = np.cumsum(edges[:n]) > 0
+
+    sigma = np.where(crashing, vol * crash_vol, vol)
+    returns = rng.standard_normal(n)
+    returns *= sigma
+    crash_count = int(crashing.sum())
+    recovery = -crash_drift * crash_count / (n - crash_count) if crash_count < n else 0.0
+    returns += drift + np.where(crashing, crash_drift, recovery)
+    jumps = rng.random(n) < jump_prob
+    returns[jumps] += rng.normal(0.0, jump_scale, int(jumps.sum()))
+
+    close = np.cumsum(returns)
+    np.exp(close, out=close)
+    close *= price
+    open_ = np.empty(n)
+    open_[:1] = price
+    open_[1:] = close[:-1]
+    upper = np.abs(rng.standard_normal(n)) * sigma * wick
+    lower = np.abs(rng.standard_normal(n)) * sigma * wick
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=n, freq="1min"),
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + upper),
+        "low": np.minimum(open_, close) * (1 - lower),
+        "close": close,
+    })
+
+
+def write_candle_db(df, db_path, market="BTCUSDT"):
+    """synthetic_candles 결과를 minute_candles 스키마의 SQLite 파일로 저장합니다 (simulate_with_db 등 DB 기반 엔진용)."""
+    out = df.assign(market=market, volume=1.0)
+    out["timestamp"] = out["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    with sqlite3.connect(db_path) as conn:
+        out[["market", "timestamp", "open", "high", "low", "close", "volume"]].to_sql(
+            "minute_candles", conn, index=False, if_exists="replace")
+    return db_path
@@ -0,0 +1,120 @@
+# utils/worst_windows.py
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.candle_arrays import CandleArrays
+
+METRICS = ("drawdown", "crash", "underwater")
+SCENARIO_PREFIX = {"drawdown": "DD", "crash": "CR", "underwater": "UW"}
+
+
+def rolling_max(values, window):
+    """
+    values[j - window + 1 : j + 1] 구간 최댓값과 그 위치 (단조 감소 deque, O(n)).
+    같은 값이면 더 최근 위치를 남깁니다.
+    """
+    n = len(values)
+    out = np.empty(n)
+    arg = np.empty(n, dtype=np.int64)
+    dq = deque()
+    for j, v in enumerate(values.tolist()):
+        while dq and values.item(dq[-1]) <= v:
+            dq.pop()
+        dq.append(j)
+        if dq[0] <= j - window:
+            dq.popleft()
+        out[j] = values.item(dq[0])
+        arg[j] = dq[0]
+    return out, arg
+
+
+def rolling_min(values, window):
+    """values[j - window + 1 : j + 1] 구간 최솟값 (단조 증가 deque, O(n))."""
+    out, _ = rolling_max(-np.asarray(values, dtype=np.float64), window)
+    return -out
+
+
+def _drawdown_scores(candles, window):
+    """구간 시작 = 고점. window 안에서 고점 대비 가장 깊은 저점 하락률."""
+    peak, peak_at = rolling_max(candles.high, window)
+    depth = 1 - candles.low / peak
+    # 같은 고점에서 시작하는 후보는 가장 깊은 저점 하나만 남김
+    order = np.lexsort((-depth, peak_at))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = peak_at[order][1:] != peak_at[order][:-1]
+    best = order[first]
+    return peak_at[best], depth[best]
+
+
+def _crash_scores(candles, window):
+    """구간 시작 = 전고점(HWM) 갱신 캔들. 이후 window 안에서 도달한 최저가의 하락률."""
+    n = len(candles)
+    starts = np.flatnonzero(candles.high >= np.maximum.accumulate(candles.high))
+    trailing_low = rolling_min(candles.low, window)                 # [j - window + 1, j] 최솟값
+    suffix_low = np.minimum.accumulate(candles.low[::-1])[::-1]     # 데이터 끝에 걸린 시작점용
+    end = starts + window - 1
+    ahead = np.where(end < n, trailing_low[np.minimum(end, n - 1)], suffix_low[starts])
+    return starts, 1 - ahead / candles.high[starts]
+
+
+def _underwater_scores(candles):
+    """구간 시작 = 전고점(HWM) 캔들. 고가가 그 고점을 다시 넘기까지 걸린 캔들 수 (끝까지 회복 못하면 데이터 끝까지)."""
+    n = len(candles)
+    hwm = np.maximum.accumulate(candles.high)
+    set_at = np.maximum.accumulate(np.where(candles.high >= hwm, np.arange(n), 0))
+    recovered = np.flatnonzero(np.diff(set_at)) + 1  # 다음 HWM 이 갱신된 위치
+    starts = np.concatenate([[0], recovered]) if n else np.empty(0, dtype=np.int64)
+    ends = np.concatenate([recovered, [n]]) if n else np.empty(0, dtype=np.int64)
+    return starts, (ends - starts - 1).astype(np.float64)
+
+
+def find_worst_windows(candles: CandleArrays, window, metric="drawdown", top_n=3):
+    """
+    길이 window(캔들 수) 인 구간 중 metric 기준 최악의 구간 top_n 개를 겹치지 않게 골라
+    [(start_idx, end_idx, score), ...] 로 반환합니다 (점수 내림차순).
+      - drawdown  : 구간 안 고점 → 저점 최대 하락률
+      - crash     : 전고점(HWM) 에서 시작해 window 안에 도달한 최대 하락률
+      - underwater: 전고점 이후 고점을 회복하지 못한 기간(캔들 수). 구간은 그 전고점에서 시작
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric 은 {METRICS} 중 하나여야 합니다: {metric}")
+    n = len(candles)
+    if n == 0:
+        return []
+    window = max(1, min(int(window), n))
+    if metric == "drawdown":
+        starts, scores = _drawdown_scores(candles, window)
+    elif metric == "crash":
+        starts, scores = _crash_scores(candles, window)
+    else:
+        starts, scores = _underwater_scores(candles)
+
+    chosen = []
+    for k in np.argsort(-scores, kind="stable"):
+        start = min(int(starts[k]), n - window)
+        end = start + window - 1
+        if all(end < s or start > e for s, e, _ in chosen):
+            chosen.append((start, end, float(scores[k])))
+            if len(chosen) >= top_n:
+                break
+    return chosen
+
+
+def worst_window_scenarios(candles: CandleArrays, window, metric="drawdown", top_n=3):
+    """find_worst_windows 결과를 stress test 의 SCENARIOS 항목 형식(name/start/end)으로 변환합니다."""
+    scenarios = []
+    for rank, (start, end, score) in enumerate(find_worst_windows(candles, window, metric, top_n), 1):
+        if metric == "underwater":
+            label = f"수중 {score / 1440:.0f}일"
+        else:
+            label = f"-{score * 100:.1f}%"
+        scenarios.append({
+            "name": f"{SCENARIO_PREFIX[metric]}{rank} ({label})",
+            "start": pd.Timestamp(candles.timestamp.item(start)).strftime("%Y-%m-%d %H:%M:%S"),
+            "end": pd.Timestamp(candles.timestamp.item(end)).strftime("%Y-%m-%d %H:%M:%S"),
+            "metric": metric, "score": score,
+        })
+    return scenarios